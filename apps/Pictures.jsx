@@ -300,9 +300,11 @@ function PicturesPage() {
                   <p style={{ marginTop: 0, marginBottom: 6 }}>
                     Waist to chest: {Number(assessResult.ratios.waist_to_chest).toFixed(3)}
                   </p>
-                  <p style={{ marginTop: 0, marginBottom: 6 }}>
-                    Belly tuck: {Number(assessResult.ratios.belly_tuck).toFixed(3)}
-                  </p>
+                  {assessResult.ratios.belly_tuck != null && (
+                    <p style={{ marginTop: 0, marginBottom: 6 }}>
+                      Belly tuck: {Number(assessResult.ratios.belly_tuck).toFixed(3)}
+                    </p>
+                  )}
                   <p style={{ margin: 0 }}>
                     Length (px): {Math.round(Number(assessResult.ratios.length_px) || 0)}
                   </p>
@@ -29,7 +29,7 @@ export const assessResponseSchema = z.object({
       length_px: z.number(),
       waist_to_chest: z.number(),
       width_profile: z.array(z.number()).length(5),
-      belly_tuck: z.number()
+      belly_tuck: z.number().nullable()
     })
     .nullable()
     .optional(),
@@ -18,7 +18,7 @@ export type AssessResponse = {
         length_px: number;
         waist_to_chest: number;
         width_profile: [number, number, number, number, number];
-        belly_tuck: number;
+        belly_tuck: number | null;
       }
     | null;
   bucket: BcsBucket;
@@ -21,7 +21,7 @@ const assessRatiosSchema = z.object({
   length_px: z.number(),
   waist_to_chest: z.number(),
   width_profile: z.array(z.number()).length(5),
-  belly_tuck: z.number()
+  belly_tuck: z.number().nullable()
 });
 
 export const assessResponseSchema = z.object({
@@ -1,36 +1,210 @@
 from __future__ import annotations
 
-import io
+import asyncio
 import json
+import os
+import threading
 import time
-import urllib.request
-from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
-from typing import Any, Literal, cast
-from urllib.error import URLError
+import uuid
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Literal, cast
 
-import numpy as np
 from fastapi import APIRouter, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import StreamingResponse
 from openai import APIConnectionError, APITimeoutError
-from PIL import Image, UnidentifiedImageError
 
-from app.ml.bcs_rules import classify_bcs_bucket
-from app.ml.breed_bbox import breed_bbox
+from app.core.cancellation import CancellationToken, OperationCancelled
+from app.core.timing import REQUEST_ID_HEADER, RequestTimer, bind_request_timer
+from app.core.work_queue import AdmissionRejected, BoundedExecutor
+from app.ml.bcs_rules import classify_bcs_bucket, fuse_view_ratios
+from app.ml.breed_bbox import BreedBboxResult, breed_bbox
 from app.ml.breed_priors import load_priors
+from app.ml.breed_router import HybridBreedRouter
+from app.ml.classic_segmenter import ClassicSegmenterBackend
+from app.ml.compact_mask import CompactMask
+from app.ml.decoded_image import DecodedImage, decode_image
+from app.ml.embedding_cache import EmbeddingCache
+from app.ml.featherless_vision_json import vision_circuit_open
 from app.ml.ratio_features import extract_ratio_features
 from app.ml.segmenter import Segmenter
 from app.schemas.assess import (
+    AssessBatchItemResult,
+    AssessBatchRequest,
     AssessMask,
     AssessRatios,
     AssessRequest,
     AssessRequestMeta,
     AssessResponse,
+    AssessViewResult,
+    AssessViewsRequest,
+    AssessViewsResponse,
 )
+from app.services.image_fetcher import (
+    ImageFetchError,
+    ImageFetchTimeoutError,
+    ImageTooLargeError,
+    image_fetcher,
+)
+from app.services.resilience import CircuitOpenError
+from app.state.assess_cache import assess_cache_key, assess_result_cache
 from app.state.pet_store import pet_store
 
 router = APIRouter()
 ASSESS_TIMEOUT_SECONDS = 8.0
+# Long side of the working copy used for segmentation and ratios; 0 keeps full resolution.
+# 1024 matches the resolution MobileSAM's encoder resizes to internally.
+WORKING_MAX_SIDE = int(os.getenv("ASSESS_WORKING_MAX_SIDE", "1024"))
+ASSESS_BATCH_MAX_ITEMS = int(os.getenv("ASSESS_BATCH_MAX_ITEMS", "64"))
+ASSESS_BATCH_ENCODER_SIZE = int(os.getenv("ASSESS_BATCH_ENCODER_SIZE", "4"))
+ASSESS_BATCH_VISION_CONCURRENCY = int(os.getenv("ASSESS_BATCH_VISION_CONCURRENCY", "8"))
+# Per-item budget, counted from when the item gets a vision slot.
+ASSESS_BATCH_ITEM_TIMEOUT_SECONDS = float(os.getenv("ASSESS_BATCH_ITEM_TIMEOUT_SECONDS", "30"))
+# Batch SAM work runs on its own lane so a large batch cannot starve interactive /assess.
+ASSESS_BATCH_WORKERS = int(os.getenv("ASSESS_BATCH_WORKERS", "1"))
+ASSESS_BATCH_MAX_QUEUE_DEPTH = int(os.getenv("ASSESS_BATCH_MAX_QUEUE_DEPTH", "256"))
+ASSESS_WORKERS = int(os.getenv("ASSESS_WORKERS", "2"))
+ASSESS_MAX_QUEUE_DEPTH = int(os.getenv("ASSESS_MAX_QUEUE_DEPTH", "8"))
+# Above this expected queue wait, segmentation skips MobileSAM for the classic segmenter.
+ASSESS_CLASSIC_FALLBACK_WAIT_SECONDS = float(
+    os.getenv("ASSESS_CLASSIC_FALLBACK_WAIT_SECONDS", "2.0")
+)
+# After a MobileSAM failure, requests use the classic segmenter for this long.
+SAM_RETRY_COOLDOWN_SECONDS = float(os.getenv("SAM_RETRY_COOLDOWN_SECONDS", "60"))
 _segmenter = Segmenter()
-_executor = ThreadPoolExecutor(max_workers=2)
+# No embedding cache: the classic "embedding" is the image itself.
+_fallback_segmenter = Segmenter(
+    backend=ClassicSegmenterBackend(),
+    embedding_cache=EmbeddingCache(max_entries=0),
+)
+_executor = BoundedExecutor(
+    max_workers=ASSESS_WORKERS,
+    max_queue_depth=ASSESS_MAX_QUEUE_DEPTH,
+    thread_name_prefix="assess",
+)
+_batch_executor = BoundedExecutor(
+    max_workers=ASSESS_BATCH_WORKERS,
+    max_queue_depth=ASSESS_BATCH_MAX_QUEUE_DEPTH,
+    thread_name_prefix="assess-batch",
+)
+
+
+class _SamAvailability:
+    """Decides per request whether MobileSAM runs or the classic segmenter stands in."""
+
+    def __init__(self, wait_threshold_seconds: float, cooldown_seconds: float) -> None:
+        self._wait_threshold_seconds = wait_threshold_seconds
+        self._cooldown_seconds = cooldown_seconds
+        self._lock = threading.Lock()
+        self._unavailable_until = 0.0
+        self._failures = 0
+        self._fallbacks = {"failure": 0, "cooldown": 0, "load": 0}
+
+    def use_sam(self, expected_wait_seconds: float) -> bool:
+        with self._lock:
+            if time.monotonic() < self._unavailable_until:
+                self._fallbacks["cooldown"] += 1
+                return False
+            if expected_wait_seconds > self._wait_threshold_seconds:
+                self._fallbacks["load"] += 1
+                return False
+            return True
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._fallbacks["failure"] += 1
+            self._unavailable_until = time.monotonic() + self._cooldown_seconds
+
+    def reset(self) -> None:
+        with self._lock:
+            self._unavailable_until = 0.0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "sam_failures": self._failures,
+                "fallbacks": dict(self._fallbacks),
+                "sam_cooldown_remaining_seconds": max(
+                    0.0, self._unavailable_until - time.monotonic()
+                ),
+            }
+
+
+_sam_availability = _SamAvailability(
+    ASSESS_CLASSIC_FALLBACK_WAIT_SECONDS,
+    SAM_RETRY_COOLDOWN_SECONDS,
+)
+_breed_router = HybridBreedRouter(_segmenter)
+
+
+def segmenter_metrics() -> dict[str, Any]:
+    return {
+        "embedding_cache": _segmenter.embedding_cache.stats(),
+        "classic_fallback": _sam_availability.stats(),
+    }
+
+
+def breed_router_metrics() -> dict[str, Any]:
+    return _breed_router.stats()
+
+
+def _use_sam(executor: BoundedExecutor = _executor) -> bool:
+    """Whether MobileSAM runs, given the expected wait on the lane it would run on."""
+    return _sam_availability.use_sam(executor.expected_wait_seconds())
+
+
+def warm_up_steps() -> dict[str, Any]:
+    """Startup work that would otherwise land on the first request's budget."""
+    return {
+        "breed_priors": load_priors,
+        "segmenter": _segmenter.warm_up,
+        "breed_router": _breed_router.warm_up,
+    }
+
+
+def shutdown_workers() -> None:
+    """Stop both assess lanes and the SAM backend's worker processes, at app shutdown."""
+    for executor in (_executor, _batch_executor):
+        executor.shutdown(wait=True, cancel_futures=True)
+    _segmenter.shutdown()
+    _fallback_segmenter.shutdown()
+
+
+def work_queue_metrics() -> dict[str, Any]:
+    return _executor.stats()
+
+
+def batch_work_queue_metrics() -> dict[str, Any]:
+    return _batch_executor.stats()
+
+
+def _busy(exc: AdmissionRejected) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Assessment service is busy. Please retry shortly.",
+        headers={"Retry-After": exc.retry_after_header},
+    )
+
+
+def _admit(deadline: float) -> None:
+    try:
+        _executor.admit(_remaining_seconds(deadline))
+    except AdmissionRejected as exc:
+        raise _busy(exc) from exc
+
+
+def _submit(
+    fn: Any,
+    *args: Any,
+    executor: BoundedExecutor = _executor,
+    **kwargs: Any,
+) -> Future[Any]:
+    """Enqueue on ``executor``; a full queue is the same 429 as ``_admit``."""
+    try:
+        return executor.submit(fn, *args, **kwargs)
+    except AdmissionRejected as exc:
+        raise _busy(exc) from exc
 
 
 def _remaining_seconds(deadline: float) -> float:
@@ -45,76 +219,361 @@ def _ensure_time(deadline: float) -> None:
         )
 
 
-def _mime_from_bytes(image_bytes: bytes, fallback: str | None = None) -> str:
-    try:
-        with Image.open(io.BytesIO(image_bytes)) as img:
-            fmt = (img.format or "").upper()
-    except UnidentifiedImageError:
-        if fallback and fallback.startswith("image/"):
-            return fallback
-        return "application/octet-stream"
-    if fmt == "JPEG":
-        return "image/jpeg"
-    if fmt == "PNG":
-        return "image/png"
-    if fmt == "WEBP":
-        return "image/webp"
-    if fmt == "GIF":
-        return "image/gif"
-    if fallback and fallback.startswith("image/"):
-        return fallback
-    return "application/octet-stream"
-
-
-def _decode_rgb(image_bytes: bytes) -> np.ndarray:
+def _decode_image(
+    image_bytes: bytes,
+    fallback_mime: str | None,
+    *,
+    not_image_detail: str,
+) -> DecodedImage:
     try:
-        with Image.open(io.BytesIO(image_bytes)) as img:
-            return np.array(img.convert("RGB"), dtype=np.uint8)
-    except UnidentifiedImageError as exc:
-        raise HTTPException(status_code=400, detail="Could not decode image bytes.") from exc
+        decoded = decode_image(
+            image_bytes,
+            fallback_mime=fallback_mime,
+            max_side=WORKING_MAX_SIDE or None,
+        )
+    except ValueError as exc:
+        if fallback_mime and fallback_mime.startswith("image/"):
+            raise HTTPException(
+                status_code=400,
+                detail="Could not decode image bytes.",
+            ) from exc
+        raise HTTPException(status_code=400, detail=not_image_detail) from exc
+    if not decoded.mime.startswith("image/"):
+        raise HTTPException(status_code=400, detail=not_image_detail)
+    return decoded
 
 
-def _fetch_image_bytes_and_mime(image_url: str, deadline: float) -> tuple[bytes, str]:
-    timeout = max(0.1, _remaining_seconds(deadline))
+async def _fetch_image_bytes_and_mime(
+    image_url: str,
+    deadline: float,
+) -> tuple[bytes, str | None]:
+    _ensure_time(deadline)
     try:
-        with urllib.request.urlopen(image_url, timeout=timeout) as response:
-            image_bytes = response.read()
-            header_mime = response.headers.get_content_type()
-    except URLError as exc:
+        image_bytes, header_mime = await image_fetcher.fetch(
+            image_url,
+            timeout_seconds=_remaining_seconds(deadline),
+        )
+    except ImageFetchTimeoutError as exc:
+        raise HTTPException(
+            status_code=504,
+            detail="Assessment timed out. Please try again.",
+        ) from exc
+    except ImageTooLargeError as exc:
+        raise HTTPException(status_code=400, detail="Image at image_url is too large.") from exc
+    except ImageFetchError as exc:
         raise HTTPException(status_code=400, detail="Unable to fetch image_url.") from exc
     if not image_bytes:
         raise HTTPException(status_code=400, detail="Image URL returned empty content.")
+    return image_bytes, header_mime
 
-    mime = _mime_from_bytes(image_bytes, fallback=header_mime)
-    if not mime.startswith("image/"):
-        raise HTTPException(status_code=400, detail="URL must point to an image.")
-    return image_bytes, mime
 
-
-def _read_upload_bytes_and_mime(
-    image_bytes: bytes,
-    content_type: str | None,
-) -> tuple[bytes, str]:
+def _upload_header_mime(image_bytes: bytes, content_type: str | None) -> str | None:
     if not image_bytes:
         raise HTTPException(status_code=400, detail="Uploaded image is empty.")
+    return (content_type or "").split(";", 1)[0].strip().lower() or None
+
+
+async def _await_with_budget(future: Future[Any], deadline: float) -> Any:
+    try:
+        return await asyncio.wait_for(
+            asyncio.wrap_future(future),
+            timeout=max(0.1, _remaining_seconds(deadline)),
+        )
+    except TimeoutError as exc:
+        raise HTTPException(
+            status_code=504,
+            detail="Assessment timed out. Please try again.",
+        ) from exc
+
+
+async def _run_with_budget(
+    fn: Any,
+    deadline: float,
+    *args: Any,
+    executor: BoundedExecutor = _executor,
+    **kwargs: Any,
+) -> Any:
+    _ensure_time(deadline)
+    return await _await_with_budget(_submit(fn, *args, executor=executor, **kwargs), deadline)
+
+
+async def _classify_breed(
+    decoded: DecodedImage,
+    deadline: float,
+    timer: RequestTimer,
+) -> BreedBboxResult:
+    # The vision call is awaited on the loop over the shared upstream pool,
+    # so it does not occupy an assess worker while the model responds.
+    try:
+        _ensure_time(deadline)
+        with timer.span("breed_bbox"):
+            return await asyncio.wait_for(
+                breed_bbox(decoded, deadline=deadline),
+                timeout=max(0.1, _remaining_seconds(deadline)),
+            )
+    except HTTPException:
+        raise
+    except CircuitOpenError as exc:
+        raise HTTPException(
+            status_code=503,
+            detail="Vision service is temporarily unavailable.",
+            headers={"Retry-After": exc.retry_after_header},
+        ) from exc
+    except TimeoutError as exc:
+        raise HTTPException(
+            status_code=504,
+            detail="Assessment timed out. Please try again.",
+        ) from exc
+    except (APIConnectionError, APITimeoutError) as exc:
+        raise HTTPException(
+            status_code=502,
+            detail="Vision service is temporarily unavailable.",
+        ) from exc
+    except Exception as exc:
+        raise HTTPException(
+            status_code=502,
+            detail="Vision service is temporarily unavailable.",
+        ) from exc
+
+
+async def _try_local_breed(
+    decoded: DecodedImage,
+    embedding_future: Future[Any] | None,
+    deadline: float,
+    timer: RequestTimer,
+    token: CancellationToken,
+) -> tuple[BreedBboxResult | None, str]:
+    if not _breed_router.available:
+        return None, "remote:unavailable"
+    if embedding_future is None:
+        return None, "remote:no_embedding"
+    # While the vision breaker is open the remote call would fail fast, so
+    # the local top guess is better than no answer.
+    vision_down = vision_circuit_open()
+    try:
+        local = await _run_with_budget(
+            timer.wrap("breed_local", _breed_router.classify_local),
+            deadline,
+            decoded,
+            min_confidence=0.0 if vision_down else None,
+        )
+        if local is None:
+            # The first call loads the classifier and may find it missing.
+            if not _breed_router.available:
+                return None, "remote:unavailable"
+            return None, "remote:low_confidence"
+        embedding = await _await_with_budget(embedding_future, deadline)
+        bbox = await _run_with_budget(
+            timer.wrap("breed_local_bbox", token.guard(_breed_router.local_bbox)),
+            deadline,
+            decoded,
+            embedding,
+            token.raise_if_cancelled,
+        )
+    except HTTPException as exc:
+        # A full queue only rules out the optional local shortcut; the
+        # vision model can still answer this already-admitted request.
+        if exc.status_code == 429:
+            return None, "remote:queue_full"
+        raise
+    except OperationCancelled as exc:
+        raise HTTPException(
+            status_code=504,
+            detail="Assessment timed out. Please try again.",
+        ) from exc
+    except Exception:
+        return None, "remote:error"
+    if bbox is None:
+        return None, "remote:no_bbox"
+    return {**local, "bbox": bbox}, "local:vision_circuit_open" if vision_down else "local"
+
+
+async def _route_breed(
+    decoded: DecodedImage,
+    embedding_future: Future[Any] | None,
+    deadline: float,
+    timer: RequestTimer,
+    token: CancellationToken,
+) -> tuple[BreedBboxResult, str]:
+    """Breed and bbox from the local classifier and SAM when confident, else the vision model.
+
+    The local path reuses the SAM embedding already being computed for the
+    mask, so a confident local answer skips the remote call entirely.
+    Returns the result with the route outcome recorded for it.
+    """
+    started = time.perf_counter()
+    outcome = "remote:error"
+    try:
+        breed_result, outcome = await _try_local_breed(
+            decoded,
+            embedding_future,
+            deadline,
+            timer,
+            token,
+        )
+        if breed_result is None:
+            breed_result = await _classify_breed(decoded, deadline, timer)
+        return breed_result, outcome
+    finally:
+        _breed_router.record(outcome, (time.perf_counter() - started) * 1000.0)
+
+
+# Errors that mean MobileSAM itself is broken (model load, runtime, resources),
+# as opposed to something wrong with one image.
+_SAM_BACKEND_ERRORS: tuple[type[Exception], ...] = (RuntimeError, OSError, ImportError, MemoryError)
+
+
+def _ratios_from_mask(
+    decoded: DecodedImage,
+    mask: Any,
+    bbox: list[int],
+    timer: RequestTimer,
+) -> dict[str, Any] | None:
+    if not (
+        isinstance(mask, CompactMask)
+        and mask.shape == decoded.rgb.shape[:2]
+        and not mask.empty
+    ):
+        return None
+
+    with timer.span("ratio_features"):
+        ratios_dict = extract_ratio_features(mask)
+        ratios_dict["length_px"] = decoded.to_original_length(ratios_dict["length_px"])
+        ratios_dict["mask_fill_bbox_ratio"] = mask.fill_ratio(bbox)
+    return ratios_dict
+
 
-    header_mime = (content_type or "").split(";", 1)[0].strip().lower() or None
-    mime = _mime_from_bytes(image_bytes, fallback=header_mime)
-    if not mime.startswith("image/"):
-        raise HTTPException(status_code=400, detail="Uploaded file must be an image.")
-    return image_bytes, mime
+async def _classic_mask_ratios(
+    decoded: DecodedImage,
+    breed_result: BreedBboxResult,
+    deadline: float,
+    timer: RequestTimer,
+    token: CancellationToken,
+) -> dict[str, Any] | None:
+    bbox = decoded.to_working_bbox(breed_result["bbox"])
 
+    def segment() -> CompactMask:
+        embedding = _fallback_segmenter.embed(decoded, token.raise_if_cancelled)
+        return _fallback_segmenter.predict_compact_mask(
+            embedding,
+            bbox,
+            cancel_check=token.raise_if_cancelled,
+        )
 
-def _run_with_budget(fn: Any, deadline: float, *args: Any, **kwargs: Any) -> Any:
     _ensure_time(deadline)
-    future = _executor.submit(fn, *args, **kwargs)
+    # Off the assess executor: the fallback exists for when that queue is backed up.
     try:
-        return future.result(timeout=max(0.1, _remaining_seconds(deadline)))
-    except FutureTimeoutError as exc:
+        mask = await asyncio.wait_for(
+            asyncio.to_thread(timer.wrap("classic_segmenter", segment)),
+            timeout=max(0.1, _remaining_seconds(deadline)),
+        )
+    except TimeoutError as exc:
         raise HTTPException(
             status_code=504,
             detail="Assessment timed out. Please try again.",
         ) from exc
+    ratios_dict = _ratios_from_mask(decoded, mask, bbox, timer)
+    if ratios_dict is not None:
+        ratios_dict["segmentation_source"] = "classic"
+    return ratios_dict
+
+
+async def _segment_ratios(
+    decoded: DecodedImage,
+    breed_result: BreedBboxResult,
+    embedding: Awaitable[Any] | None,
+    deadline: float,
+    timer: RequestTimer,
+    token: CancellationToken,
+    executor: BoundedExecutor = _executor,
+) -> dict[str, Any] | None:
+    """Ratios from the MobileSAM mask, or from the classic segmenter.
+
+    ``embedding`` is ``None`` when MobileSAM was skipped for this request;
+    ``executor`` is the lane the mask decoder runs on.
+    A MobileSAM backend error from the encoder or decoder starts the retry
+    cooldown and the classic segmenter answers instead; a full queue also
+    falls back, without the cooldown. Errors specific to this image (bad
+    input, degenerate mask, ratio extraction) propagate to the caller.
+    """
+    if embedding is not None:
+        # The vision bbox is in original pixels; the mask and ratios use working pixels.
+        bbox = decoded.to_working_bbox(breed_result["bbox"])
+        try:
+            mask = await _run_with_budget(
+                timer.wrap("sam_decoder", token.guard(_segmenter.predict_compact_mask)),
+                deadline,
+                await embedding,
+                bbox,
+                executor=executor,
+                cancel_check=token.raise_if_cancelled,
+            )
+        except HTTPException as exc:
+            if exc.status_code != 429:
+                raise
+        except (OperationCancelled, TimeoutError):
+            raise
+        except _SAM_BACKEND_ERRORS:
+            _sam_availability.record_failure()
+        else:
+            return _ratios_from_mask(decoded, mask, bbox, timer)
+    return await _classic_mask_ratios(decoded, breed_result, deadline, timer, token)
+
+
+# Route outcomes whose answer is a stand-in for the vision model, not a verdict.
+_DEGRADED_BREED_OUTCOMES = frozenset({"local:vision_circuit_open"})
+
+
+def _cacheable(ratios_dict: dict[str, Any] | None, breed_outcome: str | None = None) -> bool:
+    return (
+        ratios_dict is not None
+        and ratios_dict.get("segmentation_source") != "classic"
+        and breed_outcome not in _DEGRADED_BREED_OUTCOMES
+    )
+
+
+def _build_response(
+    breed_result: BreedBboxResult,
+    ratios_dict: dict[str, Any] | None,
+    meta: AssessRequestMeta | None,
+    timer: RequestTimer,
+    view_ratios: dict[str, dict[str, Any] | None] | None = None,
+) -> AssessResponse:
+    if view_ratios is not None:
+        ratios_dict = fuse_view_ratios(view_ratios)
+    priors = None
+    try:
+        priors = load_priors()
+    except Exception:
+        priors = None
+
+    with timer.span("classify_bcs"):
+        bucket, confidence, notes = classify_bcs_bucket(
+            ratios=ratios_dict,
+            species=breed_result["species"],
+            weight_kg=meta.weight_kg if meta else None,
+            breed_top1=breed_result["breed_top3"][0]["breed"],
+            priors=priors,
+            views=view_ratios,
+        )
+
+    return AssessResponse(
+        species=breed_result["species"],
+        breed_top3=breed_result["breed_top3"],
+        mask=AssessMask(available=ratios_dict is not None),
+        ratios=AssessRatios(**ratios_dict) if ratios_dict else None,
+        bucket=cast(
+            Literal["UNDERWEIGHT", "IDEAL", "OVERWEIGHT", "OBESE", "UNKNOWN"],
+            bucket,
+        ),
+        confidence=confidence,
+        notes=notes,
+    )
+
+
+def _save_last_assess(meta: AssessRequestMeta | None, response: AssessResponse) -> None:
+    if meta and meta.pet_id:
+        pet_store.save_last_assess(meta.pet_id, response.model_dump())
 
 
 @router.post("/assess", response_model=AssessResponse)
@@ -127,6 +586,7 @@ async def assess(
     request_payload: str | None = Form(default=None, alias="request"),
 ) -> AssessResponse:
     deadline = time.monotonic() + ASSESS_TIMEOUT_SECONDS
+    timer = bind_request_timer(request)
     payload: AssessRequest | None = None
     content_type = request.headers.get("content-type", "")
     request_meta: AssessRequestMeta | None = None
@@ -141,16 +601,22 @@ async def assess(
         except Exception as exc:
             raise HTTPException(status_code=422, detail="Invalid assess request payload.") from exc
 
-        image_bytes, mime = _fetch_image_bytes_and_mime(str(payload.image_url), deadline)
+        with timer.span("fetch"):
+            image_bytes, header_mime = await _fetch_image_bytes_and_mime(
+                str(payload.image_url),
+                deadline,
+            )
+        not_image_detail = "URL must point to an image."
     else:
         if image is None:
             raise HTTPException(status_code=400, detail="image file is required.")
 
-        upload_bytes = await image.read()
-        image_bytes, mime = _read_upload_bytes_and_mime(
-            image_bytes=upload_bytes,
+        image_bytes = await image.read()
+        header_mime = _upload_header_mime(
+            image_bytes=image_bytes,
             content_type=image.content_type or content_type,
         )
+        not_image_detail = "Uploaded file must be an image."
         try:
             request_meta = AssessRequestMeta(
                 species=species,
@@ -187,85 +653,520 @@ async def assess(
                     detail="Invalid request metadata.",
                 ) from exc
 
-    image_rgb = _decode_rgb(image_bytes)
+    meta = payload.meta if payload else request_meta
+    cache_key = assess_cache_key(
+        image_bytes,
+        species=meta.species if meta else None,
+        breed_hint=meta.breed_hint if meta else None,
+        weight_kg=meta.weight_kg if meta else None,
+    )
+    cached_response = assess_result_cache.get(cache_key)
+    if cached_response is not None:
+        _save_last_assess(meta, cached_response)
+        return cached_response
+
+    _admit(deadline)
+    decoded = await asyncio.to_thread(
+        timer.wrap("decode", _decode_image),
+        image_bytes,
+        header_mime,
+        not_image_detail=not_image_detail,
+    )
     _ensure_time(deadline)
 
+    # Cancelled as soon as the request gives up so queued or in-progress
+    # work on the shared executor stops instead of running to completion.
+    token = CancellationToken(deadline)
+
+    # The SAM image encoder does not need the bbox, so it runs while the
+    # vision call is in flight; only the prompt decoder waits for the bbox.
+    embedding_future = (
+        _submit(
+            timer.wrap("sam_encoder", token.guard(_segmenter.embed)),
+            decoded,
+            cancel_check=token.raise_if_cancelled,
+        )
+        if _use_sam()
+        else None
+    )
     try:
-        breed_result = _run_with_budget(
-            breed_bbox,
+        breed_result, breed_outcome = await _route_breed(
+            decoded,
+            embedding_future,
             deadline,
-            image_bytes,
-            mime,
+            timer,
+            token,
         )
     except HTTPException:
+        token.cancel()
+        if embedding_future is not None:
+            embedding_future.cancel()
         raise
-    except (APIConnectionError, APITimeoutError) as exc:
-        raise HTTPException(
-            status_code=502,
-            detail="Vision service is temporarily unavailable.",
-        ) from exc
-    except Exception as exc:
-        raise HTTPException(
-            status_code=502,
-            detail="Vision service is temporarily unavailable.",
-        ) from exc
 
-    ratios_dict: dict[str, Any] | None = None
-    mask_available = False
-    bbox = breed_result["bbox"]
     try:
-        mask = _run_with_budget(_segmenter.segment, deadline, image_rgb, bbox)
-        if (
-            isinstance(mask, np.ndarray)
-            and mask.ndim == 2
-            and mask.shape[:2] == image_rgb.shape[:2]
-            and bool(np.any(mask > 0))
-        ):
-            ratios_dict = extract_ratio_features((mask > 0).astype(np.uint8))
-            x1, y1, x2, y2 = bbox
-            bbox_area = max(1, (x2 - x1) * (y2 - y1))
-            mask_area = int(np.count_nonzero(mask > 0))
-            ratios_dict["mask_fill_bbox_ratio"] = float(mask_area / bbox_area)
-            mask_available = True
+        ratios_dict = await _segment_ratios(
+            decoded,
+            breed_result,
+            _await_with_budget(embedding_future, deadline) if embedding_future else None,
+            deadline,
+            timer,
+            token,
+        )
     except Exception:
+        token.cancel()
         ratios_dict = None
-        mask_available = False
 
-    priors = None
+    response = _build_response(breed_result, ratios_dict, meta, timer)
+    if _cacheable(ratios_dict, breed_outcome):
+        # Degraded (no-mask, fallback or breaker-open) results are usually transient;
+        # let retries recompute them.
+        assess_result_cache.put(cache_key, response)
+    _save_last_assess(meta, response)
+    return response
+
+
+@dataclass(frozen=True)
+class _ViewSource:
+    view: str
+    image_url: str | None = None
+    image_bytes: bytes | None = None
+    content_type: str | None = None
+
+
+@dataclass(frozen=True)
+class _ViewOutcome:
+    view: str
+    breed_result: BreedBboxResult | None = None
+    ratios: dict[str, Any] | None = None
+    error: HTTPException | None = None
+
+
+def _parse_meta_payload(request_payload: str | None) -> AssessRequestMeta | None:
+    if not request_payload:
+        return None
     try:
-        priors = load_priors()
-    except Exception:
-        priors = None
+        parsed = json.loads(request_payload)
+    except json.JSONDecodeError as exc:
+        raise HTTPException(status_code=400, detail="request must be valid JSON.") from exc
+    try:
+        if isinstance(parsed, dict) and isinstance(parsed.get("meta"), dict):
+            return AssessRequestMeta.model_validate(parsed["meta"])
+        return AssessRequestMeta.model_validate(parsed)
+    except Exception as exc:
+        raise HTTPException(status_code=422, detail="Invalid request metadata.") from exc
 
-    bucket, confidence, notes = classify_bcs_bucket(
-        ratios=ratios_dict,
-        species=breed_result["species"],
-        weight_kg=(
-            payload.meta.weight_kg
-            if payload and payload.meta
-            else (request_meta.weight_kg if request_meta else None)
-        ),
-        breed_top1=breed_result["breed_top3"][0]["breed"],
-        priors=priors,
+
+async def _parse_view_sources(
+    request: Request,
+    side: UploadFile | None,
+    top: UploadFile | None,
+    request_payload: str | None,
+) -> tuple[list[_ViewSource], AssessRequestMeta | None]:
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("application/json"):
+        try:
+            raw_payload = await request.json()
+        except json.JSONDecodeError as exc:
+            raise HTTPException(status_code=400, detail="Invalid JSON request body.") from exc
+        try:
+            payload = AssessViewsRequest.model_validate(raw_payload)
+        except Exception as exc:
+            raise HTTPException(status_code=422, detail="Invalid assess views payload.") from exc
+        if len({item.view for item in payload.views}) != len(payload.views):
+            raise HTTPException(status_code=422, detail="Each view may appear at most once.")
+        sources = [
+            _ViewSource(view=item.view, image_url=str(item.image_url)) for item in payload.views
+        ]
+        return sources, payload.meta
+
+    sources = []
+    for view, upload in (("side", side), ("top", top)):
+        if upload is not None:
+            sources.append(
+                _ViewSource(
+                    view=view,
+                    image_bytes=await upload.read(),
+                    content_type=upload.content_type,
+                )
+            )
+    if not sources:
+        raise HTTPException(status_code=400, detail="side or top image file is required.")
+    return sources, _parse_meta_payload(request_payload)
+
+
+async def _assess_view(
+    source: _ViewSource,
+    deadline: float,
+    timer: RequestTimer,
+) -> _ViewOutcome:
+    # Per-view token: one view failing must not cancel the other's work.
+    token = CancellationToken(deadline)
+    try:
+        try:
+            if source.image_url is not None:
+                with timer.span("fetch"):
+                    image_bytes, header_mime = await _fetch_image_bytes_and_mime(
+                        source.image_url,
+                        deadline,
+                    )
+                not_image_detail = "URL must point to an image."
+            else:
+                image_bytes = source.image_bytes or b""
+                header_mime = _upload_header_mime(image_bytes, source.content_type)
+                not_image_detail = "Uploaded file must be an image."
+
+            decoded = await asyncio.to_thread(
+                timer.wrap("decode", _decode_image),
+                image_bytes,
+                header_mime,
+                not_image_detail=not_image_detail,
+            )
+            _ensure_time(deadline)
+            embedding_future = (
+                _submit(
+                    timer.wrap("sam_encoder", token.guard(_segmenter.embed)),
+                    decoded,
+                    cancel_check=token.raise_if_cancelled,
+                )
+                if _use_sam()
+                else None
+            )
+            try:
+                breed_result, _ = await _route_breed(
+                    decoded,
+                    embedding_future,
+                    deadline,
+                    timer,
+                    token,
+                )
+            except HTTPException:
+                if embedding_future is not None:
+                    embedding_future.cancel()
+                raise
+        except HTTPException as exc:
+            token.cancel()
+            return _ViewOutcome(view=source.view, error=exc)
+
+        try:
+            ratios_dict = await _segment_ratios(
+                decoded,
+                breed_result,
+                _await_with_budget(embedding_future, deadline) if embedding_future else None,
+                deadline,
+                timer,
+                token,
+            )
+        except Exception:
+            token.cancel()
+            ratios_dict = None
+        return _ViewOutcome(view=source.view, breed_result=breed_result, ratios=ratios_dict)
+    except asyncio.CancelledError:
+        token.cancel()
+        raise
+
+
+@router.post("/assess/views", response_model=AssessViewsResponse)
+async def assess_views(
+    request: Request,
+    side: UploadFile | None = File(default=None),
+    top: UploadFile | None = File(default=None),
+    request_payload: str | None = Form(default=None, alias="request"),
+) -> AssessViewsResponse:
+    """Assess one pet from a side and/or top view in a single round trip.
+
+    Views are fetched, classified and segmented concurrently under one
+    deadline; their ratio features are fused by ``classify_bcs_bucket``.
+    """
+    deadline = time.monotonic() + ASSESS_TIMEOUT_SECONDS
+    timer = bind_request_timer(request)
+    sources, meta = await _parse_view_sources(request, side, top, request_payload)
+
+    _admit(deadline)
+    outcomes = await asyncio.gather(*(_assess_view(source, deadline, timer) for source in sources))
+
+    # Breed and species come from the side view when its vision call succeeded.
+    classified = sorted(
+        (outcome for outcome in outcomes if outcome.breed_result is not None),
+        key=lambda outcome: outcome.view != "side",
     )
+    if not classified:
+        error = next(outcome.error for outcome in outcomes if outcome.error is not None)
+        raise error
 
-    response = AssessResponse(
-        species=breed_result["species"],
-        breed_top3=breed_result["breed_top3"],
-        mask=AssessMask(available=mask_available),
-        ratios=AssessRatios(**ratios_dict) if ratios_dict else None,
-        bucket=cast(
-            Literal["UNDERWEIGHT", "IDEAL", "OVERWEIGHT", "OBESE", "UNKNOWN"],
-            bucket,
-        ),
-        confidence=confidence,
-        notes=notes,
+    view_ratios = {outcome.view: outcome.ratios for outcome in outcomes}
+    response = _build_response(
+        cast(BreedBboxResult, classified[0].breed_result),
+        None,
+        meta,
+        timer,
+        view_ratios=view_ratios,
     )
-    pet_id = (
-        payload.meta.pet_id
-        if payload and payload.meta and payload.meta.pet_id
-        else (request_meta.pet_id if request_meta and request_meta.pet_id else None)
+    views_response = AssessViewsResponse(
+        **response.model_dump(),
+        views=[
+            AssessViewResult(
+                view=cast(Literal["side", "top"], outcome.view),
+                mask=AssessMask(available=outcome.ratios is not None),
+                ratios=AssessRatios(**outcome.ratios) if outcome.ratios else None,
+                error=str(outcome.error.detail) if outcome.error is not None else None,
+            )
+            for outcome in outcomes
+        ],
     )
-    if pet_id:
-        pet_store.save_last_assess(pet_id, response.model_dump())
+    _save_last_assess(meta, views_response)
+    return views_response
+
+
+@dataclass(frozen=True)
+class _BatchSource:
+    index: int
+    id: str | None
+    meta: AssessRequestMeta | None
+    image_url: str | None = None
+    image_bytes: bytes | None = None
+    content_type: str | None = None
+
+
+class _BatchEncoder:
+    """Micro-batches MobileSAM encoder passes for items as their images become ready."""
+
+    def __init__(self, batch_size: int) -> None:
+        self._batch_size = max(1, batch_size)
+        self._queue: asyncio.Queue[tuple[DecodedImage, asyncio.Future[Any]]] = asyncio.Queue()
+
+    def submit(self, decoded: DecodedImage) -> asyncio.Future[Any]:
+        future: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((decoded, future))
+        return future
+
+    async def run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self._batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            batch = [(decoded, future) for decoded, future in batch if not future.done()]
+            if not batch:
+                continue
+            try:
+                embeddings = await asyncio.wrap_future(
+                    _batch_executor.submit(
+                        _segmenter.embed_batch,
+                        [decoded for decoded, _ in batch],
+                    )
+                )
+            except Exception as exc:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            for (_, future), embedding in zip(batch, embeddings, strict=True):
+                if not future.done():
+                    future.set_result(embedding)
+
+
+async def _parse_batch_sources(
+    request: Request,
+    images: list[UploadFile] | None,
+    request_payload: str | None,
+) -> list[_BatchSource]:
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("application/json"):
+        try:
+            raw_payload = await request.json()
+        except json.JSONDecodeError as exc:
+            raise HTTPException(status_code=400, detail="Invalid JSON request body.") from exc
+        try:
+            payload = AssessBatchRequest.model_validate(raw_payload)
+        except Exception as exc:
+            raise HTTPException(status_code=422, detail="Invalid assess batch payload.") from exc
+        sources = [
+            _BatchSource(index=i, id=item.id, meta=item.meta, image_url=str(item.image_url))
+            for i, item in enumerate(payload.items)
+        ]
+    else:
+        if not images:
+            raise HTTPException(status_code=400, detail="images files are required.")
+        item_specs: list[Any] = []
+        if request_payload:
+            try:
+                parsed = json.loads(request_payload)
+            except json.JSONDecodeError as exc:
+                raise HTTPException(
+                    status_code=400,
+                    detail="request must be valid JSON.",
+                ) from exc
+            item_specs = parsed.get("items", []) if isinstance(parsed, dict) else []
+            if not isinstance(item_specs, list):
+                raise HTTPException(status_code=422, detail="Invalid request metadata.")
+
+        sources = []
+        for i, upload in enumerate(images):
+            spec = item_specs[i] if i < len(item_specs) and isinstance(item_specs[i], dict) else {}
+            try:
+                meta = (
+                    AssessRequestMeta.model_validate(spec["meta"])
+                    if isinstance(spec.get("meta"), dict)
+                    else None
+                )
+            except Exception as exc:
+                raise HTTPException(
+                    status_code=422,
+                    detail="Invalid request metadata.",
+                ) from exc
+            item_id = spec.get("id")
+            sources.append(
+                _BatchSource(
+                    index=i,
+                    id=str(item_id) if item_id is not None else upload.filename,
+                    meta=meta,
+                    image_bytes=await upload.read(),
+                    content_type=upload.content_type,
+                )
+            )
+
+    if len(sources) > ASSESS_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"A batch may contain at most {ASSESS_BATCH_MAX_ITEMS} items.",
+        )
+    return sources
+
+
+async def _assess_batch_item(
+    source: _BatchSource,
+    encoder: _BatchEncoder,
+    vision_slots: asyncio.Semaphore,
+    timer: RequestTimer,
+) -> AssessResponse:
+    if source.image_url is not None:
+        with timer.span("fetch"):
+            image_bytes, header_mime = await _fetch_image_bytes_and_mime(
+                source.image_url,
+                time.monotonic() + ASSESS_BATCH_ITEM_TIMEOUT_SECONDS,
+            )
+        not_image_detail = "URL must point to an image."
+    else:
+        image_bytes = source.image_bytes or b""
+        header_mime = _upload_header_mime(image_bytes, source.content_type)
+        not_image_detail = "Uploaded file must be an image."
+
+    meta = source.meta
+    cache_key = assess_cache_key(
+        image_bytes,
+        species=meta.species if meta else None,
+        breed_hint=meta.breed_hint if meta else None,
+        weight_kg=meta.weight_kg if meta else None,
+    )
+    cached_response = assess_result_cache.get(cache_key)
+    if cached_response is not None:
+        _save_last_assess(meta, cached_response)
+        return cached_response
+
+    decoded = await asyncio.to_thread(
+        timer.wrap("decode", _decode_image),
+        image_bytes,
+        header_mime,
+        not_image_detail=not_image_detail,
+    )
+    # The encoder starts now; the item's budget starts once it has a vision
+    # slot, so time queued behind earlier items is not charged to it.
+    embedding_future = encoder.submit(decoded) if _use_sam(_batch_executor) else None
+    async with vision_slots:
+        deadline = time.monotonic() + ASSESS_BATCH_ITEM_TIMEOUT_SECONDS
+        token = CancellationToken(deadline)
+        try:
+            breed_result = await _classify_breed(decoded, deadline, timer)
+        except HTTPException:
+            token.cancel()
+            if embedding_future is not None:
+                embedding_future.cancel()
+            raise
+
+    try:
+        ratios_dict = await _segment_ratios(
+            decoded,
+            breed_result,
+            (
+                asyncio.wait_for(
+                    embedding_future,
+                    timeout=max(0.1, _remaining_seconds(deadline)),
+                )
+                if embedding_future is not None
+                else None
+            ),
+            deadline,
+            timer,
+            token,
+            _batch_executor,
+        )
+    except Exception:
+        token.cancel()
+        ratios_dict = None
+
+    response = _build_response(breed_result, ratios_dict, meta, timer)
+    if _cacheable(ratios_dict):
+        assess_result_cache.put(cache_key, response)
+    _save_last_assess(meta, response)
     return response
+
+
+async def _batch_item_result(
+    source: _BatchSource,
+    encoder: _BatchEncoder,
+    vision_slots: asyncio.Semaphore,
+    batch_id: str,
+) -> AssessBatchItemResult:
+    timer = RequestTimer(f"{batch_id}:{source.index}")
+    try:
+        result = await _assess_batch_item(source, encoder, vision_slots, timer)
+    except HTTPException as exc:
+        return AssessBatchItemResult(
+            index=source.index,
+            id=source.id,
+            ok=False,
+            status_code=exc.status_code,
+            error=str(exc.detail),
+        )
+    except Exception:
+        return AssessBatchItemResult(
+            index=source.index,
+            id=source.id,
+            ok=False,
+            status_code=500,
+            error="Assessment failed.",
+        )
+    return AssessBatchItemResult(index=source.index, id=source.id, ok=True, result=result)
+
+
+async def _stream_batch(sources: list[_BatchSource], batch_id: str) -> AsyncIterator[str]:
+    encoder = _BatchEncoder(ASSESS_BATCH_ENCODER_SIZE)
+    encoder_task = asyncio.create_task(encoder.run())
+    vision_slots = asyncio.Semaphore(ASSESS_BATCH_VISION_CONCURRENCY)
+    tasks = [
+        asyncio.create_task(_batch_item_result(source, encoder, vision_slots, batch_id))
+        for source in sources
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            item_result = await next_done
+            yield item_result.model_dump_json() + "\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+        encoder_task.cancel()
+
+
+@router.post("/assess/batch")
+async def assess_batch(
+    request: Request,
+    images: list[UploadFile] | None = File(default=None),
+    request_payload: str | None = Form(default=None, alias="request"),
+) -> StreamingResponse:
+    """Assess many images; one NDJSON line per item is streamed as each completes."""
+    sources = await _parse_batch_sources(request, images, request_payload)
+    batch_id = request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+    return StreamingResponse(
+        _stream_batch(sources, batch_id),
+        media_type="application/x-ndjson",
+        headers={REQUEST_ID_HEADER: batch_id},
+    )
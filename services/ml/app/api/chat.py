@@ -90,7 +90,7 @@ def _fallback_response() -> ChatResponse:
 
 
 @router.post("/chat", response_model=ChatResponse)
-def chat(payload: ChatRequest) -> ChatResponse:
+async def chat(payload: ChatRequest) -> ChatResponse:
     _ = payload.session_id
     messages = [
         {"role": "system", "content": SYSTEM_PROMPT},
@@ -98,7 +98,7 @@ def chat(payload: ChatRequest) -> ChatResponse:
     ]
 
     try:
-        raw = text_chat(messages=messages, timeout_seconds=CHAT_TIMEOUT_SECONDS)
+        raw = await text_chat(messages=messages, timeout_seconds=CHAT_TIMEOUT_SECONDS)
         parsed = _extract_json_block(raw)
         reply = _truncate_to_sentence_limit(str(parsed.get("reply", "")).strip())
         quick_actions = _normalize_quick_actions(parsed.get("quick_actions"))
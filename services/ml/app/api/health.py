@@ -1,4 +1,6 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
+
+from app.core.readiness import readiness
 
 router = APIRouter()
 
@@ -6,3 +8,10 @@ router = APIRouter()
 @router.get("/health")
 def health() -> dict[str, str]:
     return {"status": "ok"}
+
+
+@router.get("/ready")
+def ready(response: Response) -> dict[str, object]:
+    if not readiness.ready:
+        response.status_code = 503
+    return readiness.snapshot()
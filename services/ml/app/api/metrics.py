@@ -0,0 +1,30 @@
+from typing import Any
+
+from fastapi import APIRouter
+
+from app.api.assess import (
+    batch_work_queue_metrics,
+    breed_router_metrics,
+    segmenter_metrics,
+    work_queue_metrics,
+)
+from app.core.timing import stage_latency
+from app.services.featherless_client import upstream_stats
+from app.state.assess_cache import assess_result_cache
+from app.state.vision_cache import breed_bbox_cache
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+def metrics() -> dict[str, Any]:
+    return {
+        "segmenter": segmenter_metrics(),
+        "assess_work_queue": work_queue_metrics(),
+        "assess_batch_work_queue": batch_work_queue_metrics(),
+        "breed_router": breed_router_metrics(),
+        "assess_result_cache": assess_result_cache.stats(),
+        "breed_bbox_cache": breed_bbox_cache.stats(),
+        "featherless_upstreams": upstream_stats(),
+        "stage_latency_ms": stage_latency.snapshot(),
+    }
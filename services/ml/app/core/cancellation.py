@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable
+
+
+class OperationCancelled(Exception):
+    """Raised at a cancellation checkpoint once the caller has given up."""
+
+
+class CancellationToken:
+    """Deadline plus explicit cancel flag shared between a request and its workers.
+
+    Workers call ``raise_if_cancelled`` at safe points so abandoned work
+    frees its executor thread instead of running to completion.
+    """
+
+    def __init__(self, deadline: float | None = None) -> None:
+        self._deadline = deadline
+        self._event = threading.Event()
+
+    @property
+    def deadline(self) -> float | None:
+        return self._deadline
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        return self._deadline is not None and time.monotonic() >= self._deadline
+
+    def remaining(self) -> float | None:
+        if self._deadline is None:
+            return None
+        return max(0.0, self._deadline - time.monotonic())
+
+    def raise_if_cancelled(self) -> None:
+        if self.cancelled:
+            raise OperationCancelled("operation cancelled")
+
+    def guard(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        """Return ``fn`` that is skipped if the token is cancelled before it starts."""
+
+        def guarded(*args: Any, **kwargs: Any) -> Any:
+            self.raise_if_cancelled()
+            return fn(*args, **kwargs)
+
+        return guarded
@@ -14,6 +14,13 @@ def _as_float(name: str, default: float) -> float:
         return default
 
 
+def _as_bool(name: str, default: bool) -> bool:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    return raw.strip().lower() in {"1", "true", "yes", "on"}
+
+
 def _as_int(name: str, default: int) -> int:
     raw = os.getenv(name)
     if raw is None:
@@ -31,6 +38,7 @@ class Settings:
     host: str = os.getenv("ML_HOST", "127.0.0.1")
     port: int = _as_int("ML_PORT", 8000)
     request_timeout_seconds: float = _as_float("ML_REQUEST_TIMEOUT_SECONDS", 8.0)
+    warmup_on_startup: bool = _as_bool("ML_WARMUP_ON_STARTUP", True)
 
 
 settings = Settings()
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class Readiness:
+    """Startup state reported by ``/ready``; false until warm-up has finished."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._ready = False
+        self._errors: dict[str, str] = {}
+        self._warmup_seconds: float | None = None
+
+    @property
+    def ready(self) -> bool:
+        with self._lock:
+            return self._ready
+
+    def record_error(self, component: str, error: str) -> None:
+        with self._lock:
+            self._errors[component] = error
+
+    def mark_ready(self, warmup_seconds: float | None = None) -> None:
+        with self._lock:
+            self._ready = True
+            self._warmup_seconds = warmup_seconds
+
+    def reset(self) -> None:
+        with self._lock:
+            self._ready = False
+            self._errors.clear()
+            self._warmup_seconds = None
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "status": "ready" if self._ready else "starting",
+                "errors": dict(self._errors),
+                "warmup_seconds": self._warmup_seconds,
+            }
+
+
+readiness = Readiness()
+
+
+def run_warmup(steps: dict[str, Any], state: Readiness = readiness) -> None:
+    """Run each named warm-up callable, then mark ``state`` ready.
+
+    A failing step is recorded rather than raised: the routes already degrade
+    (e.g. no mask) when a component is unavailable, and holding readiness
+    false forever would keep the instance out of rotation.
+    """
+    started = time.monotonic()
+    for name, step in steps.items():
+        try:
+            step()
+        except Exception as exc:  # noqa: BLE001 - reported via /ready
+            logger.exception("warm-up step %s failed", name)
+            state.record_error(name, f"{type(exc).__name__}: {exc}")
+    elapsed = time.monotonic() - started
+    logger.info("warm-up finished in %.1fs", elapsed)
+    state.mark_ready(elapsed)
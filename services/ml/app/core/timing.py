@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import bisect
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in milliseconds; the final bucket is open-ended.
+LATENCY_BUCKETS_MS: tuple[float, ...] = (
+    5.0,
+    10.0,
+    25.0,
+    50.0,
+    100.0,
+    250.0,
+    500.0,
+    1000.0,
+    2500.0,
+    5000.0,
+    10000.0,
+)
+REQUEST_ID_HEADER = "X-Request-ID"
+
+
+class LatencyHistogram:
+    def __init__(self, buckets_ms: tuple[float, ...] = LATENCY_BUCKETS_MS) -> None:
+        self._buckets_ms = buckets_ms
+        self._counts = [0] * (len(buckets_ms) + 1)
+        self._count = 0
+        self._sum_ms = 0.0
+
+    def observe(self, duration_ms: float) -> None:
+        self._counts[bisect.bisect_left(self._buckets_ms, duration_ms)] += 1
+        self._count += 1
+        self._sum_ms += duration_ms
+
+    def snapshot(self) -> dict[str, Any]:
+        cumulative = 0
+        buckets: dict[str, int] = {}
+        for bound, count in zip((*self._buckets_ms, float("inf")), self._counts, strict=True):
+            cumulative += count
+            buckets["+Inf" if bound == float("inf") else f"{bound:g}"] = cumulative
+        return {"count": self._count, "sum_ms": self._sum_ms, "buckets_ms": buckets}
+
+
+class StageLatencyRegistry:
+    """Process-wide per-stage latency histograms."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._histograms: dict[str, LatencyHistogram] = {}
+
+    def observe(self, stage: str, duration_ms: float) -> None:
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = LatencyHistogram()
+                self._histograms[stage] = histogram
+            histogram.observe(duration_ms)
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            return {stage: hist.snapshot() for stage, hist in sorted(self._histograms.items())}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+
+stage_latency = StageLatencyRegistry()
+
+
+class RequestTimer:
+    """Collects named spans for one request.
+
+    Spans may be recorded from executor threads; each one also feeds the
+    process-wide ``stage_latency`` histograms.
+    """
+
+    def __init__(
+        self,
+        request_id: str | None = None,
+        registry: StageLatencyRegistry = stage_latency,
+    ) -> None:
+        self.request_id = request_id or uuid.uuid4().hex
+        self._registry = registry
+        self._lock = threading.Lock()
+        self._spans: list[tuple[str, float]] = []
+
+    def record(self, stage: str, duration_ms: float) -> None:
+        with self._lock:
+            self._spans.append((stage, duration_ms))
+        self._registry.observe(stage, duration_ms)
+        logger.debug(
+            "span request_id=%s stage=%s duration_ms=%.1f",
+            self.request_id,
+            stage,
+            duration_ms,
+        )
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, (time.perf_counter() - started) * 1000.0)
+
+    def wrap(self, stage: str, fn: Callable[..., Any]) -> Callable[..., Any]:
+        """Return ``fn`` timed as ``stage`` wherever it eventually runs."""
+
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            with self.span(stage):
+                return fn(*args, **kwargs)
+
+        return timed
+
+    def spans(self) -> list[tuple[str, float]]:
+        with self._lock:
+            return list(self._spans)
+
+    def server_timing_header(self) -> str:
+        return ", ".join(f"{stage};dur={duration_ms:.1f}" for stage, duration_ms in self.spans())
+
+
+def bind_request_timer(request: Request) -> RequestTimer:
+    """A timer for ``request`` whose spans ``ServerTimingMiddleware`` puts on the response."""
+    timer = RequestTimer(request.headers.get(REQUEST_ID_HEADER))
+    request.state.request_timer = timer
+    return timer
+
+
+class ServerTimingMiddleware:
+    """Adds ``Server-Timing`` and ``X-Request-ID`` for routes that bound a ``RequestTimer``.
+
+    Headers are set on every response, error responses included, since slow
+    and timed-out requests are the ones the spans are for. A ``total`` span
+    covering the whole request is recorded just before the headers go out.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+
+        async def send_with_timing(message: Message) -> None:
+            timer = scope.get("state", {}).get("request_timer")
+            if message["type"] == "http.response.start" and timer is not None:
+                timer.record("total", (time.perf_counter() - started) * 1000.0)
+                headers = MutableHeaders(scope=message)
+                headers["Server-Timing"] = timer.server_timing_header()
+                headers[REQUEST_ID_HEADER] = timer.request_id
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class AdmissionRejected(Exception):
+    """Raised when new work cannot start within its deadline."""
+
+    def __init__(self, reason: str, retry_after_seconds: float) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after_seconds = retry_after_seconds
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after_seconds)))
+
+
+class BoundedExecutor:
+    """Thread pool with a queue-depth limit and wait-time based admission control.
+
+    ``ThreadPoolExecutor`` queues without bound, so under a burst requests
+    wait out their whole budget before timing out. ``admit`` rejects up front
+    when the queue is full or the expected wait exceeds the caller's
+    remaining time.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_queue_depth: int,
+        *,
+        ewma_alpha: float = 0.2,
+        thread_name_prefix: str = "",
+    ) -> None:
+        self._max_workers = max(1, max_workers)
+        self._max_queue_depth = max(0, max_queue_depth)
+        self._alpha = ewma_alpha
+        self._pool = ThreadPoolExecutor(
+            max_workers=self._max_workers,
+            thread_name_prefix=thread_name_prefix,
+        )
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._service_ewma: float | None = None
+        self._wait_count = 0
+        self._wait_sum = 0.0
+        self._wait_max = 0.0
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers
+
+    def expected_wait_seconds(self) -> float:
+        with self._lock:
+            return self._expected_wait_locked()
+
+    def _expected_wait_locked(self) -> float:
+        if self._running + self._queued < self._max_workers:
+            return 0.0
+        service = self._service_ewma or 0.0
+        return (self._queued + 1) / self._max_workers * service
+
+    def admit(self, remaining_seconds: float) -> None:
+        with self._lock:
+            expected_wait = self._expected_wait_locked()
+            if self._queued >= self._max_queue_depth:
+                self._rejected += 1
+                raise AdmissionRejected("queue_full", expected_wait)
+            if expected_wait > remaining_seconds:
+                self._rejected += 1
+                raise AdmissionRejected("deadline", expected_wait)
+
+    def submit(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future[Any]:
+        """Enqueue ``fn``; raises ``AdmissionRejected`` if the queue is already full.
+
+        The depth check and the slot reservation happen under one lock, so
+        concurrent callers that all passed ``admit`` cannot overfill the queue.
+        """
+        enqueued_at = time.monotonic()
+        with self._lock:
+            if self._queued >= self._max_queue_depth:
+                self._rejected += 1
+                raise AdmissionRejected("queue_full", self._expected_wait_locked())
+            self._queued += 1
+
+        def run() -> Any:
+            started_at = time.monotonic()
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                waited = started_at - enqueued_at
+                self._wait_count += 1
+                self._wait_sum += waited
+                self._wait_max = max(self._wait_max, waited)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.monotonic() - started_at
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+                    self._service_ewma = (
+                        elapsed
+                        if self._service_ewma is None
+                        else self._alpha * elapsed + (1 - self._alpha) * self._service_ewma
+                    )
+
+        try:
+            future = self._pool.submit(run)
+        except BaseException:
+            # e.g. RuntimeError after shutdown: ``run`` will never free the slot.
+            with self._lock:
+                self._queued -= 1
+            raise
+
+        def on_done(done: Future[Any]) -> None:
+            # A future cancelled before it started never runs ``run``.
+            if done.cancelled():
+                with self._lock:
+                    self._queued -= 1
+
+        future.add_done_callback(on_done)
+        return future
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def stats(self) -> dict[str, float | int | None]:
+        with self._lock:
+            return {
+                "workers": self._max_workers,
+                "max_queue_depth": self._max_queue_depth,
+                "queue_depth": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "expected_wait_seconds": self._expected_wait_locked(),
+                "service_seconds_ewma": self._service_ewma,
+                "wait_seconds_count": self._wait_count,
+                "wait_seconds_sum": self._wait_sum,
+                "wait_seconds_max": self._wait_max,
+            }
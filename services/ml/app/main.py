@@ -1,20 +1,58 @@
+import asyncio
+import os
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
 from app.api.assess import router as assess_router
+from app.api.assess import shutdown_workers, warm_up_steps
 from app.api.chat import router as chat_router
 from app.api.health import router as health_router
+from app.api.metrics import router as metrics_router
 from app.api.pet import router as pet_router
 from app.api.plan import router as plan_router
 from app.api.predict import router as predict_router
 from app.core.config import settings
 from app.core.logging import configure_logging
+from app.core.readiness import readiness, run_warmup
+from app.core.timing import ServerTimingMiddleware
+from app.services.featherless_client import featherless_client
+from app.services.image_fetcher import image_fetcher
 
 configure_logging(settings.log_level)
 
-app = FastAPI(title=settings.app_name)
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    # Warm up off the event loop so /health answers while models load;
+    # /ready stays 503 until it finishes.
+    warmup_tasks: list[asyncio.Task[None]] = []
+    if settings.warmup_on_startup:
+        warmup_tasks.append(asyncio.create_task(asyncio.to_thread(run_warmup, warm_up_steps())))
+        # Pre-open the upstream LLM connection on the serving loop.
+        if os.getenv("FEATHERLESS_API_KEY"):
+            warmup_tasks.append(asyncio.create_task(featherless_client.warm_up()))
+    else:
+        readiness.mark_ready()
+    try:
+        yield
+    finally:
+        for task in warmup_tasks:
+            if not task.done():
+                task.cancel()
+        await image_fetcher.aclose()
+        await featherless_client.aclose()
+        # Joins the assess threads and SAM worker processes; off the loop.
+        await asyncio.to_thread(shutdown_workers)
+
+
+app = FastAPI(title=settings.app_name, lifespan=lifespan)
+app.add_middleware(ServerTimingMiddleware)
 app.include_router(health_router)
 app.include_router(predict_router)
 app.include_router(assess_router)
 app.include_router(plan_router)
 app.include_router(chat_router)
 app.include_router(pet_router)
+app.include_router(metrics_router)
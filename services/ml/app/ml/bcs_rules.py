@@ -7,6 +7,8 @@ DEFAULT_CONFIDENCE = 0.82
 LOW_LENGTH_THRESHOLD_PX = 120.0
 LOW_MASK_FILL_THRESHOLD = 0.35
 VERY_HIGH_BELLY_TUCK = 0.06
+MULTI_VIEW_CONFIDENCE_BONUS = 0.05
+CLASSIC_SEGMENTATION_PENALTY = 0.10
 
 
 def _normalize(text: str) -> str:
@@ -54,6 +56,31 @@ def _plausible_weight_for_breed(
     return min_weight <= float(weight_kg) <= max_weight
 
 
+def fuse_view_ratios(views: dict[str, dict[str, Any] | None]) -> dict[str, Any] | None:
+    """Combine per-view ratio features into one set.
+
+    The waist is judged from above and the abdominal tuck from the side, so
+    ``waist_to_chest`` comes from the top view and ``belly_tuck`` from the
+    side view when each is available; a top view alone cannot show the tuck,
+    so ``belly_tuck`` is ``None`` then. Everything else follows the side view,
+    falling back to whichever view segmented.
+    """
+    side = views.get("side")
+    top = views.get("top")
+    base = side or top or next((r for r in views.values() if r), None)
+    if not base:
+        return None
+
+    fused = dict(base)
+    if top:
+        fused["waist_to_chest"] = top.get("waist_to_chest", fused.get("waist_to_chest", 0.0))
+    if side:
+        fused["belly_tuck"] = side.get("belly_tuck", fused.get("belly_tuck", 0.0))
+    elif top:
+        fused["belly_tuck"] = None
+    return fused
+
+
 def classify_bcs_bucket(
     *,
     ratios: dict[str, Any] | None,
@@ -61,12 +88,21 @@ def classify_bcs_bucket(
     weight_kg: float | None = None,
     breed_top1: str | None = None,
     priors: dict[str, dict[str, dict[str, Any]]] | None = None,
+    views: dict[str, dict[str, Any] | None] | None = None,
 ) -> tuple[str, float, str]:
+    """Bucket a pet from its ratio features.
+
+    ``views`` maps view names ("side", "top") to per-view ratios; when given
+    they are fused with ``fuse_view_ratios`` and ``ratios`` is ignored.
+    """
+    segmented_views = {name: r for name, r in (views or {}).items() if r}
+    if views is not None:
+        ratios = fuse_view_ratios(segmented_views)
     if not ratios:
         return ("UNKNOWN", 0.50, UNKNOWN_NOTE)
 
     waist_to_chest = float(ratios.get("waist_to_chest", 0.0))
-    belly_tuck = float(ratios.get("belly_tuck", 0.0))
+    belly_tuck = float(ratios.get("belly_tuck") or 0.0)
 
     if waist_to_chest <= 0.70:
         bucket = "UNDERWEIGHT" if belly_tuck >= VERY_HIGH_BELLY_TUCK else "IDEAL"
@@ -78,16 +114,27 @@ def classify_bcs_bucket(
     confidence = DEFAULT_CONFIDENCE
     notes: list[str] = []
 
-    length_px = float(ratios.get("length_px", 0.0))
-    if length_px < LOW_LENGTH_THRESHOLD_PX:
+    checked = list(segmented_views.values()) or [ratios]
+    if any(float(r.get("length_px", 0.0)) < LOW_LENGTH_THRESHOLD_PX for r in checked):
         confidence -= 0.15
         notes.append("Low silhouette length; side/top view confidence reduced.")
 
-    mask_fill_ratio = _find_mask_fill_ratio(ratios)
-    if mask_fill_ratio is not None and mask_fill_ratio < LOW_MASK_FILL_THRESHOLD:
+    fill_ratios = [_find_mask_fill_ratio(r) for r in checked]
+    if any(fill is not None and fill < LOW_MASK_FILL_THRESHOLD for fill in fill_ratios):
         confidence -= 0.15
         notes.append("Mask occupies little of bbox; side/top view confidence reduced.")
 
+    if any(r.get("segmentation_source") == "classic" for r in checked):
+        confidence -= CLASSIC_SEGMENTATION_PENALTY
+        notes.append("Approximate fallback segmentation used; confidence reduced.")
+
+    if "side" in segmented_views and "top" in segmented_views:
+        confidence += MULTI_VIEW_CONFIDENCE_BONUS
+        notes.append("Side and top views combined.")
+    elif views is not None and len(views) > len(segmented_views):
+        missing = sorted(set(views) - set(segmented_views))
+        notes.append(f"No usable mask for {', '.join(missing)} view; assessed from one view.")
+
     if (
         weight_kg is not None
         and breed_top1
@@ -1,10 +1,13 @@
-import io
+import asyncio
 import re
 from typing import Any, Literal, TypedDict
 
-from PIL import Image
+from app.state.vision_cache import breed_bbox_cache
 
+from .decoded_image import DecodedImage
 from .featherless_vision_json import vision_json
+from .perceptual_hash import dhash
+from .vision_payload import prepare_vision_payload
 
 
 class BreedProb(TypedDict):
@@ -28,11 +31,6 @@ _PROMPT = (
 _SNAKE_CASE_RE = re.compile(r"^[a-z0-9]+(?:_[a-z0-9]+)*$")
 
 
-def _image_size(image_bytes: bytes) -> tuple[int, int]:
-    with Image.open(io.BytesIO(image_bytes)) as img:
-        return img.size
-
-
 def _normalize_species(value: Any) -> Literal["dog", "cat"]:
     species = str(value).strip().lower()
     if species not in {"dog", "cat"}:
@@ -101,12 +99,64 @@ def _normalize_bbox(value: Any, width: int, height: int) -> list[int]:
     return [x1, y1, x2, y2]
 
 
-def breed_bbox(image_bytes: bytes, mime: str) -> BreedBboxResult:
-    width, height = _image_size(image_bytes)
-    raw = vision_json(image_bytes=image_bytes, mime=mime, prompt_text=_PROMPT)
-
+def _to_fractions(bbox: list[int], width: int, height: int) -> list[float]:
+    x1, y1, x2, y2 = bbox
+    return [x1 / width, y1 / height, x2 / width, y2 / height]
+
+
+def _from_fractions(fractions: list[float], width: int, height: int) -> list[int]:
+    x1, y1, x2, y2 = fractions
+    return _normalize_bbox([x1 * width, y1 * height, x2 * width, y2 * height], width, height)
+
+
+async def breed_bbox(image: DecodedImage, deadline: float | None = None) -> BreedBboxResult:
+    """Species, top-3 breeds and pet bbox (original pixels) for ``image``.
+
+    Near-duplicate uploads (bursts, re-compressions, resized copies) are
+    answered from ``breed_bbox_cache`` by perceptual hash; the cached bbox
+    is stored as frame fractions and rescaled to this upload.
+    """
+    width, height = image.size
+    phash = await asyncio.to_thread(dhash, image.rgb)
+    aspect = width / max(1, height)
+    cached = breed_bbox_cache.get(phash, aspect)
+    if cached is not None:
+        return {
+            "species": cached["species"],
+            "breed_top3": cached["breed_top3"],
+            "bbox": _from_fractions(cached["bbox_fractions"], width, height),
+        }
+
+    result = await _classify(image, deadline)
+    breed_bbox_cache.put(
+        phash,
+        aspect,
+        {
+            "species": result["species"],
+            "breed_top3": result["breed_top3"],
+            "bbox_fractions": _to_fractions(result["bbox"], width, height),
+        },
+    )
+    return result
+
+
+async def _classify(image: DecodedImage, deadline: float | None) -> BreedBboxResult:
+    # The model sees a downsized re-encode; its bbox is in that image's pixels.
+    payload = await asyncio.to_thread(prepare_vision_payload, image)
+    raw = await vision_json(
+        image_bytes=payload.data,
+        mime=payload.mime,
+        prompt_text=_PROMPT,
+        deadline=deadline,
+    )
+
+    payload_w, payload_h = payload.size
+    bbox = _normalize_bbox(raw.get("bbox"), width=payload_w, height=payload_h)
+    if payload.resized:
+        width, height = image.size
+        bbox = _normalize_bbox(payload.to_original_bbox(bbox), width=width, height=height)
     return {
         "species": _normalize_species(raw.get("species")),
         "breed_top3": _normalize_breed_top3(raw.get("breed_top3")),
-        "bbox": _normalize_bbox(raw.get("bbox"), width=width, height=height),
+        "bbox": bbox,
     }
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from typing import Any, Protocol
+
+import numpy as np
+from app.core.timing import LatencyHistogram
+
+from .breed_bbox import BreedBboxResult
+from .compact_mask import CompactMask
+from .decoded_image import DecodedImage
+from .sam_backends import CancelCheck, ImageEmbedding
+from .segmenter import Segmenter
+
+logger = logging.getLogger(__name__)
+
+LOCAL_BREED_ROUTER = os.getenv("LOCAL_BREED_ROUTER", "true").strip().lower() in {
+    "1",
+    "true",
+    "yes",
+    "on",
+}
+# Raw softmax top-1 probability (over all breeds, not the renormalised top 3)
+# the local classifier needs before the remote call is skipped.
+LOCAL_BREED_MIN_CONFIDENCE = float(os.getenv("LOCAL_BREED_MIN_CONFIDENCE", "0.80"))
+# A whole-image SAM mask outside these frame-area fractions is not a usable pet bbox.
+LOCAL_BBOX_MIN_AREA = float(os.getenv("LOCAL_BBOX_MIN_AREA", "0.02"))
+LOCAL_BBOX_MAX_AREA = float(os.getenv("LOCAL_BBOX_MAX_AREA", "0.90"))
+# Margin added around the first mask's bbox for the refining prompt.
+LOCAL_BBOX_REFINE_PAD = 0.05
+
+
+class LocalBreedClassifier(Protocol):
+    def checkpoint_exists(self) -> bool: ...
+
+    def predict(self, image: Any, *, top_k: int = 3) -> Any: ...
+
+
+def _default_classifier() -> LocalBreedClassifier | None:
+    try:
+        from .model import OxfordPetBreedClassifier
+    except ImportError as exc:
+        logger.info("local breed classifier unavailable: %s", exc)
+        return None
+    return OxfordPetBreedClassifier()
+
+
+class HybridBreedRouter:
+    """Local-first breed + bbox: the Oxford-IIIT Pet CNN, then a SAM-derived bbox.
+
+    The remote vision call is only needed when the classifier is missing or
+    unsure, or when the whole-image SAM mask does not isolate one pet. Each
+    request is counted under exactly one outcome: ``local`` or a
+    ``remote:<reason>`` fallback.
+    """
+
+    def __init__(
+        self,
+        segmenter: Segmenter,
+        classifier: LocalBreedClassifier | None = None,
+        *,
+        enabled: bool = LOCAL_BREED_ROUTER,
+        min_confidence: float = LOCAL_BREED_MIN_CONFIDENCE,
+    ) -> None:
+        self._segmenter = segmenter
+        self._classifier = classifier
+        self._classifier_loaded = classifier is not None
+        # Unknown until the classifier is loaded off the event loop.
+        self._usable: bool | None = None
+        self._enabled = enabled
+        self._min_confidence = min_confidence
+        self._load_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._outcomes: dict[str, int] = {}
+        self._latency = {"local": LatencyHistogram(), "remote": LatencyHistogram()}
+
+    def _get_classifier(self) -> LocalBreedClassifier | None:
+        """The classifier when it and its checkpoint exist; imports torch on first use."""
+        with self._load_lock:
+            if not self._classifier_loaded:
+                self._classifier = _default_classifier()
+                self._classifier_loaded = True
+            if self._usable is None:
+                self._usable = (
+                    self._classifier is not None and self._classifier.checkpoint_exists()
+                )
+            return self._classifier if self._usable else None
+
+    @property
+    def available(self) -> bool:
+        """Whether the local path may run: enabled and not known to lack a classifier.
+
+        Cheap enough to read on the event loop; the classifier itself is only
+        loaded by ``warm_up`` or ``classify_local``, which run off the loop.
+        """
+        return self._enabled and self._usable is not False
+
+    def classify_local(
+        self,
+        image: DecodedImage,
+        min_confidence: float | None = None,
+    ) -> BreedBboxResult | None:
+        """Species and top-3 breeds when the classifier is confident, else ``None``.
+
+        ``min_confidence`` overrides the router's threshold, e.g. to accept
+        any local answer while the remote model is unavailable. The returned
+        ``bbox`` is empty; ``local_bbox`` fills it.
+        """
+        classifier = self._get_classifier()
+        if classifier is None:
+            return None
+        threshold = self._min_confidence if min_confidence is None else min_confidence
+        output = classifier.predict(image.rgb)
+        breed_top3 = [dict(item) for item in output.breed_top3]
+        # ``breed_top3`` is renormalised over three classes, so its ``p`` would
+        # make a diffuse guess look certain; gate on the raw softmax instead.
+        top1_p = getattr(output, "top1_p", None)
+        if not breed_top3 or top1_p is None or float(top1_p) < threshold:
+            return None
+        return {"species": output.species, "breed_top3": breed_top3, "bbox": []}
+
+    def local_bbox(
+        self,
+        image: DecodedImage,
+        embedding: ImageEmbedding,
+        cancel_check: CancelCheck | None = None,
+    ) -> list[int] | None:
+        """Pet bbox in original pixels from a whole-image SAM prompt, refined once.
+
+        The first mask's bbox, padded slightly, prompts a second pass that
+        tightens the box around the subject.
+        """
+        working_w, working_h = image.working_size
+        frame_area = float(working_w * working_h)
+        mask = self._segmenter.predict_compact_mask(embedding, None, cancel_check)
+        if not self._plausible(mask, frame_area):
+            return None
+
+        x1, y1, x2, y2 = mask.bbox
+        pad_x = int(round((x2 - x1) * LOCAL_BBOX_REFINE_PAD))
+        pad_y = int(round((y2 - y1) * LOCAL_BBOX_REFINE_PAD))
+        refined = self._segmenter.predict_compact_mask(
+            embedding,
+            [x1 - pad_x, y1 - pad_y, x2 + pad_x, y2 + pad_y],
+            cancel_check,
+        )
+        if self._plausible(refined, frame_area):
+            mask = refined
+        return image.to_original_bbox(list(mask.bbox))
+
+    @staticmethod
+    def _plausible(mask: CompactMask, frame_area: float) -> bool:
+        if mask.bbox is None or frame_area <= 0:
+            return False
+        x1, y1, x2, y2 = mask.bbox
+        box_area = (x2 - x1 + 1) * (y2 - y1 + 1)
+        return (
+            mask.area / frame_area >= LOCAL_BBOX_MIN_AREA
+            and box_area / frame_area <= LOCAL_BBOX_MAX_AREA
+        )
+
+    def warm_up(self) -> None:
+        """Load the classifier checkpoint and run one pass, when the local path is available."""
+        if not self._enabled:
+            return
+        classifier = self._get_classifier()
+        if classifier is None:
+            return
+        classifier.predict(np.full((64, 64, 3), 127, dtype=np.uint8))
+
+    def record(self, outcome: str, duration_ms: float) -> None:
+        """Count one routed request; ``outcome`` is "local[:<reason>]" or "remote:<reason>"."""
+        path = "remote" if outcome.startswith("remote") else "local"
+        with self._lock:
+            self._outcomes[outcome] = self._outcomes.get(outcome, 0) + 1
+            self._latency[path].observe(duration_ms)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            outcomes = dict(self._outcomes)
+            latency = {path: histogram.snapshot() for path, histogram in self._latency.items()}
+        total = sum(outcomes.values())
+        local = sum(count for outcome, count in outcomes.items() if outcome.startswith("local"))
+        return {
+            "enabled": self._enabled,
+            "min_confidence": self._min_confidence,
+            "requests": total,
+            "local_hit_rate": (local / total) if total else 0.0,
+            "outcomes": outcomes,
+            "latency_ms": latency,
+        }
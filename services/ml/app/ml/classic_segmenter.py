@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import numpy as np
+
+from .sam_backends import CancelCheck, ImageEmbedding
+
+# Longest side of the downsampled region the colour model runs on.
+WORK_SIDE = 160
+COLOR_CLUSTERS = 3
+REFINE_ITERATIONS = 3
+# Context outside the bbox used as background evidence, as a fraction of its size.
+CONTEXT_MARGIN = 0.15
+
+
+def _kmeans(samples: np.ndarray, k: int, iterations: int = 6) -> np.ndarray:
+    """Tiny deterministic k-means on RGB samples; returns ``[k, 3]`` centres."""
+    if samples.shape[0] == 0:
+        return np.zeros((1, 3), dtype=np.float32)
+    k = min(k, samples.shape[0])
+    # Seed from luminance quantiles so results do not depend on an RNG.
+    order = np.argsort(samples.sum(axis=1))
+    centres = samples[order[np.linspace(0, order.size - 1, k).astype(int)]].copy()
+    for _ in range(iterations):
+        labels = _nearest_centre(samples, centres)[1]
+        for index in range(k):
+            members = samples[labels == index]
+            if members.size:
+                centres[index] = members.mean(axis=0)
+    return centres
+
+
+def _nearest_centre(pixels: np.ndarray, centres: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    distances = ((pixels[:, None, :] - centres[None, :, :]) ** 2).sum(axis=2)
+    labels = np.argmin(distances, axis=1)
+    return distances[np.arange(pixels.shape[0]), labels], labels
+
+
+def _majority_filter(mask: np.ndarray, radius: int = 2) -> np.ndarray:
+    """Box-window majority vote via an integral image."""
+    padded = np.pad(mask.astype(np.int32), radius + 1, mode="edge")
+    integral = padded.cumsum(axis=0).cumsum(axis=1)
+    size = 2 * radius + 1
+    window = (
+        integral[size:, size:]
+        - integral[:-size, size:]
+        - integral[size:, :-size]
+        + integral[:-size, :-size]
+    )
+    height, width = mask.shape
+    return window[:height, :width] * 2 > size * size
+
+
+def _dilate(mask: np.ndarray) -> np.ndarray:
+    grown = mask.copy()
+    grown[1:, :] |= mask[:-1, :]
+    grown[:-1, :] |= mask[1:, :]
+    grown[:, 1:] |= mask[:, :-1]
+    grown[:, :-1] |= mask[:, 1:]
+    return grown
+
+
+def _reconstruct(seed: np.ndarray, allowed: np.ndarray) -> np.ndarray:
+    """Pixels of ``allowed`` 4-connected to ``seed`` (morphological reconstruction)."""
+    region = seed & allowed
+    while True:
+        grown = _dilate(region) & allowed
+        if np.array_equal(grown, region):
+            return region
+        region = grown
+
+
+def segment_by_color(
+    image_rgb: np.ndarray,
+    box_xyxy: list[int],
+    cancel_check: CancelCheck | None = None,
+) -> np.ndarray:
+    """GrabCut-style foreground estimate inside ``box_xyxy`` from colour clusters.
+
+    Background colours are learnt from a margin around the box, foreground
+    colours from its centre, then labels are refined a few times, smoothed,
+    restricted to the component under the box centre and hole-filled. Runs
+    on a downsampled copy; returns a boolean mask the size of ``image_rgb``.
+    """
+    height, width = image_rgb.shape[:2]
+    x1, y1, x2, y2 = box_xyxy
+    box_w, box_h = x2 - x1 + 1, y2 - y1 + 1
+    cx1 = max(0, x1 - int(box_w * CONTEXT_MARGIN))
+    cy1 = max(0, y1 - int(box_h * CONTEXT_MARGIN))
+    cx2 = min(width - 1, x2 + int(box_w * CONTEXT_MARGIN))
+    cy2 = min(height - 1, y2 + int(box_h * CONTEXT_MARGIN))
+
+    step = max(1, int(np.ceil(max(cx2 - cx1 + 1, cy2 - cy1 + 1) / WORK_SIDE)))
+    region = image_rgb[cy1 : cy2 + 1 : step, cx1 : cx2 + 1 : step].astype(np.float32)
+    rows, cols = region.shape[:2]
+    yy, xx = np.mgrid[:rows, :cols]
+    yy = yy * step + cy1
+    xx = xx * step + cx1
+    in_box = (xx >= x1) & (xx <= x2) & (yy >= y1) & (yy <= y2)
+
+    # Normalised elliptical distance from the box centre: 0 at centre, 1 at the box edge.
+    radius = np.sqrt(
+        ((xx - (x1 + x2) / 2.0) / max(1.0, box_w / 2.0)) ** 2
+        + ((yy - (y1 + y2) / 2.0) / max(1.0, box_h / 2.0)) ** 2
+    )
+    background = ~in_box
+    if np.count_nonzero(background) < 32:
+        # Box covers the frame: fall back to its outer ring.
+        background = radius >= 0.95
+    foreground = in_box & (radius <= 0.4)
+
+    pixels = region.reshape(-1, 3)
+    box_index = np.flatnonzero(in_box.ravel())
+    labels = foreground.ravel()[box_index]
+    # Background colours come only from outside the box: in-box pixels
+    # labelled background would pull pet colours into the model.
+    bg_centres = _kmeans(pixels[background.ravel()], COLOR_CLUSTERS)
+    for _ in range(REFINE_ITERATIONS):
+        if cancel_check is not None:
+            cancel_check()
+        fg_centres = _kmeans(pixels[box_index[labels]], COLOR_CLUSTERS)
+        fg_distance = _nearest_centre(pixels[box_index], fg_centres)[0]
+        bg_distance = _nearest_centre(pixels[box_index], bg_centres)[0]
+        # Spatial prior: the pet is more likely near the centre of its bbox.
+        prior = 1.0 + 0.5 * radius.ravel()[box_index] ** 2
+        labels = fg_distance * prior < bg_distance
+
+    low_res = np.zeros((rows, cols), dtype=bool)
+    low_res.ravel()[box_index] = labels
+    low_res = _majority_filter(low_res) & in_box
+    centre = in_box & (radius <= 0.25)
+    component = _reconstruct(centre, low_res)
+    if not component.any():
+        component = low_res
+    # Fill holes: background pixels not reachable from the region border.
+    border = np.zeros_like(component)
+    border[[0, -1], :] = True
+    border[:, [0, -1]] = True
+    outside = _reconstruct(border, ~component)
+    filled = ~outside
+
+    mask = np.zeros((height, width), dtype=bool)
+    up_rows = np.minimum((np.arange(cy1, cy2 + 1) - cy1) // step, rows - 1)
+    up_cols = np.minimum((np.arange(cx1, cx2 + 1) - cx1) // step, cols - 1)
+    mask[cy1 : cy2 + 1, cx1 : cx2 + 1] = filled[np.ix_(up_rows, up_cols)]
+    return mask
+
+
+class ClassicSegmenterBackend:
+    """CPU colour-model segmentation with the ``SamBackend`` interface.
+
+    There is no learnt image encoder: the "embedding" is the image itself,
+    so ``Segmenter`` caching and bbox handling work unchanged.
+    """
+
+    def encode(self, image_rgb: np.ndarray, cancel_check: CancelCheck | None = None) -> ImageEmbedding:
+        if cancel_check is not None:
+            cancel_check()
+        size = tuple(image_rgb.shape[:2])
+        return ImageEmbedding(features=image_rgb, original_size=size, input_size=size)
+
+    def encode_batch(
+        self,
+        images_rgb: list[np.ndarray],
+        cancel_check: CancelCheck | None = None,
+    ) -> list[ImageEmbedding]:
+        return [self.encode(image_rgb, cancel_check) for image_rgb in images_rgb]
+
+    def decode(
+        self,
+        embedding: ImageEmbedding,
+        box_xyxy: list[int],
+        cancel_check: CancelCheck | None = None,
+    ) -> np.ndarray:
+        return segment_by_color(embedding.features, box_xyxy, cancel_check)
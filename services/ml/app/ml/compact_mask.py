@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class CompactMask:
+    """Binary mask stored as a boolean crop of its bounding box.
+
+    ``bbox`` is ``(x1, y1, x2, y2)`` with inclusive corners in frame pixels;
+    ``area`` is the foreground pixel count. An empty mask has a ``(0, 0)``
+    crop and ``bbox`` of ``None``.
+    """
+
+    crop: np.ndarray
+    bbox: tuple[int, int, int, int] | None
+    frame_size: tuple[int, int]
+    area: int
+
+    @classmethod
+    def from_dense(cls, mask: np.ndarray) -> CompactMask:
+        """Build from a full-frame mask where any non-zero value is foreground."""
+        if not isinstance(mask, np.ndarray):
+            raise TypeError("mask must be a numpy array")
+        if mask.ndim != 2:
+            raise ValueError("mask must be a 2D array")
+
+        height, width = mask.shape
+        # Row/column reductions avoid a full-frame boolean temporary.
+        rows = np.flatnonzero(mask.any(axis=1))
+        if rows.size == 0:
+            return cls(
+                crop=np.zeros((0, 0), dtype=bool),
+                bbox=None,
+                frame_size=(height, width),
+                area=0,
+            )
+        cols = np.flatnonzero(mask.any(axis=0))
+        y1, y2 = int(rows[0]), int(rows[-1])
+        x1, x2 = int(cols[0]), int(cols[-1])
+        crop = mask[y1 : y2 + 1, x1 : x2 + 1]
+        if crop.dtype != np.bool_:
+            crop = crop != 0
+        else:
+            crop = crop.copy()
+        return cls(
+            crop=crop,
+            bbox=(x1, y1, x2, y2),
+            frame_size=(height, width),
+            area=int(np.count_nonzero(crop)),
+        )
+
+    @property
+    def empty(self) -> bool:
+        return self.area == 0
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        """Shape of the full frame the mask was cut from, as ``(height, width)``."""
+        return self.frame_size
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.crop.nbytes)
+
+    def packbits(self) -> np.ndarray:
+        """Bit-packed crop (8 pixels per byte) for storage or transfer."""
+        return np.packbits(self.crop, axis=None)
+
+    def to_dense(self, dtype: np.dtype | type = np.uint8, value: int = 1) -> np.ndarray:
+        dense = np.zeros(self.frame_size, dtype=dtype)
+        if self.bbox is not None:
+            x1, y1, x2, y2 = self.bbox
+            dense[y1 : y2 + 1, x1 : x2 + 1][self.crop] = value
+        return dense
+
+    def fill_ratio(self, bbox: list[int] | tuple[int, int, int, int]) -> float:
+        """Foreground area over the area of ``bbox`` (x1, y1, x2, y2)."""
+        x1, y1, x2, y2 = bbox
+        return float(self.area / max(1, (x2 - x1) * (y2 - y1)))
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import hashlib
+import io
+from dataclasses import dataclass
+from functools import cached_property
+
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+
+_FORMAT_MIME: dict[str, str] = {
+    "JPEG": "image/jpeg",
+    "PNG": "image/png",
+    "WEBP": "image/webp",
+    "GIF": "image/gif",
+}
+
+
+@dataclass(frozen=True)
+class DecodedImage:
+    """One upload decoded once and shared by every assess stage.
+
+    ``size`` is always the original (width, height). ``rgb`` may be a
+    downscaled working copy; ``scale_x``/``scale_y`` map original pixel
+    coordinates onto it.
+    """
+
+    data: bytes
+    format: str
+    size: tuple[int, int]
+    rgb: np.ndarray
+    fallback_mime: str | None = None
+
+    @property
+    def width(self) -> int:
+        return self.size[0]
+
+    @property
+    def height(self) -> int:
+        return self.size[1]
+
+    @property
+    def working_size(self) -> tuple[int, int]:
+        return (int(self.rgb.shape[1]), int(self.rgb.shape[0]))
+
+    @property
+    def scale_x(self) -> float:
+        return self.working_size[0] / max(1, self.width)
+
+    @property
+    def scale_y(self) -> float:
+        return self.working_size[1] / max(1, self.height)
+
+    @property
+    def scale(self) -> float:
+        return (self.scale_x + self.scale_y) / 2.0
+
+    def to_working_bbox(self, bbox: list[int]) -> list[int]:
+        x1, y1, x2, y2 = bbox
+        working_w, working_h = self.working_size
+        return [
+            max(0, min(working_w - 1, int(round(x1 * self.scale_x)))),
+            max(0, min(working_h - 1, int(round(y1 * self.scale_y)))),
+            max(0, min(working_w - 1, int(round(x2 * self.scale_x)))),
+            max(0, min(working_h - 1, int(round(y2 * self.scale_y)))),
+        ]
+
+    def to_original_bbox(self, bbox: list[int]) -> list[int]:
+        x1, y1, x2, y2 = bbox
+        return [
+            max(0, min(self.width - 1, int(round(x1 / self.scale_x)))),
+            max(0, min(self.height - 1, int(round(y1 / self.scale_y)))),
+            max(0, min(self.width - 1, int(round(x2 / self.scale_x)))),
+            max(0, min(self.height - 1, int(round(y2 / self.scale_y)))),
+        ]
+
+    def to_original_length(self, length_px: float) -> float:
+        return float(length_px) / self.scale if self.scale > 0 else float(length_px)
+
+    @cached_property
+    def content_hash(self) -> str:
+        return hashlib.sha256(self.data).hexdigest()
+
+    @property
+    def mime(self) -> str:
+        mime = _FORMAT_MIME.get(self.format)
+        if mime:
+            return mime
+        if self.fallback_mime and self.fallback_mime.startswith("image/"):
+            return self.fallback_mime
+        return "application/octet-stream"
+
+
+def _working_dims(width: int, height: int, max_side: int | None) -> tuple[int, int]:
+    if not max_side or max(width, height) <= max_side:
+        return width, height
+    factor = max_side / float(max(width, height))
+    return max(1, int(round(width * factor))), max(1, int(round(height * factor)))
+
+
+def decode_image(
+    image_bytes: bytes,
+    fallback_mime: str | None = None,
+    *,
+    max_side: int | None = None,
+) -> DecodedImage:
+    """Open ``image_bytes`` with PIL exactly once.
+
+    With ``max_side`` the RGB array is produced directly at a working
+    resolution whose long side is at most ``max_side``; JPEGs are scaled
+    during DCT decoding so the full-resolution frame is never materialised.
+
+    Raises ``ValueError`` when the bytes are not a decodable image.
+    """
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            fmt = (img.format or "").upper()
+            width, height = img.size
+            target = _working_dims(width, height, max_side)
+            if target != (width, height):
+                img.draft("RGB", target)
+            rgb_img = img.convert("RGB")
+            if rgb_img.size != target:
+                rgb_img = rgb_img.resize(target, Image.Resampling.BILINEAR)
+            rgb = np.asarray(rgb_img, dtype=np.uint8)
+    except (UnidentifiedImageError, OSError) as exc:
+        raise ValueError("Could not decode image bytes.") from exc
+
+    return DecodedImage(
+        data=image_bytes,
+        format=fmt,
+        size=(int(width), int(height)),
+        rgb=rgb,
+        fallback_mime=fallback_mime,
+    )
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any
+
+
+def _nbytes(value: Any) -> int:
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    # torch.Tensor has no nbytes on older releases.
+    element_size = getattr(value, "element_size", None)
+    nelement = getattr(value, "nelement", None)
+    if callable(element_size) and callable(nelement):
+        return int(element_size()) * int(nelement())
+    return 0
+
+
+class EmbeddingCache:
+    """Thread-safe LRU of image embeddings bounded by entry count and bytes."""
+
+    def __init__(self, max_entries: int = 32, max_bytes: int = 256 * 1024 * 1024) -> None:
+        self._max_entries = max(0, max_entries)
+        self._max_bytes = max(0, max_bytes)
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[Any, int]] = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def put(self, key: str, embedding: Any, nbytes: int | None = None) -> None:
+        size = _nbytes(getattr(embedding, "features", embedding)) if nbytes is None else nbytes
+        if self._max_entries == 0 or size > self._max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (embedding, size)
+            self._bytes += size
+            while len(self._entries) > self._max_entries or self._bytes > self._max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self._max_entries,
+                "max_bytes": self._max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+            }
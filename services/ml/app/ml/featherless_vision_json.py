@@ -1,41 +1,15 @@
 import base64
 import json
-import os
 from json import JSONDecodeError
 from typing import Any
 
-from openai import APIConnectionError, APITimeoutError, OpenAI
-
-DEFAULT_FEATHERLESS_BASE_URL = "https://api.featherless.ai/v1"
-FEATHERLESS_BASE_URL = os.getenv("FEATHERLESS_BASE_URL", DEFAULT_FEATHERLESS_BASE_URL)
-FEATHERLESS_SECRET_HEADER = os.getenv(
-    "FEATHERLESS_SECRET_HEADER", "X-Featherless-Secret-Key"
+from app.services.featherless_client import (
+    REQUEST_TIMEOUT_SECONDS,
+    VISION_MODEL,
+    featherless_client,
+    upstream_for,
 )
-VISION_MODEL = os.getenv("VISION_MODEL", "google/gemma-3-27b-it")
-REQUEST_TIMEOUT_SECONDS = float(os.getenv("FEATHERLESS_REQUEST_TIMEOUT_SECONDS", "30"))
-RETRY_ATTEMPTS = 1
-
-_client: OpenAI | None = None
-
-
-def _get_client() -> OpenAI:
-    global _client
-    if _client is None:
-        api_key = os.getenv("FEATHERLESS_API_KEY")
-        if not api_key:
-            raise RuntimeError("FEATHERLESS_API_KEY is not set")
-        default_headers: dict[str, str] = {}
-        secret_key = os.getenv("FEATHERLESS_SECRET_KEY")
-        if secret_key:
-            default_headers[FEATHERLESS_SECRET_HEADER] = secret_key
-        _client = OpenAI(
-            api_key=api_key,
-            base_url=FEATHERLESS_BASE_URL,
-            timeout=REQUEST_TIMEOUT_SECONDS,
-            max_retries=0,
-            default_headers=default_headers,
-        )
-    return _client
+from app.services.resilience import OPEN
 
 
 def _extract_first_json_object(text: str) -> str | None:
@@ -86,12 +60,18 @@ def _parse_json_response(full: str) -> dict[str, Any]:
         raise ValueError("Extracted JSON is not a JSON object")
 
 
-def _request_vision_json(image_bytes: bytes, mime: str, prompt_text: str) -> str:
+async def _request_vision_json(
+    image_bytes: bytes,
+    mime: str,
+    prompt_text: str,
+    timeout_seconds: float = REQUEST_TIMEOUT_SECONDS,
+) -> str:
     image_b64 = base64.b64encode(image_bytes).decode("ascii")
     data_url = f"data:{mime};base64,{image_b64}"
-    response = _get_client().chat.completions.create(
+    return await featherless_client.complete(
         model=VISION_MODEL,
         response_format={"type": "json_object"},
+        timeout_seconds=timeout_seconds,
         messages=[
             {
                 "role": "user",
@@ -108,21 +88,30 @@ def _request_vision_json(image_bytes: bytes, mime: str, prompt_text: str) -> str
             }
         ],
     )
-    content = response.choices[0].message.content
-    return content if content is not None else ""
-
-
-def vision_json(image_bytes: bytes, mime: str, prompt_text: str) -> dict[str, Any]:
-    full = ""
-    for attempt in range(RETRY_ATTEMPTS + 1):
-        try:
-            full = _request_vision_json(
-                image_bytes=image_bytes,
-                mime=mime,
-                prompt_text=prompt_text,
-            )
-            break
-        except (APIConnectionError, APITimeoutError):
-            if attempt >= RETRY_ATTEMPTS:
-                raise
+
+
+async def vision_json(
+    image_bytes: bytes,
+    mime: str,
+    prompt_text: str,
+    deadline: float | None = None,
+) -> dict[str, Any]:
+    """Call the vision model; ``deadline`` (``time.monotonic()``) caps every attempt and backoff.
+
+    Raises ``CircuitOpenError`` without calling out while the vision breaker is open.
+    """
+    full = await upstream_for(VISION_MODEL).call(
+        lambda timeout_seconds: _request_vision_json(
+            image_bytes=image_bytes,
+            mime=mime,
+            prompt_text=prompt_text,
+            timeout_seconds=timeout_seconds,
+        ),
+        deadline=deadline,
+    )
     return _parse_json_response(full)
+
+
+def vision_circuit_open() -> bool:
+    """Whether vision calls are currently failing fast."""
+    return upstream_for(VISION_MODEL).breaker.state == OPEN
@@ -70,7 +70,10 @@ class ModelArtifacts:
 @dataclass(frozen=True)
 class BreedModelOutput:
     species: str
+    # ``p`` is renormalised over the top 3; ``top1_p`` is the raw softmax
+    # probability of the first breed over all classes.
     breed_top3: list[dict[str, Any]]
+    top1_p: float | None = None
 
 
 def resolve_checkpoint_path(path: str | os.PathLike[str] | None = None) -> Path:
@@ -182,4 +185,5 @@ class OxfordPetBreedClassifier:
         logits = artifacts.model(tensor)[0].detach().cpu()
         breed_top3 = topk_breed_probs(logits, labels=artifacts.labels, top_k=top_k)
         species = infer_species(breed_top3, cat_breeds=artifacts.cat_breeds)
-        return BreedModelOutput(species=species, breed_top3=breed_top3)
+        top1_p = float(torch.softmax(logits, dim=0).max())
+        return BreedModelOutput(species=species, breed_top3=breed_top3, top1_p=top1_p)
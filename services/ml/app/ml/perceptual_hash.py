@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import numpy as np
+from PIL import Image
+
+HASH_BITS = 64
+
+
+def dhash(image_rgb: np.ndarray, hash_size: int = 8) -> int:
+    """Difference hash: sign of horizontal gradients on a ``hash_size``-square thumbnail.
+
+    Robust to rescaling and recompression; near-identical photos land a few
+    bits apart.
+    """
+    gray = Image.fromarray(image_rgb).convert("L")
+    thumb = np.asarray(
+        gray.resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR),
+        dtype=np.int16,
+    )
+    bits = (thumb[:, 1:] > thumb[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+
+from .bcs_rules import classify_bcs_bucket
+from .ratio_features import extract_ratio_features
+
+RESOLUTIONS: tuple[int, ...] = (256, 512, 1024, 2048, 4096)
+# Frames are landscape, like typical side-view pet photos.
+FRAME_ASPECT = 0.6
+DEFAULT_THRESHOLDS_PATH = Path(__file__).resolve().parents[2] / "benchmarks" / "ratio_thresholds.json"
+# Thresholds are recorded as measured p50 times this factor, but never below
+# the metric's floor: sub-millisecond timings are mostly scheduler noise.
+DEFAULT_HEADROOM = 2.0
+THRESHOLD_FLOORS: dict[str, float] = {
+    "extract_ratio_features_ms": 2.0,
+    "classify_bcs_bucket_us": 50.0,
+}
+METRICS = tuple(THRESHOLD_FLOORS)
+# Bucketing does not depend on mask resolution, so it is one case, not one per frame.
+CLASSIFY_CASE = "classify_bcs_bucket"
+CLASSIFY_RATIOS: dict[str, Any] = {
+    "length_px": 420.0,
+    "waist_to_chest": 0.78,
+    "width_profile": [0.9, 0.88, 0.85, 0.8, 0.78],
+    "belly_tuck": 0.03,
+    "mask_fill_bbox_ratio": 0.7,
+}
+
+
+@dataclass(frozen=True)
+class SilhouetteCase:
+    name: str
+    width: int
+    build: Callable[[int, int], np.ndarray]
+
+    @property
+    def height(self) -> int:
+        return max(1, int(round(self.width * FRAME_ASPECT)))
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}-{self.width}"
+
+
+def _grid(height: int, width: int) -> tuple[np.ndarray, np.ndarray]:
+    yy, xx = np.mgrid[:height, :width]
+    return xx.astype(np.float32) / width, yy.astype(np.float32) / height
+
+
+def ellipse_mask(height: int, width: int) -> np.ndarray:
+    """Rotated ellipse covering about half the frame width."""
+    x, y = _grid(height, width)
+    x = (x - 0.5) * width
+    y = (y - 0.5) * height
+    angle = np.deg2rad(12.0)
+    u = x * np.cos(angle) + y * np.sin(angle)
+    v = -x * np.sin(angle) + y * np.cos(angle)
+    return ((u / (0.3 * width)) ** 2 + (v / (0.2 * height)) ** 2 <= 1.0).astype(np.uint8)
+
+
+def tapered_mask(height: int, width: int) -> np.ndarray:
+    """Body that narrows from chest to rear with a belly tuck, as in the unit tests."""
+    x, y = _grid(height, width)
+    t = np.clip((x - 0.1) / 0.8, 0.0, 1.0)
+    half_width = 0.17 - 0.07 * t
+    tuck = np.where(t <= 0.5, 0.0, 0.085 * (t - 0.5) / 0.5)
+    inside_x = (x >= 0.1) & (x <= 0.9)
+    return (inside_x & (y >= 0.5 - half_width) & (y <= 0.5 + half_width - tuck)).astype(np.uint8)
+
+
+def noisy_mask(height: int, width: int) -> np.ndarray:
+    """Ellipse with a ragged, speckled edge like a soft SAM boundary."""
+    rng = np.random.default_rng(width)
+    x, y = _grid(height, width)
+    radius = ((x - 0.5) / 0.32) ** 2 + ((y - 0.5) / 0.22) ** 2
+    theta = np.arctan2(y - 0.5, x - 0.5)
+    edge = 1.0 + 0.08 * np.sin(9.0 * theta) + rng.normal(0.0, 0.04, size=radius.shape)
+    return (radius <= edge).astype(np.uint8)
+
+
+SHAPES: dict[str, Callable[[int, int], np.ndarray]] = {
+    "ellipse": ellipse_mask,
+    "tapered": tapered_mask,
+    "noisy": noisy_mask,
+}
+
+
+def build_cases(resolutions: tuple[int, ...] = RESOLUTIONS) -> list[SilhouetteCase]:
+    return [
+        SilhouetteCase(name=name, width=width, build=build)
+        for width in resolutions
+        for name, build in SHAPES.items()
+    ]
+
+
+def _time_ms(fn: Callable[[], Any], repeats: int) -> list[float]:
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000.0)
+    return samples
+
+
+def _summary(samples: list[float]) -> dict[str, float]:
+    return {
+        "p50": statistics.median(samples),
+        "min": min(samples),
+        "max": max(samples),
+    }
+
+
+def run_case(case: SilhouetteCase, repeats: int) -> dict[str, Any]:
+    mask = case.build(case.height, case.width)
+    extract_samples = _time_ms(lambda: extract_ratio_features(mask), repeats)
+    return {
+        "case": case.key,
+        "shape": [case.height, case.width],
+        "foreground_px": int(np.count_nonzero(mask)),
+        "extract_ratio_features_ms": _summary(extract_samples),
+    }
+
+
+def run_classify_case(repeats: int, loops: int = 5000) -> dict[str, Any]:
+    """Per-call time of ``classify_bcs_bucket`` as ``/assess`` calls it, in microseconds."""
+
+    def classify_many() -> None:
+        for _ in range(loops):
+            classify_bcs_bucket(
+                ratios=CLASSIFY_RATIOS,
+                species="dog",
+                weight_kg=20.0,
+                breed_top1="beagle",
+                priors=None,
+            )
+
+    samples = [sample * 1000.0 / loops for sample in _time_ms(classify_many, repeats)]
+    return {"case": CLASSIFY_CASE, "classify_bcs_bucket_us": _summary(samples)}
+
+
+def check_thresholds(
+    results: list[dict[str, Any]],
+    thresholds: dict[str, dict[str, float]],
+) -> list[str]:
+    """Return one message per case whose p50 exceeds its recorded threshold."""
+    failures = []
+    for result in results:
+        limits = thresholds.get(result["case"])
+        if not limits:
+            continue
+        for metric in METRICS:
+            if metric not in result:
+                continue
+            limit = limits.get(metric)
+            measured = result[metric]["p50"]
+            result.setdefault("thresholds", {})[metric] = limit
+            if limit is not None and measured > limit:
+                failures.append(f"{result['case']} {metric}: p50 {measured:.3f} > {limit:.3f}")
+    return failures
+
+
+def thresholds_from_results(
+    results: list[dict[str, Any]],
+    headroom: float = DEFAULT_HEADROOM,
+) -> dict[str, dict[str, float]]:
+    return {
+        result["case"]: {
+            metric: round(max(THRESHOLD_FLOORS[metric], result[metric]["p50"] * headroom), 3)
+            for metric in METRICS
+            if metric in result
+        }
+        for result in results
+    }
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Benchmark extract_ratio_features and classify_bcs_bucket on synthetic masks."
+    )
+    parser.add_argument("--resolutions", type=int, nargs="+", default=list(RESOLUTIONS))
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--thresholds", type=Path, default=DEFAULT_THRESHOLDS_PATH)
+    parser.add_argument("--output", type=Path, default=None, help="Write the JSON results here")
+    parser.add_argument(
+        "--write-thresholds",
+        action="store_true",
+        help="Record this run's p50 times headroom as the new thresholds",
+    )
+    parser.add_argument("--headroom", type=float, default=DEFAULT_HEADROOM)
+    return parser
+
+
+def main() -> int:
+    args = _build_parser().parse_args()
+    results = [run_case(case, args.repeats) for case in build_cases(tuple(args.resolutions))]
+    results.append(run_classify_case(args.repeats))
+
+    if args.write_thresholds:
+        args.thresholds.parent.mkdir(parents=True, exist_ok=True)
+        args.thresholds.write_text(
+            json.dumps(thresholds_from_results(results, args.headroom), indent=2) + "\n",
+            encoding="utf-8",
+        )
+        failures: list[str] = []
+    elif args.thresholds.exists():
+        thresholds = json.loads(args.thresholds.read_text(encoding="utf-8"))
+        failures = check_thresholds(results, thresholds)
+    else:
+        failures = []
+
+    report = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "passed": not failures,
+        "failures": failures,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output is not None:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    sys.stdout.write(text + "\n")
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,34 +4,24 @@ from typing import Any
 
 import numpy as np
 
+from .compact_mask import CompactMask
+
 SLICE_FRACTIONS: tuple[float, ...] = (0.20, 0.35, 0.50, 0.65, 0.80)
 
 
-def _slice_points(
-    centered_points: np.ndarray,
+def _nearest_points_slice(
     axis_coords: np.ndarray,
     target_u: float,
-    band_half_width: float,
 ) -> np.ndarray:
-    mask = np.abs(axis_coords - target_u) <= band_half_width
-    if np.any(mask):
-        return centered_points[mask]
-
     # If a thin/aliased mask has no points inside the nominal slice band,
     # use the closest points so slice widths remain stable.
-    nearest_count = min(64, centered_points.shape[0])
-    nearest_idx = np.argpartition(np.abs(axis_coords - target_u), nearest_count - 1)[
-        :nearest_count
-    ]
-    return centered_points[nearest_idx]
+    nearest_count = min(64, axis_coords.shape[0])
+    return np.argpartition(np.abs(axis_coords - target_u), nearest_count - 1)[:nearest_count]
 
 
-def _pca_major_axis(points_xy: np.ndarray) -> np.ndarray:
-    if points_xy.shape[0] < 2:
-        return np.array([1.0, 0.0], dtype=np.float64)
-
-    covariance = np.cov(points_xy, rowvar=False)
-    eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+def _moments_major_axis(mu20: float, mu02: float, mu11: float) -> np.ndarray:
+    """Major axis from the central second moments of the mask."""
+    eigenvalues, eigenvectors = np.linalg.eigh(np.array([[mu20, mu11], [mu11, mu02]]))
     major = eigenvectors[:, int(np.argmax(eigenvalues))]
 
     norm = float(np.linalg.norm(major))
@@ -44,38 +34,66 @@ def _pca_major_axis(points_xy: np.ndarray) -> np.ndarray:
     return major
 
 
-def extract_ratio_features(mask_uint8: np.ndarray) -> dict[str, Any]:
+def _band_ids(u: np.ndarray, lows: np.ndarray, highs: np.ndarray) -> np.ndarray:
+    """Index of the slice band containing each ``u`` (inclusive edges), or -1.
+
+    Requires non-overlapping bands sorted along ``u``; one ``searchsorted``
+    over the interleaved edges tags every point.
+    """
+    edges = np.empty(lows.size * 2, dtype=np.float64)
+    edges[0::2] = lows
+    # Half-open search with the next float above each high keeps it inclusive.
+    edges[1::2] = np.nextafter(highs, np.inf)
+    position = np.searchsorted(edges, u, side="right")
+    return np.where(position & 1, position >> 1, -1)
+
+
+def extract_ratio_features(mask_uint8: np.ndarray | CompactMask) -> dict[str, Any]:
     """Compute geometric ratio features from a binary mask (0/1 values).
 
+    A ``CompactMask`` is used as-is: it is already cropped to its bounding box.
+
     Returns:
       - length_px: major-axis extent in pixels
       - waist_to_chest: width at 65% / width at 35%
       - width_profile: five widths sampled along major axis and normalized by length
       - belly_tuck: normalized lower-silhouette rise from 50% to 80% along major axis
     """
-    if not isinstance(mask_uint8, np.ndarray):
-        raise TypeError("mask_uint8 must be a numpy array")
-    if mask_uint8.ndim != 2:
-        raise ValueError("mask_uint8 must be a 2D array")
-
-    ys, xs = np.where(mask_uint8 > 0)
-    if xs.size == 0:
+    if isinstance(mask_uint8, CompactMask):
+        compact = mask_uint8
+    else:
+        if not isinstance(mask_uint8, np.ndarray):
+            raise TypeError("mask_uint8 must be a numpy array")
+        if mask_uint8.ndim != 2:
+            raise ValueError("mask_uint8 must be a 2D array")
+        # Crop to the bounding box before materialising coordinates.
+        compact = CompactMask.from_dense(mask_uint8)
+    if compact.bbox is None:
         return {
             "length_px": 0.0,
             "waist_to_chest": 0.0,
             "width_profile": [0.0] * len(SLICE_FRACTIONS),
             "belly_tuck": 0.0,
         }
+    top = compact.bbox[1]
+    crop = compact.crop
+
+    ys, xs = np.nonzero(crop)
+    count = xs.size
+    centroid_x = float(xs.sum()) / count
+    centroid_y = float(ys.sum()) / count
+    if count < 2:
+        major_axis = np.array([1.0, 0.0], dtype=np.float64)
+    else:
+        # Raw integer moments are exact; subtract the centroid terms once.
+        major_axis = _moments_major_axis(
+            float(np.dot(xs, xs)) - count * centroid_x * centroid_x,
+            float(np.dot(ys, ys)) - count * centroid_y * centroid_y,
+            float(np.dot(xs, ys)) - count * centroid_x * centroid_y,
+        )
 
-    points_xy = np.column_stack((xs, ys)).astype(np.float64)
-    centroid = points_xy.mean(axis=0)
-    centered = points_xy - centroid
-
-    major_axis = _pca_major_axis(points_xy)
-    perp_axis = np.array([-major_axis[1], major_axis[0]], dtype=np.float64)
-
-    u = centered @ major_axis
-    v = centered @ perp_axis
+    # Projections are left uncentred: only differences along each axis are used.
+    u = xs * major_axis[0] + ys * major_axis[1]
 
     min_u = float(np.min(u))
     max_u = float(np.max(u))
@@ -84,23 +102,47 @@ def extract_ratio_features(mask_uint8: np.ndarray) -> dict[str, Any]:
     # Narrower for short masks, wider for long masks to make slices numerically stable.
     band_half_width = max(1.0, length_px * 0.015)
 
-    widths_px: list[float] = []
-    lower_heights: dict[float, float] = {}
-
-    for frac in SLICE_FRACTIONS:
-        target_u = min_u + frac * length_px
-        slice_pts = _slice_points(centered, u, target_u, band_half_width)
-        if slice_pts.size == 0:
-            widths_px.append(0.0)
-            lower_heights[frac] = float("nan")
-            continue
-
-        slice_v = slice_pts @ perp_axis
-        width_px = float(np.max(slice_v) - np.min(slice_v))
-        widths_px.append(max(0.0, width_px))
-
-        # "Lower" silhouette in image coordinates is largest y.
-        lower_heights[frac] = float(np.max(slice_pts[:, 1] + centroid[1]))
+    targets = min_u + np.asarray(SLICE_FRACTIONS, dtype=np.float64) * length_px
+    lows = targets - band_half_width
+    highs = targets + band_half_width
+    slice_count = len(SLICE_FRACTIONS)
+    v_max = np.full(slice_count, -np.inf)
+    v_min = np.full(slice_count, np.inf)
+    y_max = np.full(slice_count, -1, dtype=np.int64)
+
+    def reduce_slice(index: int, selected: np.ndarray) -> None:
+        slice_x = xs[selected]
+        slice_y = ys[selected]
+        v = slice_y * major_axis[0] - slice_x * major_axis[1]
+        v_max[index] = np.max(v)
+        v_min[index] = np.min(v)
+        y_max[index] = np.max(slice_y)
+
+    if np.all(lows[1:] > highs[:-1]):
+        # One binned pass tags each point with its band; reductions then
+        # touch only the in-band points.
+        band = _band_ids(u, lows, highs)
+        in_band = np.flatnonzero(band >= 0)
+        band = band[in_band]
+        for index in range(slice_count):
+            selected = in_band[band == index]
+            if selected.size:
+                reduce_slice(index, selected)
+    else:
+        # Very short masks: bands overlap, so a point can belong to several.
+        for index in range(slice_count):
+            selected = np.flatnonzero(np.abs(u - targets[index]) <= band_half_width)
+            if selected.size:
+                reduce_slice(index, selected)
+
+    for index in np.flatnonzero(y_max < 0):
+        reduce_slice(index, _nearest_points_slice(u, float(targets[index])))
+
+    widths_px = [max(0.0, float(w)) for w in v_max - v_min]
+    # "Lower" silhouette in image coordinates is largest y.
+    lower_heights = {
+        frac: float(y + top) for frac, y in zip(SLICE_FRACTIONS, y_max, strict=True)
+    }
 
     chest_width = widths_px[1]
     waist_width = widths_px[3]
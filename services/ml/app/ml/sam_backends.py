@@ -0,0 +1,425 @@
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import urllib.request
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Iterator, Protocol
+
+import numpy as np
+from PIL import Image
+
+MOBILE_SAM_WEIGHTS_URL = (
+    "https://github.com/ChaoningZhang/MobileSAM/raw/master/weights/mobile_sam.pt"
+)
+SAM_INPUT_SIZE = 1024
+# SAM's ImageNet-style normalisation, in 0..255 pixel units.
+SAM_PIXEL_MEAN = np.array([123.675, 116.28, 103.53], dtype=np.float32)
+SAM_PIXEL_STD = np.array([58.395, 57.12, 57.375], dtype=np.float32)
+ONNX_ENCODER_NAME = "mobile_sam_encoder.onnx"
+ONNX_DECODER_NAME = "mobile_sam_decoder.onnx"
+ONNX_ENCODER_INT8_NAME = "mobile_sam_encoder.int8.onnx"
+ONNX_DECODER_INT8_NAME = "mobile_sam_decoder.int8.onnx"
+
+# Raises (e.g. OperationCancelled) when the caller has abandoned the work.
+CancelCheck = Callable[[], None]
+
+
+@dataclass(frozen=True)
+class ImageEmbedding:
+    """MobileSAM encoder output plus the sizes the prompt decoder needs."""
+
+    features: Any
+    original_size: tuple[int, int]
+    input_size: tuple[int, int]
+
+
+class SamBackend(Protocol):
+    def encode(self, image_rgb: np.ndarray, cancel_check: CancelCheck | None = None) -> ImageEmbedding: ...
+
+    def encode_batch(
+        self,
+        images_rgb: list[np.ndarray],
+        cancel_check: CancelCheck | None = None,
+    ) -> list[ImageEmbedding]: ...
+
+    def decode(
+        self,
+        embedding: ImageEmbedding,
+        box_xyxy: list[int],
+        cancel_check: CancelCheck | None = None,
+    ) -> np.ndarray:
+        """Return a boolean [H, W] mask in the embedding's original image size."""
+        ...
+
+
+def ensure_checkpoint(checkpoint_path: Path, weights_url: str = MOBILE_SAM_WEIGHTS_URL) -> Path:
+    checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+    if not checkpoint_path.exists():
+        urllib.request.urlretrieve(weights_url, checkpoint_path)
+    return checkpoint_path
+
+
+def load_mobile_sam(checkpoint_path: Path, weights_url: str = MOBILE_SAM_WEIGHTS_URL) -> Any:
+    try:
+        from mobile_sam import sam_model_registry
+    except Exception as exc:
+        raise RuntimeError(
+            "MobileSAM is required but not available. Install 'mobile-sam' and 'torch'."
+        ) from exc
+
+    ensure_checkpoint(checkpoint_path, weights_url)
+    model = sam_model_registry["vit_t"](checkpoint=str(checkpoint_path))
+    model.to(device="cpu")
+    model.eval()
+    return model
+
+
+def quantize_mobile_sam(model: Any) -> Any:
+    """Dynamic INT8 quantization of the encoder and mask decoder Linear layers.
+
+    TinyViT and the two-way transformer spend most of their time in Linear
+    layers; convolutions and the prompt encoder stay in float.
+    """
+    import torch
+
+    model.image_encoder = torch.ao.quantization.quantize_dynamic(
+        model.image_encoder, {torch.nn.Linear}, dtype=torch.qint8
+    )
+    model.mask_decoder = torch.ao.quantization.quantize_dynamic(
+        model.mask_decoder, {torch.nn.Linear}, dtype=torch.qint8
+    )
+    return model
+
+
+class EagerSamBackend:
+    """Eager PyTorch MobileSAM through a pool of ``SamPredictor`` objects.
+
+    ``SamPredictor`` keeps the current image embedding as mutable state, so
+    each call checks out a predictor for its exclusive use. All predictors
+    wrap the same model, whose weights are only read.
+    """
+
+    def __init__(
+        self,
+        checkpoint_path: Path,
+        weights_url: str = MOBILE_SAM_WEIGHTS_URL,
+        pool_size: int = 1,
+        intra_op_threads: int | None = None,
+        quantize: bool = False,
+    ) -> None:
+        self._checkpoint_path = checkpoint_path
+        self._weights_url = weights_url
+        self._quantize = quantize
+        self._pool_size = max(1, pool_size)
+        self._intra_op_threads = intra_op_threads
+        self._idle: queue.Queue[Any] | None = None
+        self._init_lock = threading.Lock()
+
+    @property
+    def pool_size(self) -> int:
+        return self._pool_size
+
+    def _install_predictors(self, predictors: list[Any]) -> queue.Queue[Any]:
+        idle: queue.Queue[Any] = queue.Queue()
+        for predictor in predictors:
+            idle.put(predictor)
+        self._pool_size = len(predictors)
+        self._idle = idle
+        return idle
+
+    def _ensure_pool(self) -> queue.Queue[Any]:
+        if self._idle is not None:
+            return self._idle
+
+        with self._init_lock:
+            if self._idle is not None:
+                return self._idle
+            try:
+                import torch
+                from mobile_sam import SamPredictor
+            except Exception as exc:
+                raise RuntimeError(
+                    "MobileSAM is required but not available. Install 'mobile-sam' and 'torch'."
+                ) from exc
+
+            if self._intra_op_threads:
+                # Process-wide: split the cores between concurrently running predictors.
+                torch.set_num_threads(self._intra_op_threads)
+            model = load_mobile_sam(self._checkpoint_path, self._weights_url)
+            if self._quantize:
+                model = quantize_mobile_sam(model)
+            with torch.no_grad():
+                predictors = [SamPredictor(model) for _ in range(self._pool_size)]
+            return self._install_predictors(predictors)
+
+    @contextmanager
+    def _checkout(self) -> Iterator[Any]:
+        idle = self._ensure_pool()
+        predictor = idle.get()
+        try:
+            yield predictor
+        finally:
+            idle.put(predictor)
+
+    def encode(self, image_rgb: np.ndarray, cancel_check: CancelCheck | None = None) -> ImageEmbedding:
+        with self._checkout() as predictor:
+            if cancel_check is not None:
+                cancel_check()
+            predictor.set_image(image_rgb)
+            return ImageEmbedding(
+                features=predictor.features,
+                original_size=tuple(predictor.original_size),
+                input_size=tuple(predictor.input_size),
+            )
+
+    def encode_batch(
+        self,
+        images_rgb: list[np.ndarray],
+        cancel_check: CancelCheck | None = None,
+    ) -> list[ImageEmbedding]:
+        import torch
+
+        with self._checkout() as predictor:
+            model = predictor.model
+            batch: list[Any] = []
+            sizes: list[tuple[tuple[int, int], tuple[int, int]]] = []
+            for image_rgb in images_rgb:
+                if cancel_check is not None:
+                    cancel_check()
+                # Mirrors SamPredictor.set_image, minus the single-image state.
+                transformed = predictor.transform.apply_image(image_rgb)
+                tensor = torch.as_tensor(transformed, device=predictor.device)
+                tensor = tensor.permute(2, 0, 1).contiguous()[None, :, :, :]
+                sizes.append((tuple(image_rgb.shape[:2]), tuple(tensor.shape[-2:])))
+                batch.append(model.preprocess(tensor))
+
+            if cancel_check is not None:
+                cancel_check()
+            with torch.no_grad():
+                features = model.image_encoder(torch.cat(batch, dim=0))
+
+        return [
+            ImageEmbedding(
+                features=features[i : i + 1].clone(),
+                original_size=original_size,
+                input_size=input_size,
+            )
+            for i, (original_size, input_size) in enumerate(sizes)
+        ]
+
+    def decode(
+        self,
+        embedding: ImageEmbedding,
+        box_xyxy: list[int],
+        cancel_check: CancelCheck | None = None,
+    ) -> np.ndarray:
+        with self._checkout() as predictor:
+            if cancel_check is not None:
+                cancel_check()
+            predictor.features = embedding.features
+            predictor.original_size = embedding.original_size
+            predictor.input_size = embedding.input_size
+            predictor.is_image_set = True
+            masks, _, _ = predictor.predict(
+                point_coords=None,
+                point_labels=None,
+                box=np.array([box_xyxy], dtype=np.float32),
+                multimask_output=False,
+            )
+        return masks[0] > 0
+
+
+def _resized_input_size(height: int, width: int, target: int = SAM_INPUT_SIZE) -> tuple[int, int]:
+    scale = target / float(max(height, width))
+    return int(height * scale + 0.5), int(width * scale + 0.5)
+
+
+def preprocess_for_sam(image_rgb: np.ndarray) -> tuple[np.ndarray, tuple[int, int]]:
+    """NumPy port of ResizeLongestSide + Sam.preprocess; returns [3, 1024, 1024] and input size."""
+    height, width = image_rgb.shape[:2]
+    new_h, new_w = _resized_input_size(height, width)
+    resized = np.asarray(
+        Image.fromarray(image_rgb).resize((new_w, new_h), Image.Resampling.BILINEAR),
+        dtype=np.float32,
+    )
+    normalized = (resized - SAM_PIXEL_MEAN) / SAM_PIXEL_STD
+    padded = np.zeros((SAM_INPUT_SIZE, SAM_INPUT_SIZE, 3), dtype=np.float32)
+    padded[:new_h, :new_w] = normalized
+    return np.ascontiguousarray(padded.transpose(2, 0, 1)), (new_h, new_w)
+
+
+class OnnxSamBackend:
+    """MobileSAM encoder/decoder exported to ONNX and run with ONNX Runtime.
+
+    Sessions use full graph optimisation and a fixed intra-op thread count;
+    ``InferenceSession.run`` is thread-safe, so no predictor lock is needed.
+    """
+
+    def __init__(
+        self,
+        encoder_path: Path,
+        decoder_path: Path,
+        intra_op_threads: int | None = None,
+    ) -> None:
+        self._encoder_path = encoder_path
+        self._decoder_path = decoder_path
+        self._intra_op_threads = intra_op_threads
+        self._sessions: tuple[Any, Any] | None = None
+        self._init_lock = threading.Lock()
+
+    def _ensure_sessions(self) -> tuple[Any, Any]:
+        if self._sessions is not None:
+            return self._sessions
+        with self._init_lock:
+            if self._sessions is not None:
+                return self._sessions
+            try:
+                import onnxruntime as ort
+            except Exception as exc:
+                raise RuntimeError(
+                    "ONNX Runtime is required for the onnx segmenter backend. "
+                    "Install 'onnxruntime'."
+                ) from exc
+            for path in (self._encoder_path, self._decoder_path):
+                if not path.exists():
+                    raise RuntimeError(
+                        f"Exported MobileSAM model not found: {path}. "
+                        "Run 'python -m app.ml.sam_export' (with --int8 for quantized models) first."
+                    )
+
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+            if self._intra_op_threads:
+                options.intra_op_num_threads = self._intra_op_threads
+            options.inter_op_num_threads = 1
+            providers = ["CPUExecutionProvider"]
+            self._sessions = (
+                ort.InferenceSession(str(self._encoder_path), options, providers=providers),
+                ort.InferenceSession(str(self._decoder_path), options, providers=providers),
+            )
+            return self._sessions
+
+    def encode(self, image_rgb: np.ndarray, cancel_check: CancelCheck | None = None) -> ImageEmbedding:
+        return self.encode_batch([image_rgb], cancel_check)[0]
+
+    def encode_batch(
+        self,
+        images_rgb: list[np.ndarray],
+        cancel_check: CancelCheck | None = None,
+    ) -> list[ImageEmbedding]:
+        encoder, _ = self._ensure_sessions()
+        inputs: list[np.ndarray] = []
+        sizes: list[tuple[tuple[int, int], tuple[int, int]]] = []
+        for image_rgb in images_rgb:
+            if cancel_check is not None:
+                cancel_check()
+            tensor, input_size = preprocess_for_sam(image_rgb)
+            inputs.append(tensor)
+            sizes.append((tuple(image_rgb.shape[:2]), input_size))
+
+        if cancel_check is not None:
+            cancel_check()
+        (features,) = encoder.run(None, {"images": np.stack(inputs, axis=0)})
+        return [
+            ImageEmbedding(
+                features=np.ascontiguousarray(features[i : i + 1]),
+                original_size=original_size,
+                input_size=input_size,
+            )
+            for i, (original_size, input_size) in enumerate(sizes)
+        ]
+
+    def decode(
+        self,
+        embedding: ImageEmbedding,
+        box_xyxy: list[int],
+        cancel_check: CancelCheck | None = None,
+    ) -> np.ndarray:
+        _, decoder = self._ensure_sessions()
+        height, width = embedding.original_size
+        new_h, new_w = embedding.input_size
+        # A box prompt is two corner points with labels 2 (top-left) and 3 (bottom-right).
+        coords = np.array(box_xyxy, dtype=np.float32).reshape(1, 2, 2)
+        coords[..., 0] *= new_w / float(width)
+        coords[..., 1] *= new_h / float(height)
+        if cancel_check is not None:
+            cancel_check()
+        masks, _, _ = decoder.run(
+            None,
+            {
+                "image_embeddings": np.asarray(embedding.features, dtype=np.float32),
+                "point_coords": coords,
+                "point_labels": np.array([[2, 3]], dtype=np.float32),
+                "mask_input": np.zeros((1, 1, 256, 256), dtype=np.float32),
+                "has_mask_input": np.zeros(1, dtype=np.float32),
+                "orig_im_size": np.array([height, width], dtype=np.float32),
+            },
+        )
+        # Output 0 is the single-mask token, matching multimask_output=False.
+        return masks[0, 0] > 0
+
+
+def build_backend(
+    name: str,
+    *,
+    cache_dir: Path,
+    checkpoint_path: Path,
+    weights_url: str = MOBILE_SAM_WEIGHTS_URL,
+    process_workers: int = 0,
+    predictor_pool_size: int | None = None,
+    quantize: bool = False,
+) -> SamBackend:
+    """Build the named backend, hosted in ``process_workers`` processes when > 0."""
+    if process_workers > 0:
+        from .sam_process_pool import ProcessPoolSamBackend
+
+        factory = partial(
+            build_backend,
+            name,
+            cache_dir=cache_dir,
+            checkpoint_path=checkpoint_path,
+            weights_url=weights_url,
+            # One predictor per worker process; the pool sets torch threads.
+            predictor_pool_size=1,
+            quantize=quantize,
+        )
+        threads = int(os.getenv("SAM_PROCESS_TORCH_THREADS", "0")) or None
+        return ProcessPoolSamBackend(factory, process_workers, torch_threads=threads)
+
+    backend = name.strip().lower()
+    if backend == "eager":
+        # Default matches ASSESS_WORKERS so each /assess worker gets its own predictor.
+        pool_size = predictor_pool_size or int(os.getenv("SAM_PREDICTOR_POOL_SIZE", "2"))
+        threads = int(os.getenv("SAM_TORCH_THREADS", "0")) or (
+            max(1, (os.cpu_count() or 1) // pool_size) if pool_size > 1 else None
+        )
+        return EagerSamBackend(
+            checkpoint_path,
+            weights_url,
+            pool_size=pool_size,
+            intra_op_threads=threads,
+            quantize=quantize,
+        )
+    if backend == "onnx":
+        threads = int(os.getenv("SAM_ONNX_THREADS", "0")) or None
+        onnx_dir = Path(os.getenv("SAM_ONNX_DIR", str(cache_dir / "onnx")))
+        if quantize:
+            encoder_name, decoder_name = ONNX_ENCODER_INT8_NAME, ONNX_DECODER_INT8_NAME
+        else:
+            encoder_name, decoder_name = ONNX_ENCODER_NAME, ONNX_DECODER_NAME
+        return OnnxSamBackend(
+            onnx_dir / encoder_name,
+            onnx_dir / decoder_name,
+            intra_op_threads=threads,
+        )
+    if backend == "classic":
+        from .classic_segmenter import ClassicSegmenterBackend
+
+        return ClassicSegmenterBackend()
+    raise ValueError(f"Unknown segmenter backend: {name!r}")
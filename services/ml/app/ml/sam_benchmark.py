@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import resource
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from .decoded_image import decode_image
+from .ratio_features import extract_ratio_features
+from .sam_backends import build_backend
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp"}
+DEFAULT_CACHE_DIR = Path(".cache")
+
+
+def _load_images(image_dir: Path, max_side: int, limit: int) -> list[tuple[str, np.ndarray]]:
+    paths = sorted(p for p in image_dir.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+    images = []
+    for path in paths[:limit] if limit else paths:
+        decoded = decode_image(path.read_bytes(), max_side=max_side or None)
+        images.append((path.name, decoded.rgb))
+    return images
+
+
+def _benchmark_box(height: int, width: int) -> list[int]:
+    # No vision call offline: prompt with the central 80% of the frame.
+    return [int(width * 0.1), int(height * 0.1), int(width * 0.9) - 1, int(height * 0.9) - 1]
+
+
+def _run_variant(
+    backend_name: str,
+    quantize: bool,
+    cache_dir: Path,
+    images: list[tuple[str, np.ndarray]],
+    repeats: int,
+) -> dict[str, Any]:
+    """Runs in a fresh process so ru_maxrss is this variant's peak alone."""
+    backend = build_backend(
+        backend_name,
+        cache_dir=cache_dir,
+        checkpoint_path=cache_dir / "mobile_sam.pt",
+        predictor_pool_size=1,
+        quantize=quantize,
+    )
+    warm = np.full((64, 64, 3), 127, dtype=np.uint8)
+    backend.decode(backend.encode(warm), [16, 16, 48, 48])
+
+    encoder_ms: list[float] = []
+    decoder_ms: list[float] = []
+    masks: dict[str, np.ndarray] = {}
+    for name, image in images:
+        box = _benchmark_box(*image.shape[:2])
+        for _ in range(repeats):
+            started = time.perf_counter()
+            embedding = backend.encode(image)
+            encoded = time.perf_counter()
+            mask = backend.decode(embedding, box)
+            decoder_ms.append((time.perf_counter() - encoded) * 1000.0)
+            encoder_ms.append((encoded - started) * 1000.0)
+        masks[name] = np.packbits(mask)
+
+    return {
+        "encoder_ms": encoder_ms,
+        "decoder_ms": decoder_ms,
+        # Linux reports kilobytes.
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+        "masks": masks,
+    }
+
+
+def _latency_summary(samples: list[float]) -> dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "p50": statistics.median(ordered),
+        "p95": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))],
+        "mean": statistics.fmean(ordered),
+    }
+
+
+def _iou(a: np.ndarray, b: np.ndarray) -> float:
+    union = int(np.logical_or(a, b).sum())
+    return 1.0 if union == 0 else int(np.logical_and(a, b).sum()) / union
+
+
+def _ratio_drift(reference: dict[str, Any], candidate: dict[str, Any]) -> dict[str, float]:
+    length = reference["length_px"]
+    return {
+        "length_rel": abs(candidate["length_px"] - length) / length if length else 0.0,
+        "waist_to_chest": abs(candidate["waist_to_chest"] - reference["waist_to_chest"]),
+        "belly_tuck": abs(candidate["belly_tuck"] - reference["belly_tuck"]),
+        "width_profile_max": max(
+            abs(c - r)
+            for c, r in zip(candidate["width_profile"], reference["width_profile"], strict=True)
+        ),
+    }
+
+
+def compare_variants(
+    images: list[tuple[str, np.ndarray]],
+    float_run: dict[str, Any],
+    int8_run: dict[str, Any],
+) -> dict[str, Any]:
+    per_image = []
+    for name, image in images:
+        count = image.shape[0] * image.shape[1]
+        shape = image.shape[:2]
+        float_mask = np.unpackbits(float_run["masks"][name], count=count).reshape(shape)
+        int8_mask = np.unpackbits(int8_run["masks"][name], count=count).reshape(shape)
+        per_image.append(
+            {
+                "image": name,
+                "mask_iou": _iou(float_mask.astype(bool), int8_mask.astype(bool)),
+                "ratio_drift": _ratio_drift(
+                    extract_ratio_features(float_mask),
+                    extract_ratio_features(int8_mask),
+                ),
+            }
+        )
+
+    report: dict[str, Any] = {}
+    for label, run in (("float", float_run), ("int8", int8_run)):
+        report[label] = {
+            "encoder_ms": _latency_summary(run["encoder_ms"]),
+            "decoder_ms": _latency_summary(run["decoder_ms"]),
+            "peak_rss_mb": run["peak_rss_mb"],
+        }
+    report["encoder_speedup_p50"] = (
+        report["float"]["encoder_ms"]["p50"] / report["int8"]["encoder_ms"]["p50"]
+    )
+    ious = [item["mask_iou"] for item in per_image]
+    report["mask_iou"] = {"mean": statistics.fmean(ious), "min": min(ious)}
+    report["ratio_drift_max"] = {
+        key: max(item["ratio_drift"][key] for item in per_image)
+        for key in per_image[0]["ratio_drift"]
+    }
+    report["images"] = per_image
+    return report
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Compare float and INT8 MobileSAM: latency, peak memory, mask IoU, ratio drift."
+    )
+    parser.add_argument("images", type=Path, help="Directory of local test images")
+    parser.add_argument("--backend", choices=("eager", "onnx"), default="eager")
+    parser.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--max-side", type=int, default=1024)
+    parser.add_argument("--limit", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", type=Path, default=None, help="Write the JSON report here")
+    return parser
+
+
+def main() -> int:
+    args = _build_parser().parse_args()
+    images = _load_images(args.images, args.max_side, args.limit)
+    if not images:
+        print(f"No images found in {args.images}")
+        return 1
+
+    context = multiprocessing.get_context("spawn")
+    runs = {}
+    try:
+        for quantize in (False, True):
+            with context.Pool(processes=1) as pool:
+                runs[quantize] = pool.apply(
+                    _run_variant,
+                    (args.backend, quantize, args.cache_dir, images, args.repeats),
+                )
+    except RuntimeError as exc:
+        print(str(exc))
+        return 1
+
+    report = {"backend": args.backend, **compare_variants(images, runs[False], runs[True])}
+    text = json.dumps(report, indent=2)
+    if args.output is not None:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    sys.stdout.write(text + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import argparse
+import warnings
+from pathlib import Path
+from typing import Any
+
+from .sam_backends import (
+    MOBILE_SAM_WEIGHTS_URL,
+    ONNX_DECODER_INT8_NAME,
+    ONNX_DECODER_NAME,
+    ONNX_ENCODER_INT8_NAME,
+    ONNX_ENCODER_NAME,
+    SAM_INPUT_SIZE,
+    load_mobile_sam,
+)
+
+DEFAULT_CACHE_DIR = Path(".cache")
+DEFAULT_OPSET = 17
+
+
+def export_mobile_sam_onnx(
+    checkpoint_path: Path,
+    output_dir: Path,
+    *,
+    opset: int = DEFAULT_OPSET,
+    weights_url: str = MOBILE_SAM_WEIGHTS_URL,
+) -> tuple[Path, Path]:
+    """Export the MobileSAM image encoder and prompt decoder for ``OnnxSamBackend``.
+
+    The encoder takes preprocessed ``[N, 3, 1024, 1024]`` input with a dynamic
+    batch axis; the decoder is SAM's standard ONNX prompt model.
+    """
+    try:
+        import torch
+        from mobile_sam.utils.onnx import SamOnnxModel
+    except Exception as exc:
+        raise RuntimeError(
+            "Exporting requires 'torch', 'mobile-sam' and 'onnx'."
+        ) from exc
+
+    model = load_mobile_sam(checkpoint_path, weights_url)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    encoder_path = output_dir / ONNX_ENCODER_NAME
+    decoder_path = output_dir / ONNX_DECODER_NAME
+
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=torch.jit.TracerWarning)
+        warnings.filterwarnings("ignore", category=UserWarning)
+        with torch.no_grad():
+            torch.onnx.export(
+                model.image_encoder,
+                torch.randn(1, 3, SAM_INPUT_SIZE, SAM_INPUT_SIZE, dtype=torch.float32),
+                str(encoder_path),
+                input_names=["images"],
+                output_names=["image_embeddings"],
+                dynamic_axes={"images": {0: "batch"}, "image_embeddings": {0: "batch"}},
+                opset_version=opset,
+                do_constant_folding=True,
+            )
+            _export_decoder(model, SamOnnxModel, decoder_path, opset)
+
+    return encoder_path, decoder_path
+
+
+def quantize_onnx_int8(output_dir: Path) -> tuple[Path, Path]:
+    """Write dynamically INT8-quantized copies of the exported encoder and decoder."""
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+    except Exception as exc:
+        raise RuntimeError("INT8 export requires 'onnxruntime'.") from exc
+
+    pairs = (
+        (output_dir / ONNX_ENCODER_NAME, output_dir / ONNX_ENCODER_INT8_NAME),
+        (output_dir / ONNX_DECODER_NAME, output_dir / ONNX_DECODER_INT8_NAME),
+    )
+    for source, target in pairs:
+        quantize_dynamic(str(source), str(target), weight_type=QuantType.QInt8)
+    return pairs[0][1], pairs[1][1]
+
+
+def _export_decoder(model: Any, onnx_model_cls: Any, decoder_path: Path, opset: int) -> None:
+    import torch
+
+    # return_single_mask=False keeps all mask tokens so output 0 matches
+    # SamPredictor.predict(multimask_output=False).
+    onnx_model = onnx_model_cls(model, return_single_mask=False)
+    embed_dim = model.prompt_encoder.embed_dim
+    embed_size = model.prompt_encoder.image_embedding_size
+    mask_input_size = [4 * x for x in embed_size]
+    dummy_inputs = {
+        "image_embeddings": torch.randn(1, embed_dim, *embed_size, dtype=torch.float32),
+        "point_coords": torch.randint(0, SAM_INPUT_SIZE, (1, 2, 2), dtype=torch.float32),
+        "point_labels": torch.tensor([[2, 3]], dtype=torch.float32),
+        "mask_input": torch.zeros(1, 1, *mask_input_size, dtype=torch.float32),
+        "has_mask_input": torch.zeros(1, dtype=torch.float32),
+        "orig_im_size": torch.tensor([SAM_INPUT_SIZE, SAM_INPUT_SIZE], dtype=torch.float32),
+    }
+    torch.onnx.export(
+        onnx_model,
+        tuple(dummy_inputs.values()),
+        str(decoder_path),
+        input_names=list(dummy_inputs.keys()),
+        output_names=["masks", "iou_predictions", "low_res_masks"],
+        dynamic_axes={
+            "point_coords": {1: "num_points"},
+            "point_labels": {1: "num_points"},
+        },
+        opset_version=opset,
+        do_constant_folding=True,
+    )
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Export MobileSAM to ONNX for the onnx segmenter backend."
+    )
+    parser.add_argument("--checkpoint", type=Path, default=DEFAULT_CACHE_DIR / "mobile_sam.pt")
+    parser.add_argument("--output-dir", type=Path, default=DEFAULT_CACHE_DIR / "onnx")
+    parser.add_argument("--opset", type=int, default=DEFAULT_OPSET)
+    parser.add_argument(
+        "--int8",
+        action="store_true",
+        help="Also write dynamically INT8-quantized models (SAM_QUANTIZE=int8).",
+    )
+    return parser
+
+
+def main() -> int:
+    args = _build_parser().parse_args()
+    try:
+        encoder_path, decoder_path = export_mobile_sam_onnx(
+            checkpoint_path=args.checkpoint,
+            output_dir=args.output_dir,
+            opset=args.opset,
+        )
+        if args.int8:
+            int8_paths = quantize_onnx_int8(args.output_dir)
+    except RuntimeError as exc:
+        print(str(exc))
+        return 1
+    print(f"encoder: {encoder_path}")
+    print(f"decoder: {decoder_path}")
+    if args.int8:
+        print(f"encoder (int8): {int8_paths[0]}")
+        print(f"decoder (int8): {int8_paths[1]}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Any, Callable
+
+import numpy as np
+
+from .sam_backends import CancelCheck, EagerSamBackend, ImageEmbedding, SamBackend
+
+logger = logging.getLogger(__name__)
+
+# Array handle passed to workers instead of pickling the payload.
+SharedArraySpec = tuple[str, tuple[int, ...], str]
+
+_worker_backend: SamBackend | None = None
+
+
+def _share_array(array: np.ndarray) -> tuple[shared_memory.SharedMemory, SharedArraySpec]:
+    array = np.ascontiguousarray(array)
+    block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+def _read_shared(spec: SharedArraySpec) -> np.ndarray:
+    name, shape, dtype = spec
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        return np.array(np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf))
+    finally:
+        block.close()
+
+
+def _release(block: shared_memory.SharedMemory) -> None:
+    block.close()
+    block.unlink()
+
+
+def _as_numpy(features: Any) -> np.ndarray:
+    if isinstance(features, np.ndarray):
+        return features
+    return features.detach().cpu().numpy()
+
+
+def _init_worker(backend_factory: Callable[[], SamBackend], torch_threads: int) -> None:
+    global _worker_backend
+    try:
+        import torch
+
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+    _worker_backend = backend_factory()
+    # Pay for model load and first-call kernel setup before taking real work.
+    blank = np.full((64, 64, 3), 127, dtype=np.uint8)
+    _worker_backend.decode(_worker_backend.encode(blank), [16, 16, 48, 48])
+
+
+def _worker_encode(image_spec: SharedArraySpec) -> tuple[SharedArraySpec, tuple[int, int], tuple[int, int]]:
+    assert _worker_backend is not None
+    embedding = _worker_backend.encode(_read_shared(image_spec))
+    # The parent attaches, copies and unlinks this block.
+    block, features_spec = _share_array(_as_numpy(embedding.features))
+    block.close()
+    return features_spec, embedding.original_size, embedding.input_size
+
+
+def _worker_decode(
+    features_spec: SharedArraySpec,
+    original_size: tuple[int, int],
+    input_size: tuple[int, int],
+    box_xyxy: list[int],
+    mask_spec: SharedArraySpec,
+) -> None:
+    assert _worker_backend is not None
+    features: Any = _read_shared(features_spec)
+    if isinstance(_worker_backend, EagerSamBackend):
+        import torch
+
+        features = torch.from_numpy(features)
+    embedding = ImageEmbedding(
+        features=features,
+        original_size=original_size,
+        input_size=input_size,
+    )
+    mask = _worker_backend.decode(embedding, box_xyxy)
+    name, shape, dtype = mask_spec
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)[...] = mask
+    finally:
+        block.close()
+
+
+class ProcessPoolSamBackend:
+    """Runs another ``SamBackend`` in worker processes, one model per process.
+
+    Keeps encoder/decoder work off the API process's GIL and torch thread
+    pool. Images, embeddings and masks cross the process boundary through
+    ``multiprocessing.shared_memory``; only names and shapes are pickled.
+    The parent process owns (and unlinks) every block. Cancellation is only
+    checked in the parent, before work is handed to a worker. If a worker
+    dies the pool is rebuilt and the call retried once before the
+    ``BrokenProcessPool`` reaches the caller.
+    """
+
+    def __init__(
+        self,
+        backend_factory: Callable[[], SamBackend],
+        workers: int,
+        torch_threads: int | None = None,
+    ) -> None:
+        self._workers = max(1, workers)
+        self._backend_factory = backend_factory
+        self._torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // self._workers)
+        self._pool_lock = threading.Lock()
+        self._pool = self._new_pool()
+        self._rebuilds = 0
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self._workers,
+            # Forking a process that has already imported torch is unsafe.
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self._backend_factory, self._torch_threads),
+        )
+
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    @property
+    def rebuilds(self) -> int:
+        return self._rebuilds
+
+    def _rebuild(self, broken: ProcessPoolExecutor) -> None:
+        with self._pool_lock:
+            # Concurrent callers that saw the same broken pool rebuild it once.
+            if self._pool is not broken:
+                return
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._pool = self._new_pool()
+            self._rebuilds += 1
+        logger.warning("SAM worker pool broke; rebuilt it (%d rebuilds)", self._rebuilds)
+
+    def _submit(self, fn: Callable[..., Any], *args: Any) -> tuple[ProcessPoolExecutor, Future[Any]]:
+        pool = self._pool
+        try:
+            return pool, pool.submit(fn, *args)
+        except BrokenProcessPool as exc:
+            failed: Future[Any] = Future()
+            failed.set_exception(exc)
+            return pool, failed
+
+    def _result(
+        self,
+        pool: ProcessPoolExecutor,
+        future: Future[Any],
+        fn: Callable[..., Any],
+        *args: Any,
+    ) -> Any:
+        """``future``'s result; if ``pool`` broke, rebuild it and run ``fn`` once more."""
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            self._rebuild(pool)
+        return self._pool.submit(fn, *args).result()
+
+    def _call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        return self._result(*self._submit(fn, *args), fn, *args)
+
+    def _submit_encode(
+        self,
+        image_rgb: np.ndarray,
+    ) -> tuple[shared_memory.SharedMemory, SharedArraySpec, ProcessPoolExecutor, Future[Any]]:
+        block, spec = _share_array(image_rgb)
+        try:
+            return (block, spec, *self._submit(_worker_encode, spec))
+        except BaseException:
+            _release(block)
+            raise
+
+    def _collect_encode(
+        self,
+        block: shared_memory.SharedMemory,
+        spec: SharedArraySpec,
+        pool: ProcessPoolExecutor,
+        future: Future[Any],
+    ) -> ImageEmbedding:
+        try:
+            features_spec, original_size, input_size = self._result(
+                pool, future, _worker_encode, spec
+            )
+        finally:
+            _release(block)
+        features = _read_shared(features_spec)
+        _release(shared_memory.SharedMemory(name=features_spec[0]))
+        return ImageEmbedding(
+            features=features,
+            original_size=tuple(original_size),
+            input_size=tuple(input_size),
+        )
+
+    def encode(self, image_rgb: np.ndarray, cancel_check: CancelCheck | None = None) -> ImageEmbedding:
+        if cancel_check is not None:
+            cancel_check()
+        return self._collect_encode(*self._submit_encode(image_rgb))
+
+    def encode_batch(
+        self,
+        images_rgb: list[np.ndarray],
+        cancel_check: CancelCheck | None = None,
+    ) -> list[ImageEmbedding]:
+        """Fan images out across workers rather than stacking them in one pass."""
+        if cancel_check is not None:
+            cancel_check()
+        submitted = []
+        try:
+            for image_rgb in images_rgb:
+                submitted.append(self._submit_encode(image_rgb))
+        except BaseException:
+            for block, _, _, future in submitted:
+                future.cancel()
+                _release(block)
+            raise
+        return [self._collect_encode(*item) for item in submitted]
+
+    def decode(
+        self,
+        embedding: ImageEmbedding,
+        box_xyxy: list[int],
+        cancel_check: CancelCheck | None = None,
+    ) -> np.ndarray:
+        if cancel_check is not None:
+            cancel_check()
+        features_block, features_spec = _share_array(_as_numpy(embedding.features))
+        try:
+            mask_block = shared_memory.SharedMemory(
+                create=True,
+                size=max(1, int(np.prod(embedding.original_size))),
+            )
+            try:
+                mask_spec = (mask_block.name, tuple(embedding.original_size), np.dtype(bool).str)
+                self._call(
+                    _worker_decode,
+                    features_spec,
+                    tuple(embedding.original_size),
+                    tuple(embedding.input_size),
+                    list(box_xyxy),
+                    mask_spec,
+                )
+                return np.array(
+                    np.ndarray(embedding.original_size, dtype=bool, buffer=mask_block.buf)
+                )
+            finally:
+                _release(mask_block)
+        finally:
+            _release(features_block)
+
+    def shutdown(self) -> None:
+        with self._pool_lock:
+            pool = self._pool
+        pool.shutdown(wait=True, cancel_futures=True)
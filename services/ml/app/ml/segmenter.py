@@ -1,14 +1,33 @@
 from __future__ import annotations
 
+import hashlib
 import os
-import urllib.request
 from pathlib import Path
-from typing import Any
+from typing import cast
 
 import numpy as np
 
-MOBILE_SAM_WEIGHTS_URL = (
-    "https://github.com/ChaoningZhang/MobileSAM/raw/master/weights/mobile_sam.pt"
+from .compact_mask import CompactMask
+from .decoded_image import DecodedImage
+from .embedding_cache import EmbeddingCache
+from .sam_backends import (
+    MOBILE_SAM_WEIGHTS_URL,
+    CancelCheck,
+    ImageEmbedding,
+    SamBackend,
+    build_backend,
+)
+
+# "eager" runs MobileSAM in PyTorch; "onnx" uses the exported ONNX Runtime graphs;
+# "classic" is the colour-model CPU segmenter with no model weights.
+SAM_BACKEND = os.getenv("SAM_BACKEND", "eager")
+# "int8" selects dynamically quantized encoder/decoder weights for either backend.
+SAM_QUANTIZE = os.getenv("SAM_QUANTIZE", "none").strip().lower() == "int8"
+# > 0 hosts the backend in that many worker processes, each with its own model.
+SAM_PROCESS_WORKERS = int(os.getenv("SAM_PROCESS_WORKERS", "0"))
+EMBEDDING_CACHE_ENTRIES = int(os.getenv("SAM_EMBEDDING_CACHE_ENTRIES", "32"))
+EMBEDDING_CACHE_MAX_BYTES = int(
+    os.getenv("SAM_EMBEDDING_CACHE_MAX_BYTES", str(256 * 1024 * 1024))
 )
 
 
@@ -18,35 +37,40 @@ class Segmenter:
         cache_dir: str | os.PathLike[str] = ".cache",
         checkpoint_name: str = "mobile_sam.pt",
         weights_url: str = MOBILE_SAM_WEIGHTS_URL,
+        embedding_cache: EmbeddingCache | None = None,
+        backend: str | SamBackend | None = None,
     ) -> None:
         self._cache_dir = Path(cache_dir)
         self._checkpoint_path = self._cache_dir / checkpoint_name
         self._weights_url = weights_url
-        self._predictor: Any | None = None
-
-    def _ensure_predictor(self) -> Any:
-        if self._predictor is not None:
-            return self._predictor
-
-        try:
-            import torch
-            from mobile_sam import SamPredictor, sam_model_registry
-        except Exception as exc:
-            raise RuntimeError(
-                "MobileSAM is required but not available. Install 'mobile-sam' and 'torch'."
-            ) from exc
-
-        self._cache_dir.mkdir(parents=True, exist_ok=True)
-        if not self._checkpoint_path.exists():
-            urllib.request.urlretrieve(self._weights_url, self._checkpoint_path)
+        if backend is None or isinstance(backend, str):
+            backend = build_backend(
+                backend or SAM_BACKEND,
+                cache_dir=self._cache_dir,
+                checkpoint_path=self._checkpoint_path,
+                weights_url=weights_url,
+                process_workers=SAM_PROCESS_WORKERS,
+                quantize=SAM_QUANTIZE,
+            )
+        self._backend: SamBackend = backend
+        self._embedding_cache = (
+            embedding_cache
+            if embedding_cache is not None
+            else EmbeddingCache(
+                max_entries=EMBEDDING_CACHE_ENTRIES,
+                max_bytes=EMBEDDING_CACHE_MAX_BYTES,
+            )
+        )
 
-        model = sam_model_registry["vit_t"](checkpoint=str(self._checkpoint_path))
-        model.to(device="cpu")
-        model.eval()
+    @property
+    def backend(self) -> SamBackend:
+        return self._backend
 
-        with torch.no_grad():
-            self._predictor = SamPredictor(model)
-        return self._predictor
+    def shutdown(self) -> None:
+        """Release backend resources such as SAM worker processes."""
+        shutdown = getattr(self._backend, "shutdown", None)
+        if shutdown is not None:
+            shutdown()
 
     @staticmethod
     def _normalize_bbox(
@@ -77,29 +101,119 @@ class Segmenter:
 
         return [x1, y1, x2, y2]
 
-    def segment(
-        self,
-        image_rgb: np.ndarray,
-        bbox: list[int] | tuple[int, int, int, int] | None = None,
-    ) -> np.ndarray:
+    @staticmethod
+    def _as_rgb_array(image_rgb: np.ndarray | DecodedImage) -> np.ndarray:
+        if isinstance(image_rgb, DecodedImage):
+            image_rgb = image_rgb.rgb
         if not isinstance(image_rgb, np.ndarray):
             raise TypeError("image_rgb must be a numpy array")
         if image_rgb.ndim != 3 or image_rgb.shape[2] != 3:
             raise ValueError("image_rgb must have shape [H, W, 3]")
         if image_rgb.dtype != np.uint8:
             image_rgb = image_rgb.astype(np.uint8, copy=False)
+        return image_rgb
+
+    @property
+    def embedding_cache(self) -> EmbeddingCache:
+        return self._embedding_cache
 
-        height, width = image_rgb.shape[:2]
+    @staticmethod
+    def _content_key(image: np.ndarray | DecodedImage) -> str:
+        if isinstance(image, DecodedImage):
+            working_w, working_h = image.working_size
+            return f"{image.content_hash}:{working_w}x{working_h}"
+        digest = hashlib.sha256(np.ascontiguousarray(image).data)
+        digest.update(repr(image.shape).encode("ascii"))
+        return digest.hexdigest()
+
+    def embed(
+        self,
+        image_rgb: np.ndarray | DecodedImage,
+        cancel_check: CancelCheck | None = None,
+    ) -> ImageEmbedding:
+        """Run the image encoder only; the result can be prompted with any bbox later.
+
+        Embeddings are cached by image content hash, so a resubmitted photo
+        only pays for the prompt decoder. ``cancel_check`` is called before
+        the encoder pass, after any wait for the predictor.
+        """
+        key = self._content_key(image_rgb)
+        cached = self._embedding_cache.get(key)
+        if cached is not None:
+            return cached
+
+        embedding = self._backend.encode(self._as_rgb_array(image_rgb), cancel_check)
+        self._embedding_cache.put(key, embedding)
+        return embedding
+
+    def embed_batch(
+        self,
+        images: list[np.ndarray | DecodedImage],
+        cancel_check: CancelCheck | None = None,
+    ) -> list[ImageEmbedding]:
+        """Encode several images with one batched image-encoder forward pass.
+
+        Cached embeddings are reused; only the misses are stacked and encoded.
+        """
+        keys = [self._content_key(image) for image in images]
+        embeddings: list[ImageEmbedding | None] = [self._embedding_cache.get(key) for key in keys]
+        pending = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if len(pending) == 1:
+            embeddings[pending[0]] = self.embed(images[pending[0]], cancel_check)
+            pending = []
+
+        if pending:
+            encoded = self._backend.encode_batch(
+                [self._as_rgb_array(images[i]) for i in pending],
+                cancel_check,
+            )
+            for i, embedding in zip(pending, encoded, strict=True):
+                self._embedding_cache.put(keys[i], embedding)
+                embeddings[i] = embedding
+
+        return cast(list[ImageEmbedding], embeddings)
+
+    def predict_mask(
+        self,
+        embedding: ImageEmbedding,
+        bbox: list[int] | tuple[int, int, int, int] | None = None,
+        cancel_check: CancelCheck | None = None,
+    ) -> np.ndarray:
+        """Run the prompt decoder against a precomputed image embedding."""
+        height, width = embedding.original_size
         x1, y1, x2, y2 = self._normalize_bbox(bbox=bbox, width=width, height=height)
 
-        predictor = self._ensure_predictor()
-        predictor.set_image(image_rgb)
-        masks, _, _ = predictor.predict(
-            point_coords=None,
-            point_labels=None,
-            box=np.array([[x1, y1, x2, y2]], dtype=np.float32),
-            multimask_output=False,
-        )
+        mask = self._backend.decode(embedding, [x1, y1, x2, y2], cancel_check)
+        return mask.astype(np.uint8) * 255
 
-        mask = (masks[0] > 0).astype(np.uint8) * 255
-        return mask
+    def predict_compact_mask(
+        self,
+        embedding: ImageEmbedding,
+        bbox: list[int] | tuple[int, int, int, int] | None = None,
+        cancel_check: CancelCheck | None = None,
+    ) -> CompactMask:
+        """Like ``predict_mask`` but cropped to the foreground, without a uint8 frame copy."""
+        height, width = embedding.original_size
+        box = self._normalize_bbox(bbox=bbox, width=width, height=height)
+        return CompactMask.from_dense(self._backend.decode(embedding, box, cancel_check))
+
+    def segment(
+        self,
+        image_rgb: np.ndarray | DecodedImage,
+        bbox: list[int] | tuple[int, int, int, int] | None = None,
+        cancel_check: CancelCheck | None = None,
+    ) -> np.ndarray:
+        embedding = self.embed(image_rgb, cancel_check)
+        if cancel_check is not None:
+            cancel_check()
+        return self.predict_mask(embedding, bbox, cancel_check)
+
+    def warm_up(self, size: int = 256) -> None:
+        """Load the model and run one encoder + decoder pass on a blank image.
+
+        Bypasses the embedding cache so every call really exercises the kernels.
+        """
+        image = np.full((size, size, 3), 127, dtype=np.uint8)
+        embedding = self._backend.encode(image)
+        quarter = size // 4
+        self._backend.decode(embedding, [quarter, quarter, size - quarter, size - quarter])
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import io
+import os
+from dataclasses import dataclass
+
+from PIL import Image
+
+from .decoded_image import DecodedImage, decode_image
+
+# Long side of the image sent to the vision model; 0 sends the original size.
+VISION_MAX_SIDE = int(os.getenv("VISION_MAX_SIDE", "768"))
+# "jpeg" or "webp" re-encodes; "original" sends the uploaded bytes untouched.
+VISION_FORMAT = os.getenv("VISION_FORMAT", "jpeg").strip().lower()
+VISION_QUALITY = int(os.getenv("VISION_QUALITY", "85"))
+
+_ENCODERS: dict[str, tuple[str, str]] = {
+    "jpeg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp"),
+}
+
+
+@dataclass(frozen=True)
+class VisionPayload:
+    """Image bytes as sent to the vision model.
+
+    ``size`` is the (width, height) of the sent image, which is the frame
+    the model's bbox refers to; ``original_size`` is the upload's.
+    """
+
+    data: bytes
+    mime: str
+    size: tuple[int, int]
+    original_size: tuple[int, int]
+
+    @property
+    def resized(self) -> bool:
+        return self.size != self.original_size
+
+    def to_original_bbox(self, bbox: list[int]) -> list[int]:
+        """Map an ``[x1, y1, x2, y2]`` bbox from payload pixels to original pixels."""
+        if not self.resized:
+            return list(bbox)
+        width, height = self.size
+        original_w, original_h = self.original_size
+        scale_x = original_w / max(1, width)
+        scale_y = original_h / max(1, height)
+        x1, y1, x2, y2 = bbox
+        return [
+            max(0, min(original_w - 1, int(round(x1 * scale_x)))),
+            max(0, min(original_h - 1, int(round(y1 * scale_y)))),
+            max(0, min(original_w - 1, int(round(x2 * scale_x)))),
+            max(0, min(original_h - 1, int(round(y2 * scale_y)))),
+        ]
+
+
+def _target_size(width: int, height: int, max_side: int) -> tuple[int, int]:
+    if not max_side or max(width, height) <= max_side:
+        return width, height
+    factor = max_side / float(max(width, height))
+    return max(1, int(round(width * factor))), max(1, int(round(height * factor)))
+
+
+def prepare_vision_payload(
+    image: DecodedImage,
+    *,
+    max_side: int = VISION_MAX_SIDE,
+    fmt: str = VISION_FORMAT,
+    quality: int = VISION_QUALITY,
+) -> VisionPayload:
+    """Downsize to ``max_side`` and re-encode as ``fmt`` at ``quality``.
+
+    Pixels come from the already-decoded working copy when it is at least
+    as large as the target, so the upload is only decoded again when the
+    working copy is smaller. The original bytes are kept when re-encoding
+    would not make them smaller.
+    """
+    original = VisionPayload(
+        data=image.data,
+        mime=image.mime,
+        size=image.size,
+        original_size=image.size,
+    )
+    if fmt == "original":
+        return original
+    if fmt not in _ENCODERS:
+        raise ValueError(f"Unknown vision payload format: {fmt!r}")
+    pil_format, mime = _ENCODERS[fmt]
+
+    target = _target_size(image.width, image.height, max_side)
+    working_w, working_h = image.working_size
+    if working_w >= target[0] and working_h >= target[1]:
+        rgb = image.rgb
+    else:
+        rgb = decode_image(image.data, max_side=max(target)).rgb
+    pil_image = Image.fromarray(rgb)
+    if pil_image.size != target:
+        pil_image = pil_image.resize(target, Image.Resampling.LANCZOS)
+
+    buffer = io.BytesIO()
+    pil_image.save(buffer, format=pil_format, quality=quality)
+    data = buffer.getvalue()
+    if target == image.size and len(data) >= len(image.data) and image.mime.startswith("image/"):
+        return original
+    return VisionPayload(data=data, mime=mime, size=target, original_size=image.size)
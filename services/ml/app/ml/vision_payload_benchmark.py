@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+from .breed_bbox import _PROMPT, _normalize_bbox
+from .decoded_image import DecodedImage, decode_image
+from .featherless_vision_json import vision_json
+from .vision_payload import VisionPayload, prepare_vision_payload
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp"}
+# "format[:max_side[:quality]]"; "original" sends the upload untouched.
+DEFAULT_VARIANTS = ("original", "jpeg:1024:85", "jpeg:768:85", "webp:768:80", "jpeg:512:80")
+WORKING_MAX_SIDE = 1024
+
+
+def parse_variant(spec: str) -> dict[str, Any]:
+    parts = spec.split(":")
+    options: dict[str, Any] = {"fmt": parts[0].strip().lower()}
+    if len(parts) > 1:
+        options["max_side"] = int(parts[1])
+    if len(parts) > 2:
+        options["quality"] = int(parts[2])
+    return options
+
+
+def _load_images(image_dir: Path, limit: int) -> list[tuple[str, DecodedImage]]:
+    paths = sorted(p for p in image_dir.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+    return [
+        (path.name, decode_image(path.read_bytes(), max_side=WORKING_MAX_SIDE))
+        for path in (paths[:limit] if limit else paths)
+    ]
+
+
+def _data_url_bytes(payload: VisionPayload) -> int:
+    return len(f"data:{payload.mime};base64,") + len(base64.b64encode(payload.data))
+
+
+def _iou(a: list[int], b: list[int]) -> float:
+    ix = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return float(inter / union) if union > 0 else 0.0
+
+
+async def _round_trip(image: DecodedImage, payload: VisionPayload) -> tuple[float, list[int]]:
+    started = time.perf_counter()
+    raw = await vision_json(payload.data, payload.mime, _PROMPT)
+    elapsed_ms = (time.perf_counter() - started) * 1000.0
+    width, height = payload.size
+    bbox = _normalize_bbox(raw.get("bbox"), width=width, height=height)
+    original_w, original_h = image.size
+    return elapsed_ms, _normalize_bbox(
+        payload.to_original_bbox(bbox),
+        width=original_w,
+        height=original_h,
+    )
+
+
+def run_variant(
+    spec: str,
+    images: list[tuple[str, DecodedImage]],
+    repeats: int,
+    live: bool,
+) -> list[dict[str, Any]]:
+    options = parse_variant(spec)
+    rows = []
+    for name, image in images:
+        prepare_ms = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            payload = prepare_vision_payload(image, **options)
+            prepare_ms.append((time.perf_counter() - started) * 1000.0)
+        row: dict[str, Any] = {
+            "image": name,
+            "original_bytes": len(image.data),
+            "payload_bytes": len(payload.data),
+            "data_url_bytes": _data_url_bytes(payload),
+            "payload_size": list(payload.size),
+            "prepare_ms": statistics.median(prepare_ms),
+        }
+        if live:
+            row["round_trip_ms"], row["bbox"] = asyncio.run(_round_trip(image, payload))
+        rows.append(row)
+    return rows
+
+
+def summarize_variants(
+    runs: dict[str, list[dict[str, Any]]],
+    baseline: str = "original",
+) -> dict[str, Any]:
+    """Per-variant payload size and latency, relative to the ``baseline`` variant."""
+    reference = {row["image"]: row for row in runs.get(baseline, [])}
+    summary = {}
+    for spec, rows in runs.items():
+        payload_bytes = sum(row["payload_bytes"] for row in rows)
+        data_url_bytes = sum(row["data_url_bytes"] for row in rows)
+        baseline_bytes = sum(
+            reference[row["image"]]["data_url_bytes"] for row in rows if row["image"] in reference
+        )
+        entry: dict[str, Any] = {
+            "images": len(rows),
+            "payload_bytes_total": payload_bytes,
+            "data_url_bytes_total": data_url_bytes,
+            "data_url_bytes_saved_ratio": (
+                1.0 - data_url_bytes / baseline_bytes if baseline_bytes else None
+            ),
+            "prepare_ms_p50": statistics.median(row["prepare_ms"] for row in rows) if rows else 0.0,
+        }
+        round_trips = [row["round_trip_ms"] for row in rows if "round_trip_ms" in row]
+        if round_trips:
+            entry["round_trip_ms_p50"] = statistics.median(round_trips)
+            baseline_trips = [
+                reference[row["image"]]["round_trip_ms"]
+                for row in rows
+                if "round_trip_ms" in reference.get(row["image"], {})
+            ]
+            if baseline_trips:
+                entry["round_trip_ms_saved_p50"] = (
+                    statistics.median(baseline_trips) - entry["round_trip_ms_p50"]
+                )
+            ious = [
+                _iou(row["bbox"], reference[row["image"]]["bbox"])
+                for row in rows
+                if "bbox" in row and "bbox" in reference.get(row["image"], {})
+            ]
+            if ious:
+                entry["bbox_iou_vs_baseline_min"] = min(ious)
+        summary[spec] = entry
+    return summary
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Compare vision payload transforms: bytes sent and round-trip latency."
+    )
+    parser.add_argument("images", type=Path, help="Directory of local test images")
+    parser.add_argument("--variant", action="append", default=None, help="format[:max_side[:quality]]")
+    parser.add_argument("--limit", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument(
+        "--live",
+        action="store_true",
+        help="Also call the vision model (needs FEATHERLESS_API_KEY) to time round trips",
+    )
+    parser.add_argument("--output", type=Path, default=None, help="Write the JSON report here")
+    return parser
+
+
+def main() -> int:
+    args = _build_parser().parse_args()
+    images = _load_images(args.images, args.limit)
+    if not images:
+        print(f"No images found in {args.images}")
+        return 1
+
+    variants = args.variant or list(DEFAULT_VARIANTS)
+    try:
+        runs = {spec: run_variant(spec, images, args.repeats, args.live) for spec in variants}
+    except RuntimeError as exc:
+        print(str(exc))
+        return 1
+
+    report = {
+        "live": args.live,
+        "summary": summarize_variants(runs, baseline=variants[0]),
+        "variants": runs,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output is not None:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    sys.stdout.write(text + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -28,7 +28,8 @@ class AssessRatios(BaseModel):
     length_px: float
     waist_to_chest: float
     width_profile: list[float] = Field(min_length=5, max_length=5)
-    belly_tuck: float
+    # None when no view could show the abdominal tuck (top view only).
+    belly_tuck: Optional[float] = None
 
 
 class AssessResponse(BaseModel):
@@ -39,3 +40,43 @@ class AssessResponse(BaseModel):
     bucket: Literal["UNDERWEIGHT", "IDEAL", "OVERWEIGHT", "OBESE", "UNKNOWN"]
     confidence: float = Field(ge=0.0, le=1.0)
     notes: str
+
+
+class AssessBatchItem(BaseModel):
+    id: Optional[str] = None
+    image_url: AnyUrl
+    meta: Optional[AssessRequestMeta] = None
+
+
+class AssessBatchRequest(BaseModel):
+    items: list[AssessBatchItem] = Field(min_length=1)
+
+
+class AssessBatchItemResult(BaseModel):
+    index: int
+    id: Optional[str] = None
+    ok: bool
+    result: Optional[AssessResponse] = None
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+
+
+class AssessViewInput(BaseModel):
+    view: Literal["side", "top"]
+    image_url: AnyUrl
+
+
+class AssessViewsRequest(BaseModel):
+    views: list[AssessViewInput] = Field(min_length=1, max_length=2)
+    meta: Optional[AssessRequestMeta] = None
+
+
+class AssessViewResult(BaseModel):
+    view: Literal["side", "top"]
+    mask: AssessMask
+    ratios: Optional[AssessRatios] = None
+    error: Optional[str] = None
+
+
+class AssessViewsResponse(AssessResponse):
+    views: list[AssessViewResult]
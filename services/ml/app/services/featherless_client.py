@@ -1,7 +1,24 @@
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import logging
 import os
 from typing import Any, Sequence
 
-from openai import APIConnectionError, APITimeoutError, OpenAI
+import httpx
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    AsyncOpenAI,
+    InternalServerError,
+    RateLimitError,
+)
+
+from .loop_clients import retire_client
+from .resilience import AdaptiveTimeout, CircuitBreaker, ResilientUpstream
+
+logger = logging.getLogger(__name__)
 
 DEFAULT_FEATHERLESS_BASE_URL = "https://api.featherless.ai/v1"
 FEATHERLESS_BASE_URL = os.getenv("FEATHERLESS_BASE_URL", DEFAULT_FEATHERLESS_BASE_URL)
@@ -11,61 +28,220 @@ FEATHERLESS_SECRET_HEADER = os.getenv(
 VISION_MODEL = os.getenv("VISION_MODEL", "google/gemma-3-27b-it")
 CHAT_MODEL = os.getenv("CHAT_MODEL", "meta-llama/Meta-Llama-3.1-8B-Instruct")
 REQUEST_TIMEOUT_SECONDS = float(os.getenv("FEATHERLESS_REQUEST_TIMEOUT_SECONDS", "30"))
+CONNECT_TIMEOUT_SECONDS = float(os.getenv("FEATHERLESS_CONNECT_TIMEOUT_SECONDS", "5"))
+# HTTP/2 multiplexes concurrent calls over a few connections; needs the ``h2`` package.
+HTTP2_ENABLED = os.getenv("FEATHERLESS_HTTP2", "true").strip().lower() in {"1", "true", "yes", "on"}
+MAX_CONNECTIONS = int(os.getenv("FEATHERLESS_MAX_CONNECTIONS", "64"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("FEATHERLESS_MAX_KEEPALIVE_CONNECTIONS", "16"))
+KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("FEATHERLESS_KEEPALIVE_SECONDS", "60"))
+WARMUP_TIMEOUT_SECONDS = float(os.getenv("FEATHERLESS_WARMUP_TIMEOUT_SECONDS", "5"))
+RETRIES = int(os.getenv("FEATHERLESS_RETRIES", "1"))
+BACKOFF_BASE_SECONDS = float(os.getenv("FEATHERLESS_BACKOFF_BASE_SECONDS", "0.25"))
+BACKOFF_MAX_SECONDS = float(os.getenv("FEATHERLESS_BACKOFF_MAX_SECONDS", "2"))
+# Consecutive transient failures that open a model's breaker, and how long it stays open.
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("FEATHERLESS_BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("FEATHERLESS_BREAKER_RESET_SECONDS", "30"))
+# Once enough calls are observed, attempts time out at this multiple of p95 latency.
+ADAPTIVE_TIMEOUT_MULTIPLIER = float(os.getenv("FEATHERLESS_TIMEOUT_MULTIPLIER", "3"))
+ADAPTIVE_TIMEOUT_MIN_SECONDS = float(os.getenv("FEATHERLESS_MIN_TIMEOUT_SECONDS", "5"))
+ADAPTIVE_TIMEOUT_MIN_SAMPLES = int(os.getenv("FEATHERLESS_LATENCY_MIN_SAMPLES", "20"))
+# Don't start an attempt that cannot finish inside the caller's deadline.
+MIN_ATTEMPT_SECONDS = 0.5
+# Connection errors and timeouts (APITimeoutError subclasses APIConnectionError),
+# 5xx and 429: the upstream is struggling, not rejecting the request.
+TRANSIENT_ERRORS: tuple[type[BaseException], ...] = (
+    APIConnectionError,
+    InternalServerError,
+    RateLimitError,
+)
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+class FeatherlessClient:
+    """Process-wide async Featherless client over one pooled keep-alive connection set.
+
+    Every upstream LLM call (chat and vision) shares this pool, so in-flight
+    calls wait on the event loop instead of each holding a worker thread.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_connections: int = MAX_CONNECTIONS,
+        max_keepalive_connections: int = MAX_KEEPALIVE_CONNECTIONS,
+        http2: bool = HTTP2_ENABLED,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self._max_connections = max_connections
+        self._max_keepalive_connections = max_keepalive_connections
+        self._http2 = http2
+        self._transport = transport
+        self._http_client: httpx.AsyncClient | None = None
+        self._client: AsyncOpenAI | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _ensure_client(self) -> AsyncOpenAI:
+        # Connections are bound to the loop that opened them.
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            api_key = os.getenv("FEATHERLESS_API_KEY")
+            if not api_key:
+                raise RuntimeError("FEATHERLESS_API_KEY is not set")
+            default_headers: dict[str, str] = {}
+            secret_key = os.getenv("FEATHERLESS_SECRET_KEY")
+            if secret_key:
+                default_headers[FEATHERLESS_SECRET_HEADER] = secret_key
+
+            if self._http_client is not None:
+                retire_client(self._http_client, self._loop)
+            http2 = self._http2 and _http2_available()
+            if self._http2 and not http2:
+                logger.warning("FEATHERLESS_HTTP2 is set but h2 is not installed; using HTTP/1.1")
+            self._http_client = httpx.AsyncClient(
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=self._max_connections,
+                    max_keepalive_connections=self._max_keepalive_connections,
+                    keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+                ),
+                timeout=httpx.Timeout(REQUEST_TIMEOUT_SECONDS, connect=CONNECT_TIMEOUT_SECONDS),
+                transport=self._transport,
+            )
+            self._client = AsyncOpenAI(
+                api_key=api_key,
+                base_url=FEATHERLESS_BASE_URL,
+                timeout=REQUEST_TIMEOUT_SECONDS,
+                max_retries=0,
+                default_headers=default_headers,
+                http_client=self._http_client,
+            )
+            self._loop = loop
+        return self._client
+
+    async def complete(
+        self,
+        *,
+        model: str,
+        messages: Sequence[dict[str, Any]],
+        timeout_seconds: float | None = None,
+        **kwargs: Any,
+    ) -> str:
+        """One chat completion; returns the first choice's text ("" if empty)."""
+        response = await self._ensure_client().chat.completions.create(
+            model=model,
+            messages=list(messages),
+            timeout=timeout_seconds,
+            **kwargs,
+        )
+        content = response.choices[0].message.content
+        return content if content is not None else ""
+
+    async def warm_up(self) -> None:
+        """Open a pooled connection (TCP, TLS, HTTP/2 preface) before the first real call.
+
+        Any HTTP status counts as warm; only connection errors are logged.
+        """
+        self._ensure_client()
+        assert self._http_client is not None
+        try:
+            await self._http_client.head(FEATHERLESS_BASE_URL, timeout=WARMUP_TIMEOUT_SECONDS)
+        except httpx.HTTPError as exc:
+            logger.warning("featherless warm-up failed: %s", exc)
 
-_client: OpenAI | None = None
-
-
-def get_client() -> OpenAI:
-    global _client
-    if _client is None:
-        api_key = os.getenv("FEATHERLESS_API_KEY")
-        if not api_key:
-            raise RuntimeError("FEATHERLESS_API_KEY is not set")
-        default_headers: dict[str, str] = {}
-        secret_key = os.getenv("FEATHERLESS_SECRET_KEY")
-        if secret_key:
-            default_headers[FEATHERLESS_SECRET_HEADER] = secret_key
-        _client = OpenAI(
-            api_key=api_key,
-            base_url=FEATHERLESS_BASE_URL,
-            timeout=REQUEST_TIMEOUT_SECONDS,
-            max_retries=0,
-            default_headers=default_headers,
+    async def aclose(self) -> None:
+        if self._http_client is not None:
+            await self._http_client.aclose()
+        self._http_client = None
+        self._client = None
+        self._loop = None
+
+
+featherless_client = FeatherlessClient()
+
+_upstreams: dict[str, ResilientUpstream] = {}
+
+
+def upstream_for(model: str) -> ResilientUpstream:
+    """The retry/breaker policy for ``model``; each model fails independently upstream."""
+    upstream = _upstreams.get(model)
+    if upstream is None:
+        upstream = _upstreams.setdefault(
+            model,
+            ResilientUpstream(
+                model,
+                transient=TRANSIENT_ERRORS,
+                timeouts=(APITimeoutError, TimeoutError),
+                breaker=CircuitBreaker(
+                    model,
+                    failure_threshold=BREAKER_FAILURE_THRESHOLD,
+                    reset_seconds=BREAKER_RESET_SECONDS,
+                ),
+                latency=AdaptiveTimeout(
+                    min_samples=ADAPTIVE_TIMEOUT_MIN_SAMPLES,
+                    multiplier=ADAPTIVE_TIMEOUT_MULTIPLIER,
+                    floor_seconds=ADAPTIVE_TIMEOUT_MIN_SECONDS,
+                ),
+                timeout_seconds=REQUEST_TIMEOUT_SECONDS,
+                retries=RETRIES,
+                backoff_base_seconds=BACKOFF_BASE_SECONDS,
+                backoff_max_seconds=BACKOFF_MAX_SECONDS,
+                min_attempt_seconds=MIN_ATTEMPT_SECONDS,
+            ),
         )
-    return _client
+    return upstream
+
+
+def upstream_stats() -> dict[str, Any]:
+    return {model: upstream.stats() for model, upstream in sorted(_upstreams.items())}
+
+
+def reset_upstreams() -> None:
+    _upstreams.clear()
 
 
-def _chat_once(
+async def _chat_once(
     model: str,
     messages: Sequence[dict[str, Any]],
     timeout_seconds: float | None = None,
 ) -> str:
-    response = get_client().chat.completions.create(
+    return await featherless_client.complete(
         model=model,
-        messages=list(messages),
-        timeout=timeout_seconds,
+        messages=messages,
+        timeout_seconds=timeout_seconds,
     )
-    content = response.choices[0].message.content
-    return content if content is not None else ""
 
 
-def _chat_with_single_retry(
+async def _chat_with_retry(
     model: str,
     messages: Sequence[dict[str, Any]],
     timeout_seconds: float | None = None,
 ) -> str:
-    try:
-        return _chat_once(model=model, messages=messages, timeout_seconds=timeout_seconds)
-    except (APIConnectionError, APITimeoutError):
-        return _chat_once(model=model, messages=messages, timeout_seconds=timeout_seconds)
+    """One chat call under ``model``'s retry and breaker policy.
+
+    Raises ``CircuitOpenError`` without calling out while the breaker is open.
+    """
+    return await upstream_for(model).call(
+        lambda attempt_timeout: _chat_once(
+            model=model,
+            messages=messages,
+            timeout_seconds=attempt_timeout,
+        ),
+        timeout_seconds=timeout_seconds,
+    )
 
 
-def vision_chat(messages: Sequence[dict[str, Any]]) -> str:
-    return _chat_with_single_retry(model=VISION_MODEL, messages=messages)
+async def vision_chat(messages: Sequence[dict[str, Any]]) -> str:
+    return await _chat_with_retry(model=VISION_MODEL, messages=messages)
 
 
-def text_chat(messages: Sequence[dict[str, Any]], timeout_seconds: float | None = None) -> str:
-    return _chat_with_single_retry(
+async def text_chat(
+    messages: Sequence[dict[str, Any]],
+    timeout_seconds: float | None = None,
+) -> str:
+    return await _chat_with_retry(
         model=CHAT_MODEL,
         messages=messages,
         timeout_seconds=timeout_seconds,
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from urllib.parse import urlsplit
+
+import httpx
+
+from .loop_clients import retire_client
+
+MAX_IMAGE_BYTES = int(os.getenv("IMAGE_FETCH_MAX_BYTES", str(16 * 1024 * 1024)))
+MAX_CONNECTIONS = int(os.getenv("IMAGE_FETCH_MAX_CONNECTIONS", "32"))
+MAX_CONNECTIONS_PER_HOST = int(os.getenv("IMAGE_FETCH_MAX_CONNECTIONS_PER_HOST", "4"))
+KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("IMAGE_FETCH_KEEPALIVE_SECONDS", "30"))
+MAX_REDIRECTS = int(os.getenv("IMAGE_FETCH_MAX_REDIRECTS", "5"))
+_CHUNK_SIZE = 64 * 1024
+
+
+class ImageFetchError(Exception):
+    """Raised when an image URL cannot be fetched within the limits."""
+
+
+class ImageTooLargeError(ImageFetchError):
+    pass
+
+
+class ImageFetchTimeoutError(ImageFetchError):
+    pass
+
+
+class ImageFetcher:
+    """Pooled keep-alive image downloader with a byte cap and per-host limits.
+
+    Redirects are followed here rather than by httpx, so every hop holds the
+    slot of the host it actually connects to.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_bytes: int = MAX_IMAGE_BYTES,
+        max_connections: int = MAX_CONNECTIONS,
+        max_connections_per_host: int = MAX_CONNECTIONS_PER_HOST,
+        max_redirects: int = MAX_REDIRECTS,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self._max_bytes = max_bytes
+        self._max_connections = max_connections
+        self._max_connections_per_host = max(1, max_connections_per_host)
+        self._max_redirects = max(0, max_redirects)
+        self._transport = transport
+        self._client: httpx.AsyncClient | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._host_slots: dict[str, asyncio.Semaphore] = {}
+
+    def _ensure_client(self) -> httpx.AsyncClient:
+        # Clients and semaphores are bound to the loop that first uses them.
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            if self._client is not None:
+                retire_client(self._client, self._loop)
+            self._client = httpx.AsyncClient(
+                follow_redirects=False,
+                limits=httpx.Limits(
+                    max_connections=self._max_connections,
+                    max_keepalive_connections=self._max_connections,
+                    keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+                ),
+                transport=self._transport,
+            )
+            self._loop = loop
+            self._host_slots = {}
+        return self._client
+
+    def _host_slot(self, url: str) -> asyncio.Semaphore:
+        host = (urlsplit(url).hostname or "").lower()
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = asyncio.Semaphore(self._max_connections_per_host)
+            self._host_slots[host] = slot
+        return slot
+
+    async def _download(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        timeout_seconds: float,
+    ) -> tuple[bytes, str | None] | httpx.URL:
+        """Body and mime type of ``url``, or the redirect target to fetch next."""
+        async with client.stream("GET", url, timeout=timeout_seconds) as response:
+            if response.is_redirect and response.next_request is not None:
+                return response.next_request.url
+            if response.status_code >= 400:
+                raise ImageFetchError(f"Image host returned HTTP {response.status_code}.")
+
+            declared = response.headers.get("content-length")
+            if declared and declared.isdigit() and int(declared) > self._max_bytes:
+                raise ImageTooLargeError("Image exceeds the maximum allowed size.")
+
+            chunks: list[bytes] = []
+            total = 0
+            async for chunk in response.aiter_bytes(_CHUNK_SIZE):
+                total += len(chunk)
+                if total > self._max_bytes:
+                    raise ImageTooLargeError("Image exceeds the maximum allowed size.")
+                chunks.append(chunk)
+
+            content_type = response.headers.get("content-type", "")
+            header_mime = content_type.split(";", 1)[0].strip().lower() or None
+            return b"".join(chunks), header_mime
+
+    async def fetch(self, url: str, timeout_seconds: float) -> tuple[bytes, str | None]:
+        """Fetch ``url`` within ``timeout_seconds``, including time spent queued for a slot."""
+        client = self._ensure_client()
+        timeout_seconds = max(0.1, timeout_seconds)
+        try:
+            async with asyncio.timeout(timeout_seconds):
+                for _ in range(self._max_redirects + 1):
+                    async with self._host_slot(url):
+                        result = await self._download(client, url, timeout_seconds)
+                    if not isinstance(result, httpx.URL):
+                        return result
+                    url = str(result)
+        except (TimeoutError, httpx.TimeoutException) as exc:
+            raise ImageFetchTimeoutError("Timed out fetching image.") from exc
+        except httpx.HTTPError as exc:
+            raise ImageFetchError("Unable to fetch image.") from exc
+        raise ImageFetchError("Too many redirects fetching image.")
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+        self._loop = None
+        self._host_slots = {}
+
+
+image_fetcher = ImageFetcher()
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Strong references so pending closes are not garbage-collected mid-flight.
+_pending_closes: set[Any] = set()
+
+
+async def _close_quietly(client: httpx.AsyncClient) -> None:
+    try:
+        await client.aclose()
+    except Exception as exc:
+        # Transports bound to a closed loop can fail to shut down cleanly.
+        logger.debug("closing stale http client failed: %s", exc)
+
+
+def retire_client(client: httpx.AsyncClient, loop: asyncio.AbstractEventLoop | None) -> None:
+    """Close ``client``, opened on ``loop``, after its owner moved to the running loop.
+
+    The close runs on ``loop`` while that loop is still running elsewhere,
+    otherwise on the running loop, so pooled connections are not leaked.
+    """
+    current = asyncio.get_running_loop()
+    if loop is not None and loop is not current and loop.is_running() and not loop.is_closed():
+        future: Any = asyncio.run_coroutine_threadsafe(_close_quietly(client), loop)
+    else:
+        future = current.create_task(_close_quietly(client))
+    _pending_closes.add(future)
+    future.add_done_callback(_pending_closes.discard)
@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an upstream whose breaker is open."""
+
+    def __init__(self, name: str, retry_after_seconds: float) -> None:
+        super().__init__(f"{name} circuit is open; retry in {retry_after_seconds:.1f}s")
+        self.name = name
+        self.retry_after_seconds = retry_after_seconds
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after_seconds)))
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with half-open probing.
+
+    ``failure_threshold`` transient failures in a row open the circuit; calls
+    then fail fast for ``reset_seconds``, after which up to ``half_open_probes``
+    calls are let through. A successful probe closes the circuit, a failed
+    one re-opens it for another ``reset_seconds``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        failure_threshold: int,
+        reset_seconds: float,
+        half_open_probes: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self._failure_threshold = max(1, failure_threshold)
+        self._reset_seconds = reset_seconds
+        self._half_open_probes = max(1, half_open_probes)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._opened_total = 0
+        self._rejected_total = 0
+
+    def _refresh(self) -> None:
+        if self._state == OPEN and self._clock() - self._opened_at >= self._reset_seconds:
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+
+    def _open(self) -> None:
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._probes_in_flight = 0
+        self._opened_total += 1
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh()
+            return self._state
+
+    def retry_after(self) -> float:
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self._reset_seconds - (self._clock() - self._opened_at))
+
+    def acquire(self) -> None:
+        """Admit one call or raise ``CircuitOpenError``; pair with exactly one record/release."""
+        with self._lock:
+            self._refresh()
+            if self._state == CLOSED:
+                return
+            if self._state == HALF_OPEN and self._probes_in_flight < self._half_open_probes:
+                self._probes_in_flight += 1
+                return
+            self._rejected_total += 1
+            retry_after = (
+                max(0.0, self._reset_seconds - (self._clock() - self._opened_at))
+                if self._state == OPEN
+                else self._reset_seconds
+            )
+        raise CircuitOpenError(self.name, retry_after)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._consecutive_failures = 0
+            if self._state != CLOSED:
+                self._state = CLOSED
+                self._probes_in_flight = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._state == HALF_OPEN or (
+                self._state == CLOSED and self._consecutive_failures >= self._failure_threshold
+            ):
+                self._open()
+
+    def release(self) -> None:
+        """Give back an admitted call that ended without a verdict (e.g. caller cancelled)."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes_in_flight > 0:
+                self._probes_in_flight -= 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._consecutive_failures = 0
+            self._probes_in_flight = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            self._refresh()
+            return {
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "opened_total": self._opened_total,
+                "rejected_total": self._rejected_total,
+            }
+
+
+class AdaptiveTimeout:
+    """Per-attempt timeout from recently observed successful latencies.
+
+    Until ``min_samples`` calls have been seen the caller's ceiling is used;
+    afterwards the timeout is ``multiplier`` x the ``percentile`` latency,
+    clamped to ``[floor_seconds, ceiling]``.
+    """
+
+    def __init__(
+        self,
+        *,
+        window: int = 200,
+        min_samples: int = 20,
+        percentile: float = 0.95,
+        multiplier: float = 3.0,
+        floor_seconds: float = 5.0,
+    ) -> None:
+        self._samples: deque[float] = deque(maxlen=window)
+        self._min_samples = min_samples
+        self._percentile = percentile
+        self._multiplier = multiplier
+        self._floor_seconds = floor_seconds
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def _latency_at_percentile(self) -> float | None:
+        with self._lock:
+            if len(self._samples) < self._min_samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(self._percentile * len(ordered)))
+        return ordered[index]
+
+    def timeout(self, ceiling: float) -> float:
+        observed = self._latency_at_percentile()
+        if observed is None:
+            return ceiling
+        return min(ceiling, max(self._floor_seconds, observed * self._multiplier))
+
+    def stats(self, ceiling: float) -> dict[str, Any]:
+        observed = self._latency_at_percentile()
+        with self._lock:
+            samples = len(self._samples)
+        return {
+            "samples": samples,
+            "latency_p_seconds": observed,
+            "timeout_seconds": self.timeout(ceiling),
+        }
+
+
+def backoff_seconds(
+    attempt: int,
+    base_seconds: float,
+    max_seconds: float,
+    rng: Callable[[], float] = random.random,
+) -> float:
+    """Full-jitter exponential backoff before retry number ``attempt`` (0-based)."""
+    return rng() * min(max_seconds, base_seconds * (2**attempt))
+
+
+class ResilientUpstream:
+    """Retry, breaker and adaptive-timeout policy around one upstream operation.
+
+    Only exceptions in ``transient`` are retried and count against the
+    breaker. Other errors (4xx, auth, bad payloads) are raised unchanged and
+    say nothing about upstream health, so they record no outcome; neither
+    does a ``timeouts`` error on an attempt the caller's deadline cut short.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        transient: tuple[type[BaseException], ...],
+        timeouts: tuple[type[BaseException], ...] = (TimeoutError,),
+        breaker: CircuitBreaker,
+        latency: AdaptiveTimeout,
+        timeout_seconds: float,
+        retries: int = 1,
+        backoff_base_seconds: float = 0.25,
+        backoff_max_seconds: float = 2.0,
+        min_attempt_seconds: float = 0.5,
+        sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+        rng: Callable[[], float] = random.random,
+    ) -> None:
+        self.name = name
+        self.breaker = breaker
+        self.latency = latency
+        self._transient = transient
+        self._timeouts = timeouts
+        self._retries = max(0, retries)
+        self._backoff_base_seconds = backoff_base_seconds
+        self._backoff_max_seconds = backoff_max_seconds
+        self._min_attempt_seconds = min_attempt_seconds
+        self._sleep = sleep
+        self._rng = rng
+        self._lock = threading.Lock()
+        self._retries_total = 0
+        self._timeout_seconds = timeout_seconds
+
+    def _attempt_timeout(self, ceiling: float, deadline: float | None) -> tuple[float, bool]:
+        """Per-attempt timeout, and whether the caller's deadline is what bounds it."""
+        timeout_seconds = self.latency.timeout(ceiling)
+        if deadline is not None and deadline - time.monotonic() < timeout_seconds:
+            return deadline - time.monotonic(), True
+        return timeout_seconds, False
+
+    async def call(
+        self,
+        operation: Callable[[float], Awaitable[T]],
+        *,
+        timeout_seconds: float | None = None,
+        deadline: float | None = None,
+    ) -> T:
+        """Run ``operation(attempt_timeout)`` under the policy.
+
+        ``timeout_seconds`` overrides the per-attempt ceiling; ``deadline``
+        (``time.monotonic()``) caps every attempt and backoff, and
+        ``TimeoutError`` is raised rather than starting an attempt that
+        cannot finish in time. ``CircuitOpenError`` is raised without
+        calling the upstream while the breaker is open.
+        """
+        ceiling = self._timeout_seconds if timeout_seconds is None else timeout_seconds
+        for attempt in range(self._retries + 1):
+            attempt_timeout, budget_bound = self._attempt_timeout(ceiling, deadline)
+            if attempt_timeout < self._min_attempt_seconds:
+                raise TimeoutError(f"{self.name} request deadline exceeded")
+            self.breaker.acquire()
+            started = time.monotonic()
+            try:
+                result = await operation(attempt_timeout)
+            except self._transient as exc:
+                if budget_bound and isinstance(exc, self._timeouts):
+                    # The caller ran out of budget; the upstream may be fine.
+                    self.breaker.release()
+                    raise
+                self.breaker.record_failure()
+                if attempt >= self._retries or self.breaker.state != CLOSED:
+                    raise
+                delay = backoff_seconds(
+                    attempt,
+                    self._backoff_base_seconds,
+                    self._backoff_max_seconds,
+                    self._rng,
+                )
+                if (
+                    deadline is not None
+                    and deadline - time.monotonic() - delay < self._min_attempt_seconds
+                ):
+                    raise
+                with self._lock:
+                    self._retries_total += 1
+                await self._sleep(delay)
+                continue
+            except BaseException:
+                self.breaker.release()
+                raise
+            self.latency.observe(time.monotonic() - started)
+            self.breaker.record_success()
+            return result
+        raise AssertionError("unreachable")
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            retries_total = self._retries_total
+        return {
+            **self.breaker.stats(),
+            "retries_total": retries_total,
+            "adaptive_timeout": self.latency.stats(self._timeout_seconds),
+        }
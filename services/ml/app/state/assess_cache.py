@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable
+
+from app.schemas.assess import AssessResponse
+
+RESULT_CACHE_ENTRIES = int(os.getenv("ASSESS_RESULT_CACHE_ENTRIES", "256"))
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("ASSESS_RESULT_CACHE_TTL_SECONDS", "600"))
+
+
+def assess_cache_key(
+    image_bytes: bytes,
+    *,
+    species: str | None,
+    breed_hint: str | None,
+    weight_kg: float | None,
+) -> str:
+    digest = hashlib.sha256(image_bytes)
+    for part in (species, breed_hint, weight_kg):
+        digest.update(b"\x00")
+        digest.update(repr(part).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class AssessResultCache:
+    def __init__(
+        self,
+        max_entries: int = RESULT_CACHE_ENTRIES,
+        ttl_seconds: float = RESULT_CACHE_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._lock = Lock()
+        self._max_entries = max(0, max_entries)
+        self._ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._data: OrderedDict[str, tuple[float, AssessResponse]] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: str) -> AssessResponse | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            expires_at, response = entry
+            if expires_at <= self._clock():
+                del self._data[key]
+                self._misses += 1
+                return None
+            self._data.move_to_end(key)
+            self._hits += 1
+            return response.model_copy(deep=True)
+
+    def put(self, key: str, response: AssessResponse) -> None:
+        if self._max_entries == 0 or self._ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._data[key] = (self._clock() + self._ttl_seconds, response.model_copy(deep=True))
+            self._data.move_to_end(key)
+            while len(self._data) > self._max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict[str, float | int]:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "max_entries": self._max_entries,
+                "ttl_seconds": self._ttl_seconds,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
+
+
+assess_result_cache = AssessResultCache()
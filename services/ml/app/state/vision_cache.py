@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import copy
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable
+
+from app.ml.perceptual_hash import HASH_BITS, hamming
+
+VISION_CACHE_ENTRIES = int(os.getenv("VISION_CACHE_ENTRIES", "1024"))
+VISION_CACHE_TTL_SECONDS = float(os.getenv("VISION_CACHE_TTL_SECONDS", "3600"))
+VISION_CACHE_MAX_DISTANCE = int(os.getenv("VISION_CACHE_MAX_DISTANCE", "5"))
+# Near-duplicates must also share the frame shape, or a cached bbox would not fit.
+VISION_CACHE_ASPECT_TOLERANCE = float(os.getenv("VISION_CACHE_ASPECT_TOLERANCE", "0.05"))
+# The hash is split into this many bands for the lookup index; a match within
+# ``bands - 1`` bits must agree exactly on at least one band.
+_BANDS = 8
+_BAND_BITS = HASH_BITS // _BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+
+
+def _bands(phash: int) -> list[tuple[int, int]]:
+    return [(band, (phash >> (band * _BAND_BITS)) & _BAND_MASK) for band in range(_BANDS)]
+
+
+class PerceptualHashCache:
+    """TTL + LRU cache looked up by Hamming distance between perceptual hashes.
+
+    Candidates come from a multi-index over hash bands, so a lookup only
+    compares against entries sharing a band instead of scanning the cache.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = VISION_CACHE_ENTRIES,
+        ttl_seconds: float = VISION_CACHE_TTL_SECONDS,
+        max_distance: int = VISION_CACHE_MAX_DISTANCE,
+        aspect_tolerance: float = VISION_CACHE_ASPECT_TOLERANCE,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._lock = Lock()
+        self._max_entries = max(0, max_entries)
+        self._ttl_seconds = ttl_seconds
+        self._max_distance = max(0, min(max_distance, _BANDS - 1))
+        self._aspect_tolerance = aspect_tolerance
+        self._clock = clock
+        # phash -> (expires_at, aspect, value)
+        self._data: OrderedDict[int, tuple[float, float, Any]] = OrderedDict()
+        self._index: dict[tuple[int, int], set[int]] = {}
+        self._hits = 0
+        self._near_hits = 0
+        self._misses = 0
+
+    def _unlink(self, phash: int) -> None:
+        del self._data[phash]
+        for band in _bands(phash):
+            bucket = self._index.get(band)
+            if bucket is not None:
+                bucket.discard(phash)
+                if not bucket:
+                    del self._index[band]
+
+    def get(self, phash: int, aspect: float) -> Any | None:
+        with self._lock:
+            now = self._clock()
+            candidates: set[int] = set()
+            for band in _bands(phash):
+                candidates |= self._index.get(band, set())
+
+            best: tuple[int, int] | None = None
+            for candidate in candidates:
+                expires_at, cached_aspect, _ = self._data[candidate]
+                if expires_at <= now:
+                    self._unlink(candidate)
+                    continue
+                if abs(cached_aspect - aspect) > self._aspect_tolerance * aspect:
+                    continue
+                distance = hamming(phash, candidate)
+                if distance <= self._max_distance and (best is None or distance < best[0]):
+                    best = (distance, candidate)
+
+            if best is None:
+                self._misses += 1
+                return None
+            distance, match = best
+            self._data.move_to_end(match)
+            self._hits += 1
+            if distance:
+                self._near_hits += 1
+            return copy.deepcopy(self._data[match][2])
+
+    def put(self, phash: int, aspect: float, value: Any) -> None:
+        if self._max_entries == 0 or self._ttl_seconds <= 0:
+            return
+        with self._lock:
+            if phash in self._data:
+                self._unlink(phash)
+            self._data[phash] = (self._clock() + self._ttl_seconds, aspect, copy.deepcopy(value))
+            for band in _bands(phash):
+                self._index.setdefault(band, set()).add(phash)
+            while len(self._data) > self._max_entries:
+                self._unlink(next(iter(self._data)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._index.clear()
+
+    def stats(self) -> dict[str, float | int]:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "max_entries": self._max_entries,
+                "ttl_seconds": self._ttl_seconds,
+                "max_distance": self._max_distance,
+                "hits": self._hits,
+                "near_hits": self._near_hits,
+                "misses": self._misses,
+            }
+
+
+breed_bbox_cache = PerceptualHashCache()
@@ -0,0 +1,19 @@
+import pytest
+
+from app.api.assess import _sam_availability
+from app.services.featherless_client import reset_upstreams
+from app.state.assess_cache import assess_result_cache
+from app.state.vision_cache import breed_bbox_cache
+
+
+@pytest.fixture(autouse=True)
+def _clear_assess_caches():
+    assess_result_cache.clear()
+    breed_bbox_cache.clear()
+    _sam_availability.reset()
+    reset_upstreams()
+    yield
+    assess_result_cache.clear()
+    breed_bbox_cache.clear()
+    _sam_availability.reset()
+    reset_upstreams()
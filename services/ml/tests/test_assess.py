@@ -1,45 +1,76 @@
+import asyncio
+
 import numpy as np
+import pytest
 from fastapi.testclient import TestClient
 
 from app.main import app
+from app.ml.compact_mask import CompactMask
+from app.ml.decoded_image import DecodedImage
 
 client = TestClient(app)
 
 
-def _stub_fetch(_image_url: str, _deadline: float) -> tuple[bytes, str]:
+def _as_async(fn):
+    """Wrap a sync stub for patching an ``async def`` such as ``breed_bbox``."""
+
+    async def call(*args, **kwargs):
+        return fn(*args, **kwargs)
+
+    return call
+
+
+async def _stub_fetch(_image_url: str, _deadline: float) -> tuple[bytes, str]:
     return (b"fake-image-bytes", "image/jpeg")
 
 
-def _stub_decode_rgb(_image_bytes: bytes) -> np.ndarray:
-    return np.zeros((16, 16, 3), dtype=np.uint8)
+def _stub_decode_image(
+    image_bytes: bytes,
+    fallback_mime: str | None,
+    *,
+    not_image_detail: str,
+) -> DecodedImage:
+    _ = not_image_detail
+    return DecodedImage(
+        data=image_bytes,
+        format="JPEG",
+        size=(16, 16),
+        rgb=np.zeros((16, 16, 3), dtype=np.uint8),
+        fallback_mime=fallback_mime,
+    )
 
 
 def test_assess_happy_path(monkeypatch) -> None:
     from app.api import assess as assess_api
 
     monkeypatch.setattr(assess_api, "_fetch_image_bytes_and_mime", _stub_fetch)
-    monkeypatch.setattr(assess_api, "_decode_rgb", _stub_decode_rgb)
+    monkeypatch.setattr(assess_api, "_decode_image", _stub_decode_image)
     monkeypatch.setattr(
         assess_api,
         "breed_bbox",
-        lambda image_bytes, mime: {
-            "species": "dog",
-            "breed_top3": [
-                {"breed": "labrador_retriever", "p": 0.62},
-                {"breed": "golden_retriever", "p": 0.21},
-                {"breed": "mixed", "p": 0.17},
-            ],
-            "bbox": [2, 2, 14, 14],
-        },
+        _as_async(
+            lambda image, deadline=None: {
+                "species": "dog",
+                "breed_top3": [
+                    {"breed": "labrador_retriever", "p": 0.62},
+                    {"breed": "golden_retriever", "p": 0.21},
+                    {"breed": "mixed", "p": 0.17},
+                ],
+                "bbox": [2, 2, 14, 14],
+            }
+        ),
     )
+    monkeypatch.setattr(assess_api._segmenter, "embed", lambda image_rgb, cancel_check=None: object())
     monkeypatch.setattr(
         assess_api._segmenter,
-        "segment",
-        lambda image_rgb, bbox: np.pad(
-            np.ones((8, 8), dtype=np.uint8),
-            pad_width=((4, 4), (4, 4)),
-            mode="constant",
-            constant_values=0,
+        "predict_compact_mask",
+        lambda embedding, bbox, cancel_check=None: CompactMask.from_dense(
+            np.pad(
+                np.ones((8, 8), dtype=np.uint8),
+                pad_width=((4, 4), (4, 4)),
+                mode="constant",
+                constant_values=0,
+            )
         ),
     )
     monkeypatch.setattr(
@@ -68,28 +99,186 @@ def test_assess_happy_path(monkeypatch) -> None:
     assert body["bucket"] == "OVERWEIGHT"
 
 
+def test_assess_uses_local_breed_router_when_confident(monkeypatch) -> None:
+    from types import SimpleNamespace
+
+    from app.api import assess as assess_api
+    from app.ml.breed_router import HybridBreedRouter
+
+    class ConfidentClassifier:
+        def checkpoint_exists(self) -> bool:
+            return True
+
+        def predict(self, image, *, top_k: int = 3):
+            return SimpleNamespace(
+                species="dog",
+                breed_top3=[
+                    {"breed": "beagle", "p": 0.93},
+                    {"breed": "basset_hound", "p": 0.04},
+                    {"breed": "mixed", "p": 0.03},
+                ],
+                top1_p=0.93,
+            )
+
+    async def remote_must_not_run(image, deadline=None):
+        raise AssertionError("vision model called despite a confident local answer")
+
+    router = HybridBreedRouter(assess_api._segmenter, ConfidentClassifier(), enabled=True)
+    monkeypatch.setattr(assess_api, "_breed_router", router)
+    monkeypatch.setattr(assess_api, "_fetch_image_bytes_and_mime", _stub_fetch)
+    monkeypatch.setattr(assess_api, "_decode_image", _stub_decode_image)
+    monkeypatch.setattr(assess_api, "breed_bbox", remote_must_not_run)
+    monkeypatch.setattr(assess_api._segmenter, "embed", lambda image_rgb, cancel_check=None: object())
+    monkeypatch.setattr(
+        assess_api._segmenter,
+        "predict_compact_mask",
+        lambda embedding, bbox, cancel_check=None: CompactMask.from_dense(
+            np.pad(np.ones((8, 8), dtype=np.uint8), pad_width=((4, 4), (4, 4)))
+        ),
+    )
+    monkeypatch.setattr(assess_api, "load_priors", lambda: None)
+
+    response = client.post("/assess", json={"image_url": "https://example.com/pet.jpg"})
+
+    assert response.status_code == 200
+    assert response.json()["breed_top3"][0]["breed"] == "beagle"
+    assert router.stats()["outcomes"] == {"local": 1}
+
+
+def test_assess_local_breed_cancellation_returns_504(monkeypatch) -> None:
+    from types import SimpleNamespace
+
+    from app.api import assess as assess_api
+    from app.core.cancellation import OperationCancelled
+    from app.ml.breed_router import HybridBreedRouter
+
+    class ConfidentClassifier:
+        def checkpoint_exists(self) -> bool:
+            return True
+
+        def predict(self, image, *, top_k: int = 3):
+            return SimpleNamespace(
+                species="dog",
+                breed_top3=[
+                    {"breed": "beagle", "p": 0.93},
+                    {"breed": "basset_hound", "p": 0.04},
+                    {"breed": "mixed", "p": 0.03},
+                ],
+                top1_p=0.93,
+            )
+
+    def cancelled_embed(image_rgb, cancel_check=None):
+        raise OperationCancelled("operation cancelled")
+
+    router = HybridBreedRouter(assess_api._segmenter, ConfidentClassifier(), enabled=True)
+    monkeypatch.setattr(assess_api, "_breed_router", router)
+    monkeypatch.setattr(assess_api, "_fetch_image_bytes_and_mime", _stub_fetch)
+    monkeypatch.setattr(assess_api, "_decode_image", _stub_decode_image)
+    monkeypatch.setattr(assess_api._segmenter, "embed", cancelled_embed)
+
+    response = client.post("/assess", json={"image_url": "https://example.com/pet.jpg"})
+
+    assert response.status_code == 504
+
+
+def test_assess_full_queue_on_local_breed_falls_back_to_vision(monkeypatch) -> None:
+    from types import SimpleNamespace
+
+    from app.api import assess as assess_api
+    from app.core.work_queue import AdmissionRejected
+    from app.ml.breed_router import HybridBreedRouter
+
+    class ConfidentClassifier:
+        def checkpoint_exists(self) -> bool:
+            return True
+
+        def predict(self, image, *, top_k: int = 3):
+            return SimpleNamespace(
+                species="dog",
+                breed_top3=[
+                    {"breed": "beagle", "p": 0.93},
+                    {"breed": "basset_hound", "p": 0.04},
+                    {"breed": "mixed", "p": 0.03},
+                ],
+                top1_p=0.93,
+            )
+
+    submit = assess_api._executor.submit
+
+    def reject_local_breed(fn, *args, **kwargs):
+        # Only the local classifier call takes ``min_confidence``.
+        if "min_confidence" in kwargs:
+            raise AdmissionRejected("queue_full", 1.0)
+        return submit(fn, *args, **kwargs)
+
+    router = HybridBreedRouter(assess_api._segmenter, ConfidentClassifier(), enabled=True)
+    monkeypatch.setattr(assess_api, "_breed_router", router)
+    monkeypatch.setattr(assess_api._executor, "submit", reject_local_breed)
+    monkeypatch.setattr(assess_api, "_fetch_image_bytes_and_mime", _stub_fetch)
+    monkeypatch.setattr(assess_api, "_decode_image", _stub_decode_image)
+    monkeypatch.setattr(
+        assess_api,
+        "breed_bbox",
+        _as_async(
+            lambda image, deadline=None: {
+                "species": "dog",
+                "breed_top3": [
+                    {"breed": "labrador_retriever", "p": 0.62},
+                    {"breed": "golden_retriever", "p": 0.21},
+                    {"breed": "mixed", "p": 0.17},
+                ],
+                "bbox": [2, 2, 14, 14],
+            }
+        ),
+    )
+    monkeypatch.setattr(assess_api._segmenter, "embed", lambda image_rgb, cancel_check=None: object())
+    monkeypatch.setattr(
+        assess_api._segmenter,
+        "predict_compact_mask",
+        lambda embedding, bbox, cancel_check=None: CompactMask.from_dense(
+            np.pad(np.ones((8, 8), dtype=np.uint8), pad_width=((4, 4), (4, 4)))
+        ),
+    )
+    monkeypatch.setattr(assess_api, "load_priors", lambda: None)
+
+    response = client.post("/assess", json={"image_url": "https://example.com/pet.jpg"})
+
+    assert response.status_code == 200
+    assert response.json()["breed_top3"][0]["breed"] == "labrador_retriever"
+    assert router.stats()["outcomes"] == {"remote:queue_full": 1}
+
+
 def test_assess_segmentation_failure_returns_unknown(monkeypatch) -> None:
     from app.api import assess as assess_api
 
     monkeypatch.setattr(assess_api, "_fetch_image_bytes_and_mime", _stub_fetch)
-    monkeypatch.setattr(assess_api, "_decode_rgb", _stub_decode_rgb)
+    monkeypatch.setattr(assess_api, "_decode_image", _stub_decode_image)
     monkeypatch.setattr(
         assess_api,
         "breed_bbox",
-        lambda image_bytes, mime: {
-            "species": "cat",
-            "breed_top3": [
-                {"breed": "siamese", "p": 0.80},
-                {"breed": "ragdoll", "p": 0.15},
-                {"breed": "mixed", "p": 0.05},
-            ],
-            "bbox": [1, 1, 12, 12],
-        },
+        _as_async(
+            lambda image, deadline=None: {
+                "species": "cat",
+                "breed_top3": [
+                    {"breed": "siamese", "p": 0.80},
+                    {"breed": "ragdoll", "p": 0.15},
+                    {"breed": "mixed", "p": 0.05},
+                ],
+                "bbox": [1, 1, 12, 12],
+            }
+        ),
     )
     monkeypatch.setattr(
         assess_api._segmenter,
-        "segment",
-        lambda image_rgb, bbox: (_ for _ in ()).throw(RuntimeError("seg failed")),
+        "embed",
+        lambda image_rgb, cancel_check=None: (_ for _ in ()).throw(RuntimeError("seg failed")),
+    )
+    monkeypatch.setattr(
+        assess_api._fallback_segmenter,
+        "predict_compact_mask",
+        lambda embedding, bbox, cancel_check=None: (_ for _ in ()).throw(
+            RuntimeError("fallback failed")
+        ),
     )
 
     response = client.post(
@@ -104,15 +293,138 @@ def test_assess_segmentation_failure_returns_unknown(monkeypatch) -> None:
     assert body["bucket"] == "UNKNOWN"
 
 
+def _stub_classic_decode_image(
+    image_bytes: bytes,
+    fallback_mime: str | None,
+    *,
+    not_image_detail: str,
+) -> DecodedImage:
+    _ = not_image_detail
+    rgb = np.zeros((64, 96, 3), dtype=np.uint8)
+    rgb[:] = (40, 150, 40)
+    rgb[16:48, 24:72] = (200, 120, 60)
+    return DecodedImage(
+        data=image_bytes,
+        format="JPEG",
+        size=(96, 64),
+        rgb=rgb,
+        fallback_mime=fallback_mime,
+    )
+
+
+async def _stub_dog_bbox(image, deadline=None) -> dict:
+    return {
+        "species": "dog",
+        "breed_top3": [
+            {"breed": "beagle", "p": 0.7},
+            {"breed": "basset_hound", "p": 0.2},
+            {"breed": "mixed", "p": 0.1},
+        ],
+        "bbox": [20, 12, 76, 52],
+    }
+
+
+def test_assess_falls_back_to_classic_segmenter_when_sam_fails(monkeypatch) -> None:
+    from app.api import assess as assess_api
+
+    embed_calls = []
+
+    def failing_embed(image_rgb, cancel_check=None):
+        embed_calls.append(image_rgb)
+        raise RuntimeError("mobile_sam is not installed")
+
+    monkeypatch.setattr(assess_api, "_fetch_image_bytes_and_mime", _stub_fetch)
+    monkeypatch.setattr(assess_api, "_decode_image", _stub_classic_decode_image)
+    monkeypatch.setattr(assess_api, "breed_bbox", _stub_dog_bbox)
+    monkeypatch.setattr(assess_api._segmenter, "embed", failing_embed)
+    monkeypatch.setattr(assess_api, "load_priors", lambda: None)
+    before = assess_api.segmenter_metrics()["classic_fallback"]["fallbacks"]
+
+    first = client.post("/assess", json={"image_url": "https://example.com/pet.jpg"})
+    second = client.post("/assess", json={"image_url": "https://example.com/pet.jpg"})
+
+    for response in (first, second):
+        assert response.status_code == 200
+        body = response.json()
+        assert body["mask"] == {"available": True}
+        assert body["ratios"]["length_px"] > 0
+        assert "Approximate fallback segmentation used" in body["notes"]
+    # The failure starts a cooldown: the second request does not retry MobileSAM.
+    assert len(embed_calls) == 1
+    after = assess_api.segmenter_metrics()["classic_fallback"]["fallbacks"]
+    assert {key: after[key] - before[key] for key in after} == {
+        "failure": 1,
+        "cooldown": 1,
+        "load": 0,
+    }
+
+
+def test_assess_per_image_ratio_error_does_not_start_sam_cooldown(monkeypatch) -> None:
+    from app.api import assess as assess_api
+
+    def degenerate_ratios(mask):
+        raise ValueError("mask too thin for a width profile")
+
+    monkeypatch.setattr(assess_api, "_fetch_image_bytes_and_mime", _stub_fetch)
+    monkeypatch.setattr(assess_api, "_decode_image", _stub_classic_decode_image)
+    monkeypatch.setattr(assess_api, "breed_bbox", _stub_dog_bbox)
+    monkeypatch.setattr(assess_api._segmenter, "embed", lambda image_rgb, cancel_check=None: object())
+    monkeypatch.setattr(
+        assess_api._segmenter,
+        "predict_compact_mask",
+        lambda embedding, bbox, cancel_check=None: CompactMask.from_dense(
+            np.pad(np.ones((32, 48), dtype=np.uint8), pad_width=((16, 16), (24, 24)))
+        ),
+    )
+    monkeypatch.setattr(assess_api, "extract_ratio_features", degenerate_ratios)
+    monkeypatch.setattr(assess_api, "load_priors", lambda: None)
+    before = assess_api.segmenter_metrics()["classic_fallback"]["sam_failures"]
+
+    response = client.post("/assess", json={"image_url": "https://example.com/pet.jpg"})
+
+    assert response.status_code == 200
+    assert response.json()["mask"] == {"available": False}
+    assert assess_api.segmenter_metrics()["classic_fallback"]["sam_failures"] == before
+    assert assess_api._use_sam()
+
+
+def test_assess_skips_sam_when_work_queue_is_backed_up(monkeypatch) -> None:
+    from app.api import assess as assess_api
+
+    monkeypatch.setattr(assess_api, "_fetch_image_bytes_and_mime", _stub_fetch)
+    monkeypatch.setattr(assess_api, "_decode_image", _stub_classic_decode_image)
+    monkeypatch.setattr(assess_api, "breed_bbox", _stub_dog_bbox)
+    monkeypatch.setattr(
+        assess_api._segmenter,
+        "embed",
+        lambda image_rgb, cancel_check=None: pytest.fail("MobileSAM should be skipped"),
+    )
+    monkeypatch.setattr(
+        assess_api._executor,
+        "expected_wait_seconds",
+        lambda: assess_api.ASSESS_CLASSIC_FALLBACK_WAIT_SECONDS + 1.0,
+    )
+    monkeypatch.setattr(assess_api, "load_priors", lambda: None)
+
+    response = client.post("/assess", json={"image_url": "https://example.com/pet.jpg"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["mask"] == {"available": True}
+    assert "Approximate fallback segmentation used" in body["notes"]
+
+
 def test_assess_vision_failure_returns_502(monkeypatch) -> None:
     from app.api import assess as assess_api
 
     monkeypatch.setattr(assess_api, "_fetch_image_bytes_and_mime", _stub_fetch)
-    monkeypatch.setattr(assess_api, "_decode_rgb", _stub_decode_rgb)
+    monkeypatch.setattr(assess_api, "_decode_image", _stub_decode_image)
     monkeypatch.setattr(
         assess_api,
         "breed_bbox",
-        lambda image_bytes, mime: (_ for _ in ()).throw(RuntimeError("vision down")),
+        _as_async(
+            lambda image, deadline=None: (_ for _ in ()).throw(RuntimeError("vision down"))
+        ),
     )
 
     response = client.post(
@@ -124,31 +436,53 @@ def test_assess_vision_failure_returns_502(monkeypatch) -> None:
     assert response.json() == {"detail": "Vision service is temporarily unavailable."}
 
 
+def test_assess_open_vision_breaker_returns_503_with_retry_after(monkeypatch) -> None:
+    from app.api import assess as assess_api
+    from app.services.resilience import CircuitOpenError
+
+    async def breaker_open(image, deadline=None):
+        raise CircuitOpenError("vision", 12.3)
+
+    monkeypatch.setattr(assess_api, "_fetch_image_bytes_and_mime", _stub_fetch)
+    monkeypatch.setattr(assess_api, "_decode_image", _stub_decode_image)
+    monkeypatch.setattr(assess_api, "breed_bbox", breaker_open)
+
+    response = client.post("/assess", json={"image_url": "https://example.com/pet.jpg"})
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "13"
+
+
 def test_assess_accepts_multipart_form(monkeypatch) -> None:
     from app.api import assess as assess_api
 
-    monkeypatch.setattr(assess_api, "_decode_rgb", _stub_decode_rgb)
+    monkeypatch.setattr(assess_api, "_decode_image", _stub_decode_image)
     monkeypatch.setattr(
         assess_api,
         "breed_bbox",
-        lambda image_bytes, mime: {
-            "species": "dog",
-            "breed_top3": [
-                {"breed": "labrador_retriever", "p": 0.62},
-                {"breed": "golden_retriever", "p": 0.21},
-                {"breed": "mixed", "p": 0.17},
-            ],
-            "bbox": [2, 2, 14, 14],
-        },
+        _as_async(
+            lambda image, deadline=None: {
+                "species": "dog",
+                "breed_top3": [
+                    {"breed": "labrador_retriever", "p": 0.62},
+                    {"breed": "golden_retriever", "p": 0.21},
+                    {"breed": "mixed", "p": 0.17},
+                ],
+                "bbox": [2, 2, 14, 14],
+            }
+        ),
     )
+    monkeypatch.setattr(assess_api._segmenter, "embed", lambda image_rgb, cancel_check=None: object())
     monkeypatch.setattr(
         assess_api._segmenter,
-        "segment",
-        lambda image_rgb, bbox: np.pad(
-            np.ones((8, 8), dtype=np.uint8),
-            pad_width=((4, 4), (4, 4)),
-            mode="constant",
-            constant_values=0,
+        "predict_compact_mask",
+        lambda embedding, bbox, cancel_check=None: CompactMask.from_dense(
+            np.pad(
+                np.ones((8, 8), dtype=np.uint8),
+                pad_width=((4, 4), (4, 4)),
+                mode="constant",
+                constant_values=0,
+            )
         ),
     )
     monkeypatch.setattr(
@@ -177,3 +511,571 @@ def test_assess_accepts_multipart_form(monkeypatch) -> None:
     body = response.json()
     assert body["species"] == "dog"
     assert body["mask"] == {"available": True}
+
+
+def test_assess_runs_image_encoder_while_vision_call_is_in_flight(monkeypatch) -> None:
+    import threading
+
+    from app.api import assess as assess_api
+
+    encoder_started = threading.Event()
+
+    async def fake_breed_bbox(image, deadline=None):
+        _ = image
+        started = await asyncio.to_thread(encoder_started.wait, 2.0)
+        assert started, "encoder did not start during vision call"
+        return {
+            "species": "dog",
+            "breed_top3": [
+                {"breed": "labrador_retriever", "p": 0.62},
+                {"breed": "golden_retriever", "p": 0.21},
+                {"breed": "mixed", "p": 0.17},
+            ],
+            "bbox": [2, 2, 14, 14],
+        }
+
+    def fake_embed(image_rgb, cancel_check=None):
+        _ = image_rgb
+        encoder_started.set()
+        return object()
+
+    monkeypatch.setattr(assess_api, "_fetch_image_bytes_and_mime", _stub_fetch)
+    monkeypatch.setattr(assess_api, "_decode_image", _stub_decode_image)
+    monkeypatch.setattr(assess_api, "breed_bbox", fake_breed_bbox)
+    monkeypatch.setattr(assess_api._segmenter, "embed", fake_embed)
+    monkeypatch.setattr(
+        assess_api._segmenter,
+        "predict_compact_mask",
+        lambda embedding, bbox, cancel_check=None: CompactMask.from_dense(
+            np.pad(
+                np.ones((8, 8), dtype=np.uint8),
+                pad_width=((4, 4), (4, 4)),
+                mode="constant",
+                constant_values=0,
+            )
+        ),
+    )
+    monkeypatch.setattr(assess_api, "load_priors", lambda: None)
+
+    response = client.post(
+        "/assess",
+        json={"image_url": "https://example.com/pet.jpg"},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["mask"] == {"available": True}
+
+
+def test_assess_result_cache_skips_pipeline_and_still_saves_pet(monkeypatch) -> None:
+    from app.api import assess as assess_api
+    from app.state.pet_store import pet_store
+
+    vision_calls: list[object] = []
+
+    async def fake_breed_bbox(image, deadline=None):
+        vision_calls.append(image)
+        return {
+            "species": "dog",
+            "breed_top3": [
+                {"breed": "labrador_retriever", "p": 0.62},
+                {"breed": "golden_retriever", "p": 0.21},
+                {"breed": "mixed", "p": 0.17},
+            ],
+            "bbox": [2, 2, 14, 14],
+        }
+
+    monkeypatch.setattr(assess_api, "_fetch_image_bytes_and_mime", _stub_fetch)
+    monkeypatch.setattr(assess_api, "_decode_image", _stub_decode_image)
+    monkeypatch.setattr(assess_api, "breed_bbox", fake_breed_bbox)
+    monkeypatch.setattr(assess_api._segmenter, "embed", lambda image_rgb, cancel_check=None: object())
+    monkeypatch.setattr(
+        assess_api._segmenter,
+        "predict_compact_mask",
+        lambda embedding, bbox, cancel_check=None: CompactMask.from_dense(
+            np.pad(
+                np.ones((8, 8), dtype=np.uint8),
+                pad_width=((4, 4), (4, 4)),
+                mode="constant",
+                constant_values=0,
+            )
+        ),
+    )
+    monkeypatch.setattr(assess_api, "load_priors", lambda: None)
+    before = assess_api.segmenter_metrics()["classic_fallback"]["fallbacks"]
+
+    first = client.post(
+        "/assess",
+        json={"image_url": "https://example.com/pet.jpg", "meta": {"weight_kg": 20.0}},
+    )
+    second = client.post(
+        "/assess",
+        json={
+            "image_url": "https://example.com/pet.jpg",
+            "meta": {"weight_kg": 20.0, "pet_id": "cached_assess_pet"},
+        },
+    )
+    third = client.post(
+        "/assess",
+        json={"image_url": "https://example.com/pet.jpg", "meta": {"weight_kg": 21.0}},
+    )
+
+    assert first.status_code == second.status_code == third.status_code == 200
+    assert second.json() == first.json()
+    assert len(vision_calls) == 2
+    saved = pet_store.get("cached_assess_pet")
+    assert saved is not None
+    assert saved["last_assess"] == first.json()
+
+
+def test_assess_does_not_cache_local_answer_while_vision_breaker_is_open(monkeypatch) -> None:
+    from types import SimpleNamespace
+
+    from app.api import assess as assess_api
+    from app.ml.breed_router import HybridBreedRouter
+
+    predictions: list[object] = []
+
+    class UnsureClassifier:
+        def checkpoint_exists(self) -> bool:
+            return True
+
+        def predict(self, image, *, top_k: int = 3):
+            predictions.append(image)
+            return SimpleNamespace(
+                species="dog",
+                breed_top3=[
+                    {"breed": "beagle", "p": 0.40},
+                    {"breed": "basset_hound", "p": 0.35},
+                    {"breed": "mixed", "p": 0.25},
+                ],
+                top1_p=0.40,
+            )
+
+    router = HybridBreedRouter(assess_api._segmenter, UnsureClassifier(), enabled=True)
+    monkeypatch.setattr(assess_api, "_breed_router", router)
+    monkeypatch.setattr(assess_api, "vision_circuit_open", lambda: True)
+    monkeypatch.setattr(assess_api, "_fetch_image_bytes_and_mime", _stub_fetch)
+    monkeypatch.setattr(assess_api, "_decode_image", _stub_decode_image)
+    monkeypatch.setattr(assess_api._segmenter, "embed", lambda image_rgb, cancel_check=None: object())
+    monkeypatch.setattr(
+        assess_api._segmenter,
+        "predict_compact_mask",
+        lambda embedding, bbox, cancel_check=None: CompactMask.from_dense(
+            np.pad(np.ones((8, 8), dtype=np.uint8), pad_width=((4, 4), (4, 4)))
+        ),
+    )
+    monkeypatch.setattr(assess_api, "load_priors", lambda: None)
+
+    payload = {"image_url": "https://example.com/breaker-open.jpg"}
+    first = client.post("/assess", json=payload)
+    second = client.post("/assess", json=payload)
+
+    assert first.status_code == second.status_code == 200
+    assert len(predictions) == 2
+    assert router.stats()["outcomes"] == {"local:vision_circuit_open": 2}
+
+
+def test_assess_result_cache_expires_entries() -> None:
+    from app.schemas.assess import AssessMask, AssessResponse
+    from app.state.assess_cache import AssessResultCache
+
+    now = [100.0]
+    cache = AssessResultCache(max_entries=2, ttl_seconds=10.0, clock=lambda: now[0])
+    response = AssessResponse(
+        species="cat",
+        breed_top3=[
+            {"breed": "siamese", "p": 0.8},
+            {"breed": "ragdoll", "p": 0.15},
+            {"breed": "mixed", "p": 0.05},
+        ],
+        mask=AssessMask(available=True),
+        bucket="IDEAL",
+        confidence=0.8,
+        notes="",
+    )
+
+    cache.put("a", response)
+    assert cache.get("a") == response
+    now[0] += 11.0
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_assess_batch_streams_per_item_results(monkeypatch) -> None:
+    import json
+
+    from app.api import assess as assess_api
+
+    async def fetch_by_url(image_url: str, _deadline: float) -> tuple[bytes, str]:
+        return (image_url.encode("utf-8"), "image/jpeg")
+
+    async def fake_breed_bbox(image, deadline=None):
+        if image.data.endswith(b"broken.jpg"):
+            raise RuntimeError("vision down")
+        return {
+            "species": "dog",
+            "breed_top3": [
+                {"breed": "labrador_retriever", "p": 0.62},
+                {"breed": "golden_retriever", "p": 0.21},
+                {"breed": "mixed", "p": 0.17},
+            ],
+            "bbox": [2, 2, 14, 14],
+        }
+
+    encoder_batches: list[int] = []
+
+    def fake_embed_batch(images):
+        encoder_batches.append(len(images))
+        return [object() for _ in images]
+
+    monkeypatch.setattr(assess_api, "_fetch_image_bytes_and_mime", fetch_by_url)
+    monkeypatch.setattr(assess_api, "_decode_image", _stub_decode_image)
+    monkeypatch.setattr(assess_api, "breed_bbox", fake_breed_bbox)
+    monkeypatch.setattr(assess_api._segmenter, "embed_batch", fake_embed_batch)
+    # A backed-up interactive lane must not push batch items onto the classic segmenter.
+    monkeypatch.setattr(
+        assess_api._executor,
+        "expected_wait_seconds",
+        lambda: assess_api.ASSESS_CLASSIC_FALLBACK_WAIT_SECONDS + 1.0,
+    )
+    monkeypatch.setattr(
+        assess_api._segmenter,
+        "predict_compact_mask",
+        lambda embedding, bbox, cancel_check=None: CompactMask.from_dense(
+            np.pad(
+                np.ones((8, 8), dtype=np.uint8),
+                pad_width=((4, 4), (4, 4)),
+                mode="constant",
+                constant_values=0,
+            )
+        ),
+    )
+    monkeypatch.setattr(assess_api, "load_priors", lambda: None)
+
+    response = client.post(
+        "/assess/batch",
+        json={
+            "items": [
+                {"id": "a", "image_url": "https://example.com/a.jpg"},
+                {"id": "b", "image_url": "https://example.com/broken.jpg"},
+                {"id": "c", "image_url": "https://example.com/c.jpg"},
+            ]
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines() if line]
+    by_id = {line["id"]: line for line in lines}
+    assert set(by_id) == {"a", "b", "c"}
+    assert by_id["a"]["ok"] is True
+    assert by_id["a"]["result"]["mask"] == {"available": True}
+    assert by_id["c"]["ok"] is True
+    assert by_id["b"]["ok"] is False
+    assert by_id["b"]["status_code"] == 502
+    assert sum(encoder_batches) == 3
+
+
+def test_assess_batch_item_budget_starts_when_vision_slot_is_acquired(monkeypatch) -> None:
+    import json
+
+    from app.api import assess as assess_api
+
+    async def fetch_by_url(image_url: str, _deadline: float) -> tuple[bytes, str]:
+        return (image_url.encode("utf-8"), "image/jpeg")
+
+    async def slow_breed_bbox(image, deadline=None):
+        await asyncio.sleep(0.2)
+        return {
+            "species": "dog",
+            "breed_top3": [
+                {"breed": "labrador_retriever", "p": 0.62},
+                {"breed": "golden_retriever", "p": 0.21},
+                {"breed": "mixed", "p": 0.17},
+            ],
+            "bbox": [2, 2, 14, 14],
+        }
+
+    monkeypatch.setattr(assess_api, "ASSESS_BATCH_VISION_CONCURRENCY", 1)
+    monkeypatch.setattr(assess_api, "ASSESS_BATCH_ITEM_TIMEOUT_SECONDS", 0.6)
+    monkeypatch.setattr(assess_api, "_fetch_image_bytes_and_mime", fetch_by_url)
+    monkeypatch.setattr(assess_api, "_decode_image", _stub_decode_image)
+    monkeypatch.setattr(assess_api, "breed_bbox", slow_breed_bbox)
+    monkeypatch.setattr(assess_api, "_use_sam", lambda *_: False)
+    monkeypatch.setattr(assess_api, "load_priors", lambda: None)
+
+    response = client.post(
+        "/assess/batch",
+        json={
+            "items": [
+                {"id": str(i), "image_url": f"https://example.com/{i}.jpg"} for i in range(5)
+            ]
+        },
+    )
+
+    lines = [json.loads(line) for line in response.text.splitlines() if line]
+    assert len(lines) == 5
+    assert all(line["ok"] for line in lines)
+
+
+def test_assess_batch_rejects_empty_items() -> None:
+    response = client.post("/assess/batch", json={"items": []})
+    assert response.status_code == 422
+
+
+def test_assess_sheds_load_with_429_and_retry_after(monkeypatch) -> None:
+    from app.api import assess as assess_api
+    from app.core.work_queue import AdmissionRejected
+
+    def reject(remaining_seconds: float) -> None:
+        _ = remaining_seconds
+        raise AdmissionRejected("deadline", 4.2)
+
+    monkeypatch.setattr(assess_api, "_fetch_image_bytes_and_mime", _stub_fetch)
+    monkeypatch.setattr(assess_api._executor, "admit", reject)
+
+    response = client.post(
+        "/assess",
+        json={"image_url": "https://example.com/pet.jpg"},
+    )
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "5"
+
+
+def test_assess_emits_server_timing_and_request_id(monkeypatch) -> None:
+    from app.api import assess as assess_api
+
+    monkeypatch.setattr(assess_api, "_fetch_image_bytes_and_mime", _stub_fetch)
+    monkeypatch.setattr(assess_api, "_decode_image", _stub_decode_image)
+    monkeypatch.setattr(
+        assess_api,
+        "breed_bbox",
+        _as_async(
+            lambda image, deadline=None: {
+                "species": "dog",
+                "breed_top3": [
+                    {"breed": "labrador_retriever", "p": 0.62},
+                    {"breed": "golden_retriever", "p": 0.21},
+                    {"breed": "mixed", "p": 0.17},
+                ],
+                "bbox": [2, 2, 14, 14],
+            }
+        ),
+    )
+    monkeypatch.setattr(assess_api._segmenter, "embed", lambda image_rgb, cancel_check=None: object())
+    monkeypatch.setattr(
+        assess_api._segmenter,
+        "predict_compact_mask",
+        lambda embedding, bbox, cancel_check=None: CompactMask.from_dense(
+            np.pad(
+                np.ones((8, 8), dtype=np.uint8),
+                pad_width=((4, 4), (4, 4)),
+                mode="constant",
+                constant_values=0,
+            )
+        ),
+    )
+    monkeypatch.setattr(assess_api, "load_priors", lambda: None)
+
+    response = client.post(
+        "/assess",
+        json={"image_url": "https://example.com/pet.jpg"},
+        headers={"X-Request-ID": "gw-req-42"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["x-request-id"] == "gw-req-42"
+    stages = {
+        entry.split(";", 1)[0].strip() for entry in response.headers["server-timing"].split(",")
+    }
+    assert {
+        "fetch",
+        "decode",
+        "breed_bbox",
+        "sam_encoder",
+        "sam_decoder",
+        "ratio_features",
+        "classify_bcs",
+        "total",
+    } <= stages
+
+    metrics = client.get("/metrics").json()
+    assert metrics["stage_latency_ms"]["breed_bbox"]["count"] >= 1
+
+
+def test_assess_timeout_still_emits_server_timing_and_request_id(monkeypatch) -> None:
+    from app.api import assess as assess_api
+
+    async def vision_times_out(image, deadline=None):
+        raise TimeoutError()
+
+    monkeypatch.setattr(assess_api, "_fetch_image_bytes_and_mime", _stub_fetch)
+    monkeypatch.setattr(assess_api, "_decode_image", _stub_decode_image)
+    monkeypatch.setattr(assess_api, "breed_bbox", vision_times_out)
+    monkeypatch.setattr(assess_api, "_use_sam", lambda *_: False)
+
+    response = client.post(
+        "/assess",
+        json={"image_url": "https://example.com/pet.jpg"},
+        headers={"X-Request-ID": "gw-req-504"},
+    )
+
+    assert response.status_code == 504
+    assert response.headers["x-request-id"] == "gw-req-504"
+    stages = {
+        entry.split(";", 1)[0].strip() for entry in response.headers["server-timing"].split(",")
+    }
+    assert {"fetch", "decode", "breed_bbox", "total"} <= stages
+
+
+def test_assess_cancels_encoder_work_when_vision_fails(monkeypatch) -> None:
+    import concurrent.futures
+    import threading
+    import time
+
+    from app.api import assess as assess_api
+    from app.core.cancellation import OperationCancelled
+
+    vision_failed = threading.Event()
+    encoder_cancelled = threading.Event()
+
+    async def fake_breed_bbox(image, deadline=None):
+        _ = (image, deadline)
+        vision_failed.set()
+        raise RuntimeError("vision down")
+
+    def fake_embed(image_rgb, cancel_check=None):
+        _ = image_rgb
+        vision_failed.wait(timeout=2.0)
+        give_up_at = time.monotonic() + 2.0
+        while time.monotonic() < give_up_at:
+            try:
+                cancel_check()
+            except OperationCancelled:
+                encoder_cancelled.set()
+                raise
+            time.sleep(0.01)
+        return object()
+
+    monkeypatch.setattr(assess_api, "_fetch_image_bytes_and_mime", _stub_fetch)
+    monkeypatch.setattr(assess_api, "_decode_image", _stub_decode_image)
+    monkeypatch.setattr(assess_api, "breed_bbox", fake_breed_bbox)
+    monkeypatch.setattr(assess_api._segmenter, "embed", fake_embed)
+    submitted = []
+    submit = assess_api._executor.submit
+
+    def recording_submit(fn, /, *args, **kwargs):
+        future = submit(fn, *args, **kwargs)
+        submitted.append(future)
+        return future
+
+    monkeypatch.setattr(assess_api._executor, "submit", recording_submit)
+
+    response = client.post(
+        "/assess",
+        json={"image_url": "https://example.com/pet.jpg"},
+    )
+
+    assert response.status_code == 502
+    # Vision can fail before a worker picks up the encoder job; then the
+    # queued future is cancelled and the encoder never runs at all.
+    (embedding_future,) = submitted
+    concurrent.futures.wait([embedding_future], timeout=3.0)
+    assert embedding_future.cancelled() or encoder_cancelled.wait(timeout=2.0)
+
+
+def test_assess_views_runs_views_concurrently_and_fuses_ratios(monkeypatch) -> None:
+    from app.api import assess as assess_api
+
+    vision_barrier = asyncio.Barrier(2)
+    view_masks = {"side": (slice(4, 12), slice(2, 14)), "top": (slice(5, 11), slice(4, 12))}
+    view_ratios = {
+        "side": {"length_px": 300.0, "waist_to_chest": 0.95, "belly_tuck": 0.08},
+        "top": {"length_px": 280.0, "waist_to_chest": 0.66, "belly_tuck": 0.0},
+    }
+
+    async def fetch_by_url(image_url: str, _deadline: float) -> tuple[bytes, str]:
+        return (image_url.rsplit("/", 1)[-1].encode(), "image/jpeg")
+
+    async def fake_breed_bbox(image, deadline=None):
+        _ = deadline
+        # Both vision calls must be in flight at once.
+        async with asyncio.timeout(5):
+            await vision_barrier.wait()
+        return {
+            "species": "dog",
+            "breed_top3": [
+                {"breed": "beagle" if image.data == b"side.jpg" else "pug", "p": 0.7},
+                {"breed": "mixed", "p": 0.2},
+                {"breed": "other", "p": 0.1},
+            ],
+            "bbox": [1, 1, 15, 15],
+        }
+
+    def fake_predict(embedding, bbox, cancel_check=None):
+        dense = np.zeros((16, 16), dtype=np.uint8)
+        dense[view_masks[embedding]] = 1
+        return CompactMask.from_dense(dense)
+
+    def fake_ratios(mask):
+        view = "side" if mask.area == 8 * 12 else "top"
+        return {**view_ratios[view], "width_profile": [0.2] * 5}
+
+    monkeypatch.setattr(assess_api, "_fetch_image_bytes_and_mime", fetch_by_url)
+    monkeypatch.setattr(assess_api, "_decode_image", _stub_decode_image)
+    monkeypatch.setattr(assess_api, "breed_bbox", fake_breed_bbox)
+    monkeypatch.setattr(
+        assess_api._segmenter,
+        "embed",
+        lambda image, cancel_check=None: image.data.decode().removesuffix(".jpg"),
+    )
+    monkeypatch.setattr(assess_api._segmenter, "predict_compact_mask", fake_predict)
+    monkeypatch.setattr(assess_api, "extract_ratio_features", fake_ratios)
+    monkeypatch.setattr(assess_api, "load_priors", lambda: None)
+
+    response = client.post(
+        "/assess/views",
+        json={
+            "views": [
+                {"view": "top", "image_url": "https://example.com/top.jpg"},
+                {"view": "side", "image_url": "https://example.com/side.jpg"},
+            ]
+        },
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["breed_top3"][0]["breed"] == "beagle"
+    assert body["ratios"]["waist_to_chest"] == 0.66
+    assert body["ratios"]["belly_tuck"] == 0.08
+    assert body["bucket"] == "UNDERWEIGHT"
+    assert "Side and top views combined." in body["notes"]
+    assert [view["view"] for view in body["views"]] == ["top", "side"]
+    assert all(view["mask"]["available"] for view in body["views"])
+
+
+def test_fuse_view_ratios_leaves_belly_tuck_unset_without_side_view() -> None:
+    from app.ml.bcs_rules import fuse_view_ratios
+
+    fused = fuse_view_ratios(
+        {"top": {"length_px": 280.0, "waist_to_chest": 0.66, "belly_tuck": 0.12}, "side": None}
+    )
+
+    assert fused is not None
+    assert fused["waist_to_chest"] == 0.66
+    assert fused["belly_tuck"] is None
+
+
+def test_assess_views_rejects_duplicate_views() -> None:
+    response = client.post(
+        "/assess/views",
+        json={
+            "views": [
+                {"view": "side", "image_url": "https://example.com/a.jpg"},
+                {"view": "side", "image_url": "https://example.com/b.jpg"},
+            ]
+        },
+    )
+
+    assert response.status_code == 422
@@ -0,0 +1,156 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.ml import breed_router as breed_router_module
+from app.ml.breed_router import HybridBreedRouter
+from app.ml.compact_mask import CompactMask
+from app.ml.decoded_image import DecodedImage
+
+
+class _FakeClassifier:
+    def __init__(self, top_p: float, top1_p: float | None = None) -> None:
+        self.top_p = top_p
+        self.top1_p = top_p if top1_p is None else top1_p
+
+    def checkpoint_exists(self) -> bool:
+        return True
+
+    def predict(self, image, *, top_k: int = 3):
+        return SimpleNamespace(
+            species="dog",
+            breed_top3=[
+                {"breed": "beagle", "p": self.top_p},
+                {"breed": "basset_hound", "p": 0.05},
+                {"breed": "mixed", "p": 0.03},
+            ],
+            top1_p=self.top1_p,
+        )
+
+
+class _FakeSegmenter:
+    def __init__(self, dense: np.ndarray) -> None:
+        self.dense = dense
+        self.prompts = []
+
+    def predict_compact_mask(self, embedding, bbox, cancel_check=None):
+        self.prompts.append(bbox)
+        return CompactMask.from_dense(self.dense)
+
+
+def _image(size: int = 32) -> DecodedImage:
+    return DecodedImage(
+        data=b"fake",
+        format="JPEG",
+        size=(size, size),
+        rgb=np.zeros((size, size, 3), dtype=np.uint8),
+        fallback_mime="image/jpeg",
+    )
+
+
+def _pet_mask(size: int = 32) -> np.ndarray:
+    dense = np.zeros((size, size), dtype=np.uint8)
+    dense[8:24, 4:20] = 1
+    return dense
+
+
+def test_confident_classifier_and_plausible_mask_resolve_locally() -> None:
+    segmenter = _FakeSegmenter(_pet_mask())
+    router = HybridBreedRouter(segmenter, _FakeClassifier(0.92), enabled=True, min_confidence=0.8)
+    image = _image()
+
+    result = router.classify_local(image)
+    assert result is not None
+    assert result["species"] == "dog"
+    assert result["breed_top3"][0]["breed"] == "beagle"
+
+    bbox = router.local_bbox(image, embedding=object())
+    assert bbox == [4, 8, 19, 23]
+    assert segmenter.prompts[0] is None
+    assert segmenter.prompts[1] is not None
+
+
+def test_low_confidence_defers_to_remote() -> None:
+    router = HybridBreedRouter(
+        _FakeSegmenter(_pet_mask()),
+        _FakeClassifier(0.55),
+        enabled=True,
+        min_confidence=0.8,
+    )
+
+    assert router.available
+    assert router.classify_local(_image()) is None
+
+
+def test_implausible_whole_image_mask_has_no_local_bbox() -> None:
+    router = HybridBreedRouter(
+        _FakeSegmenter(np.ones((32, 32), dtype=np.uint8)),
+        _FakeClassifier(0.95),
+        enabled=True,
+    )
+
+    assert router.local_bbox(_image(), embedding=object()) is None
+
+
+def test_disabled_router_is_unavailable() -> None:
+    router = HybridBreedRouter(_FakeSegmenter(_pet_mask()), _FakeClassifier(0.95), enabled=False)
+
+    assert not router.available
+
+
+def test_stats_split_outcomes_by_path() -> None:
+    router = HybridBreedRouter(_FakeSegmenter(_pet_mask()), _FakeClassifier(0.95), enabled=True)
+    router.record("local", 40.0)
+    router.record("local", 50.0)
+    router.record("remote:low_confidence", 900.0)
+
+    stats = router.stats()
+    assert stats["requests"] == 3
+    assert stats["local_hit_rate"] == 2 / 3
+    assert stats["outcomes"] == {"local": 2, "remote:low_confidence": 1}
+    assert stats["latency_ms"]["local"]["count"] == 2
+    assert stats["latency_ms"]["remote"]["count"] == 1
+
+
+def test_min_confidence_override_accepts_unsure_local_answer() -> None:
+    router = HybridBreedRouter(
+        _FakeSegmenter(_pet_mask()),
+        _FakeClassifier(0.40),
+        enabled=True,
+        min_confidence=0.8,
+    )
+
+    result = router.classify_local(_image(), min_confidence=0.0)
+
+    assert result is not None
+    assert result["breed_top3"][0]["p"] == 0.40
+
+
+def test_gate_uses_raw_softmax_not_renormalised_top3() -> None:
+    # Softmax 0.30 / 0.04 / 0.03 over 37 breeds renormalises to 0.81 for the top 3.
+    router = HybridBreedRouter(
+        _FakeSegmenter(_pet_mask()),
+        _FakeClassifier(0.81, top1_p=0.30),
+        enabled=True,
+        min_confidence=0.8,
+    )
+
+    assert router.classify_local(_image()) is None
+
+
+def test_available_does_not_load_the_classifier(monkeypatch) -> None:
+    loads: list[int] = []
+
+    def missing_classifier():
+        loads.append(1)
+        return None
+
+    monkeypatch.setattr(breed_router_module, "_default_classifier", missing_classifier)
+    router = HybridBreedRouter(_FakeSegmenter(_pet_mask()), enabled=True)
+
+    assert router.available
+    assert loads == []
+
+    assert router.classify_local(_image()) is None
+    assert loads == [1]
+    assert not router.available
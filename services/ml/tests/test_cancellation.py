@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.cancellation import CancellationToken, OperationCancelled
+from app.ml import featherless_vision_json
+
+
+def test_cancellation_token_guard_skips_cancelled_work() -> None:
+    token = CancellationToken(deadline=time.monotonic() + 5.0)
+    calls: list[int] = []
+    guarded = token.guard(lambda value: calls.append(value))
+
+    guarded(1)
+    token.cancel()
+    with pytest.raises(OperationCancelled):
+        guarded(2)
+
+    assert calls == [1]
+    assert token.cancelled
+
+
+def test_cancellation_token_expires_at_deadline() -> None:
+    token = CancellationToken(deadline=time.monotonic() - 0.01)
+    assert token.cancelled
+    assert token.remaining() == 0.0
+
+
+def test_vision_json_timeout_follows_remaining_budget(monkeypatch) -> None:
+    timeouts: list[float] = []
+
+    async def fake_request(*, image_bytes, mime, prompt_text, timeout_seconds):
+        _ = (image_bytes, mime, prompt_text)
+        timeouts.append(timeout_seconds)
+        return '{"species": "dog"}'
+
+    monkeypatch.setattr(featherless_vision_json, "_request_vision_json", fake_request)
+
+    result = asyncio.run(
+        featherless_vision_json.vision_json(
+            image_bytes=b"img",
+            mime="image/jpeg",
+            prompt_text="classify",
+            deadline=time.monotonic() + 2.0,
+        )
+    )
+
+    assert result == {"species": "dog"}
+    assert len(timeouts) == 1
+    assert 0.5 <= timeouts[0] <= 2.0
+
+
+def test_vision_json_does_not_start_past_deadline(monkeypatch) -> None:
+    async def fake_request(**_kwargs):
+        raise AssertionError("request should not be sent")
+
+    monkeypatch.setattr(featherless_vision_json, "_request_vision_json", fake_request)
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(
+            featherless_vision_json.vision_json(
+                image_bytes=b"img",
+                mime="image/jpeg",
+                prompt_text="classify",
+                deadline=time.monotonic() + 0.1,
+            )
+        )
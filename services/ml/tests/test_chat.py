@@ -7,7 +7,7 @@ client = TestClient(app)
 
 
 def test_chat_returns_model_json_payload(monkeypatch) -> None:
-    def fake_text_chat(*, messages, timeout_seconds):
+    async def fake_text_chat(*, messages, timeout_seconds):
         _ = messages
         assert timeout_seconds == 8.0
         return (
@@ -34,7 +34,7 @@ def test_chat_returns_model_json_payload(monkeypatch) -> None:
 
 
 def test_chat_falls_back_when_model_errors(monkeypatch) -> None:
-    def fake_text_chat(*, messages, timeout_seconds):
+    async def fake_text_chat(*, messages, timeout_seconds):
         _ = messages
         _ = timeout_seconds
         raise APITimeoutError(request=None)
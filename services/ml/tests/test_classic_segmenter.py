@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from app.core.cancellation import CancellationToken, OperationCancelled
+from app.ml.classic_segmenter import ClassicSegmenterBackend, segment_by_color
+from app.ml.embedding_cache import EmbeddingCache
+from app.ml.segmenter import Segmenter
+
+
+def _pet_on_grass(height: int = 300, width: int = 500) -> tuple[np.ndarray, np.ndarray]:
+    yy, xx = np.mgrid[:height, :width]
+    pet = ((xx - width / 2) / (width * 0.3)) ** 2 + ((yy - height / 2) / (height * 0.25)) ** 2 <= 1
+    rng = np.random.default_rng(0)
+    image = np.empty((height, width, 3), dtype=np.float32)
+    image[:] = (60, 140, 60)
+    image[pet] = (180, 120, 70)
+    image += rng.normal(0.0, 15.0, size=image.shape)
+    return np.clip(image, 0, 255).astype(np.uint8), pet
+
+
+def _iou(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.count_nonzero(a & b) / max(1, np.count_nonzero(a | b)))
+
+
+def test_segment_by_color_recovers_pet_inside_bbox() -> None:
+    image, pet = _pet_on_grass()
+    mask = segment_by_color(image, [90, 60, 410, 240])
+
+    assert mask.shape == pet.shape
+    assert mask.dtype == np.bool_
+    assert _iou(mask, pet) > 0.9
+    assert not mask[:60].any()
+
+
+def test_segment_by_color_handles_box_covering_frame() -> None:
+    image, pet = _pet_on_grass()
+    mask = segment_by_color(image, [0, 0, 499, 299])
+    assert _iou(mask, pet) > 0.9
+
+
+def test_classic_backend_serves_segmenter_interface() -> None:
+    image, pet = _pet_on_grass()
+    segmenter = Segmenter(
+        backend=ClassicSegmenterBackend(),
+        embedding_cache=EmbeddingCache(max_entries=0),
+    )
+
+    dense = segmenter.segment(image, [90, 60, 410, 240])
+    compact = segmenter.predict_compact_mask(segmenter.embed(image), [90, 60, 410, 240])
+
+    assert dense.dtype == np.uint8 and set(np.unique(dense)) <= {0, 255}
+    assert compact.shape == pet.shape
+    assert _iou(compact.to_dense(dtype=bool, value=True), pet) > 0.9
+
+
+def test_segment_by_color_checks_cancellation() -> None:
+    image, _ = _pet_on_grass()
+    token = CancellationToken()
+    token.cancel()
+    with pytest.raises(OperationCancelled):
+        segment_by_color(image, [90, 60, 410, 240], token.raise_if_cancelled)
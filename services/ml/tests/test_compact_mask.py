@@ -0,0 +1,36 @@
+import numpy as np
+
+from app.ml.compact_mask import CompactMask
+from app.ml.ratio_features import extract_ratio_features
+
+
+def test_compact_mask_crops_to_bbox_and_round_trips() -> None:
+    dense = np.zeros((40, 60), dtype=np.uint8)
+    dense[10:20, 5:50] = 255
+    dense[15, 52] = 255
+
+    mask = CompactMask.from_dense(dense)
+
+    assert mask.bbox == (5, 10, 52, 19)
+    assert mask.crop.shape == (10, 48)
+    assert mask.crop.dtype == np.bool_
+    assert mask.area == 10 * 45 + 1
+    assert mask.shape == (40, 60)
+    np.testing.assert_array_equal(mask.to_dense(value=255), dense)
+    assert np.unpackbits(mask.packbits(), count=mask.crop.size).sum() == mask.area
+    assert mask.fill_ratio([0, 0, 10, 10]) == mask.area / 100
+
+
+def test_compact_mask_empty() -> None:
+    mask = CompactMask.from_dense(np.zeros((8, 8), dtype=np.uint8))
+
+    assert mask.empty
+    assert mask.bbox is None
+    assert extract_ratio_features(mask)["length_px"] == 0.0
+
+
+def test_extract_ratio_features_same_for_compact_and_dense() -> None:
+    yy, xx = np.mgrid[:120, :200]
+    dense = (((xx - 100) / 80.0) ** 2 + ((yy - 60) / 30.0) ** 2 <= 1.0).astype(np.uint8)
+
+    assert extract_ratio_features(CompactMask.from_dense(dense)) == extract_ratio_features(dense)
@@ -0,0 +1,41 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.ml.decoded_image import decode_image
+
+
+def _png_bytes(width: int = 24, height: int = 16) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), color=(200, 120, 40)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_decode_image_carries_format_size_and_rgb() -> None:
+    data = _png_bytes()
+    decoded = decode_image(data, fallback_mime="image/jpeg")
+
+    assert decoded.data is data
+    assert decoded.format == "PNG"
+    assert decoded.mime == "image/png"
+    assert decoded.size == (24, 16)
+    assert decoded.rgb.shape == (16, 24, 3)
+    assert decoded.rgb.dtype == np.uint8
+    assert tuple(decoded.rgb[0, 0]) == (200, 120, 40)
+
+
+def test_decode_image_rejects_non_image_bytes() -> None:
+    with pytest.raises(ValueError):
+        decode_image(b"fake-image-bytes", fallback_mime="image/jpeg")
+
+
+def test_decode_image_working_resolution_maps_bbox() -> None:
+    decoded = decode_image(_png_bytes(width=400, height=200), max_side=100)
+
+    assert decoded.size == (400, 200)
+    assert decoded.working_size == (100, 50)
+    assert decoded.rgb.shape == (50, 100, 3)
+    assert decoded.to_working_bbox([40, 20, 399, 199]) == [10, 5, 99, 49]
+    assert decoded.to_original_length(25.0) == 100.0
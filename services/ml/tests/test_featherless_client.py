@@ -0,0 +1,102 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.ml import featherless_vision_json
+from app.services import featherless_client as featherless_module
+from app.services.featherless_client import FeatherlessClient
+
+
+def _completion(content: str) -> dict:
+    return {
+        "id": "cmpl-1",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "test-model",
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+    }
+
+
+def test_chat_and_vision_share_one_pooled_connection_set(monkeypatch) -> None:
+    monkeypatch.setenv("FEATHERLESS_API_KEY", "test-key")
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.method == "HEAD":
+            return httpx.Response(404)
+        body = json.loads(request.content)
+        if body.get("response_format"):
+            return httpx.Response(200, json=_completion('{"species": "dog"}'))
+        return httpx.Response(200, json=_completion("hello"))
+
+    client = FeatherlessClient(http2=False, transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(featherless_module, "featherless_client", client)
+    monkeypatch.setattr(featherless_vision_json, "featherless_client", client)
+
+    async def run() -> tuple[str, dict, set[int]]:
+        try:
+            await client.warm_up()
+            http_clients = {id(client._http_client)}
+            text, vision = await asyncio.gather(
+                featherless_module.text_chat([{"role": "user", "content": "hi"}]),
+                featherless_vision_json.vision_json(b"img", "image/jpeg", "classify"),
+            )
+            http_clients.add(id(client._http_client))
+            return text, vision, http_clients
+        finally:
+            await client.aclose()
+
+    text, vision, http_clients = asyncio.run(run())
+
+    assert text == "hello"
+    assert vision == {"species": "dog"}
+    assert len(http_clients) == 1
+    assert [request.method for request in requests][0] == "HEAD"
+    assert all(request.headers["authorization"] == "Bearer test-key" for request in requests[1:])
+
+
+def test_client_requires_api_key(monkeypatch) -> None:
+    monkeypatch.delenv("FEATHERLESS_API_KEY", raising=False)
+    client = FeatherlessClient(http2=False)
+
+    async def run() -> None:
+        await client.complete(model="m", messages=[])
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(run())
+
+
+def test_client_closes_previous_pool_when_event_loop_changes(monkeypatch) -> None:
+    monkeypatch.setenv("FEATHERLESS_API_KEY", "test-key")
+    client = FeatherlessClient(
+        http2=False,
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, json=_completion("ok"))),
+    )
+
+    async def call() -> httpx.AsyncClient:
+        await client.complete(model="m", messages=[{"role": "user", "content": "hi"}])
+        assert client._http_client is not None
+        return client._http_client
+
+    first = asyncio.run(call())
+
+    async def call_on_new_loop() -> httpx.AsyncClient:
+        second = await call()
+        await asyncio.sleep(0)
+        await client.aclose()
+        return second
+
+    second = asyncio.run(call_on_new_loop())
+
+    assert second is not first
+    assert first.is_closed
+    assert second.is_closed
@@ -0,0 +1,102 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.image_fetcher import ImageFetcher, ImageFetchError, ImageTooLargeError
+
+
+def _fetcher(handler, **kwargs) -> ImageFetcher:
+    return ImageFetcher(transport=httpx.MockTransport(handler), **kwargs)
+
+
+def test_fetch_returns_bytes_and_header_mime() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            200,
+            content=b"png-bytes",
+            headers={"content-type": "image/png; charset=binary"},
+        )
+
+    async def run() -> tuple[bytes, str | None]:
+        fetcher = _fetcher(handler)
+        try:
+            return await fetcher.fetch("https://example.com/pet.png", timeout_seconds=2.0)
+        finally:
+            await fetcher.aclose()
+
+    assert asyncio.run(run()) == (b"png-bytes", "image/png")
+
+
+def test_fetch_enforces_byte_cap() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=b"x" * 2048)
+
+    async def run() -> None:
+        fetcher = _fetcher(handler, max_bytes=1024)
+        try:
+            await fetcher.fetch("https://example.com/big.jpg", timeout_seconds=2.0)
+        finally:
+            await fetcher.aclose()
+
+    with pytest.raises(ImageTooLargeError):
+        asyncio.run(run())
+
+
+def test_fetch_rejects_http_errors() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(404)
+
+    async def run() -> None:
+        fetcher = _fetcher(handler)
+        try:
+            await fetcher.fetch("https://example.com/missing.jpg", timeout_seconds=2.0)
+        finally:
+            await fetcher.aclose()
+
+    with pytest.raises(ImageFetchError):
+        asyncio.run(run())
+
+
+def test_fetch_follows_redirects_under_each_hosts_limit() -> None:
+    fetcher: ImageFetcher
+    held: list[tuple[str, bool, bool]] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        slots = fetcher._host_slots
+        held.append(
+            (
+                request.url.host,
+                slots["example.com"].locked(),
+                "cdn.example.com" in slots and slots["cdn.example.com"].locked(),
+            )
+        )
+        if request.url.host == "example.com":
+            return httpx.Response(302, headers={"location": "https://cdn.example.com/pet.jpg"})
+        return httpx.Response(200, content=b"jpeg-bytes", headers={"content-type": "image/jpeg"})
+
+    async def run() -> tuple[bytes, str | None]:
+        try:
+            return await fetcher.fetch("https://example.com/pet.jpg", timeout_seconds=2.0)
+        finally:
+            await fetcher.aclose()
+
+    fetcher = _fetcher(handler, max_connections_per_host=1)
+
+    assert asyncio.run(run()) == (b"jpeg-bytes", "image/jpeg")
+    assert held == [("example.com", True, False), ("cdn.example.com", False, True)]
+
+
+def test_fetch_caps_redirect_hops() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(302, headers={"location": "https://example.com/again.jpg"})
+
+    async def run() -> None:
+        fetcher = _fetcher(handler, max_redirects=2)
+        try:
+            await fetcher.fetch("https://example.com/loop.jpg", timeout_seconds=2.0)
+        finally:
+            await fetcher.aclose()
+
+    with pytest.raises(ImageFetchError, match="redirects"):
+        asyncio.run(run())
@@ -2,12 +2,35 @@ import numpy as np
 from fastapi.testclient import TestClient
 
 from app.main import app
+from app.ml.compact_mask import CompactMask
+from app.ml.decoded_image import DecodedImage
 
 client = TestClient(app)
 
 
-def _stub_decode_rgb(_image_bytes: bytes) -> np.ndarray:
-    return np.zeros((16, 16, 3), dtype=np.uint8)
+def _as_async(fn):
+    """Wrap a sync stub for patching an ``async def`` such as ``breed_bbox``."""
+
+    async def call(*args, **kwargs):
+        return fn(*args, **kwargs)
+
+    return call
+
+
+def _stub_decode_image(
+    image_bytes: bytes,
+    fallback_mime: str | None,
+    *,
+    not_image_detail: str,
+) -> DecodedImage:
+    _ = not_image_detail
+    return DecodedImage(
+        data=image_bytes,
+        format="JPEG",
+        size=(16, 16),
+        rgb=np.zeros((16, 16, 3), dtype=np.uint8),
+        fallback_mime=fallback_mime,
+    )
 
 
 def test_pet_profile_upsert_and_get() -> None:
@@ -65,28 +88,33 @@ def test_assess_persists_last_assess_with_pet_id(monkeypatch) -> None:
 
     pet_id = "persist_assess_pet"
 
-    monkeypatch.setattr(assess_api, "_decode_rgb", _stub_decode_rgb)
+    monkeypatch.setattr(assess_api, "_decode_image", _stub_decode_image)
     monkeypatch.setattr(
         assess_api,
         "breed_bbox",
-        lambda image_bytes, mime: {
-            "species": "dog",
-            "breed_top3": [
-                {"breed": "labrador_retriever", "p": 0.62},
-                {"breed": "golden_retriever", "p": 0.21},
-                {"breed": "mixed", "p": 0.17},
-            ],
-            "bbox": [2, 2, 14, 14],
-        },
+        _as_async(
+            lambda image, deadline=None: {
+                "species": "dog",
+                "breed_top3": [
+                    {"breed": "labrador_retriever", "p": 0.62},
+                    {"breed": "golden_retriever", "p": 0.21},
+                    {"breed": "mixed", "p": 0.17},
+                ],
+                "bbox": [2, 2, 14, 14],
+            }
+        ),
     )
+    monkeypatch.setattr(assess_api._segmenter, "embed", lambda image_rgb, cancel_check=None: object())
     monkeypatch.setattr(
         assess_api._segmenter,
-        "segment",
-        lambda image_rgb, bbox: np.pad(
-            np.ones((8, 8), dtype=np.uint8),
-            pad_width=((4, 4), (4, 4)),
-            mode="constant",
-            constant_values=0,
+        "predict_compact_mask",
+        lambda embedding, bbox, cancel_check=None: CompactMask.from_dense(
+            np.pad(
+                np.ones((8, 8), dtype=np.uint8),
+                pad_width=((4, 4), (4, 4)),
+                mode="constant",
+                constant_values=0,
+            )
         ),
     )
     monkeypatch.setattr(
@@ -0,0 +1,46 @@
+from app.ml.ratio_benchmark import (
+    CLASSIFY_CASE,
+    THRESHOLD_FLOORS,
+    build_cases,
+    check_thresholds,
+    run_case,
+    run_classify_case,
+    thresholds_from_results,
+)
+
+
+def test_benchmark_cases_cover_each_shape_and_produce_ratios() -> None:
+    cases = build_cases((256,))
+
+    assert [case.key for case in cases] == ["ellipse-256", "tapered-256", "noisy-256"]
+    for case in cases:
+        result = run_case(case, repeats=1)
+        assert result["shape"] == [154, 256]
+        assert result["foreground_px"] > 1000
+        assert result["extract_ratio_features_ms"]["p50"] > 0.0
+
+
+def test_classify_is_one_resolution_independent_case() -> None:
+    result = run_classify_case(repeats=1, loops=2)
+
+    assert result["case"] == CLASSIFY_CASE
+    assert set(result) == {"case", "classify_bcs_bucket_us"}
+    assert result["classify_bcs_bucket_us"]["p50"] > 0.0
+
+
+def test_check_thresholds_flags_only_regressed_metrics() -> None:
+    results = [
+        {"case": "ellipse-256", "extract_ratio_features_ms": {"p50": 3.0}},
+        {"case": CLASSIFY_CASE, "classify_bcs_bucket_us": {"p50": 4.0}},
+    ]
+    thresholds = thresholds_from_results(results, headroom=1.0)
+    assert thresholds == {
+        "ellipse-256": {"extract_ratio_features_ms": 3.0},
+        CLASSIFY_CASE: {"classify_bcs_bucket_us": THRESHOLD_FLOORS["classify_bcs_bucket_us"]},
+    }
+    thresholds["ellipse-256"]["extract_ratio_features_ms"] = 2.0
+
+    failures = check_thresholds(results, thresholds)
+
+    assert failures == ["ellipse-256 extract_ratio_features_ms: p50 3.000 > 2.000"]
+    assert results[1]["thresholds"] == {"classify_bcs_bucket_us": 50.0}
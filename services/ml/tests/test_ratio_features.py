@@ -81,3 +81,102 @@ def test_extract_ratio_features_tapered_with_belly_tuck() -> None:
     assert len(features["width_profile"]) == 5
     assert features["width_profile"][1] > features["width_profile"][3]
     assert features["belly_tuck"] > 0.02
+
+
+def _tapered_silhouette_jpeg(width: int, height: int) -> bytes:
+    import io
+
+    from PIL import Image, ImageDraw
+
+    # Same profile as _make_tapered_tuck_mask, drawn as a polygon at any resolution.
+    sx = width / 240.0
+    sy = height / 140.0
+    xs = [20.0 + 19.0 * i for i in range(11)]
+    upper: list[tuple[float, float]] = []
+    lower: list[tuple[float, float]] = []
+    for x in xs:
+        t = (x - 20.0) / 190.0
+        half_width = 24.0 - 10.0 * t
+        tuck = 0.0 if t <= 0.5 else 12.0 * (t - 0.5) / 0.5
+        upper.append((x * sx, (72.0 - half_width) * sy))
+        lower.append((x * sx, (72.0 + half_width - tuck) * sy))
+
+    image = Image.new("RGB", (width, height), color=(0, 0, 0))
+    ImageDraw.Draw(image).polygon(upper + lower[::-1], fill=(255, 255, 255))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=95)
+    return buffer.getvalue()
+
+
+def test_extract_ratio_features_stable_at_working_resolution() -> None:
+    from app.ml.decoded_image import decode_image
+
+    jpeg = _tapered_silhouette_jpeg(3000, 1750)
+    full = decode_image(jpeg)
+    working = decode_image(jpeg, max_side=1024)
+
+    assert working.size == full.size == (3000, 1750)
+    assert max(working.working_size) == 1024
+
+    full_features = extract_ratio_features((full.rgb[:, :, 0] > 127).astype(np.uint8))
+    working_features = extract_ratio_features((working.rgb[:, :, 0] > 127).astype(np.uint8))
+    working_length = working.to_original_length(working_features["length_px"])
+
+    assert abs(working_length - full_features["length_px"]) / full_features["length_px"] < 0.01
+    assert abs(working_features["waist_to_chest"] - full_features["waist_to_chest"]) < 0.02
+    assert abs(working_features["belly_tuck"] - full_features["belly_tuck"]) < 0.01
+    for got, expected in zip(
+        working_features["width_profile"], full_features["width_profile"], strict=True
+    ):
+        assert abs(got - expected) < 0.01
+
+
+def _reference_ratio_features(mask: np.ndarray) -> dict:
+    """Straightforward per-slice PCA implementation the vectorised one must match."""
+    ys, xs = np.where(mask > 0)
+    points = np.column_stack((xs, ys)).astype(np.float64)
+    centered = points - points.mean(axis=0)
+    eigenvalues, eigenvectors = np.linalg.eigh(np.cov(points, rowvar=False))
+    major = eigenvectors[:, int(np.argmax(eigenvalues))]
+    if major[0] < 0 or (abs(major[0]) <= 1e-8 and major[1] < 0):
+        major = -major
+    perp = np.array([-major[1], major[0]])
+    u = centered @ major
+    length = float(u.max() - u.min())
+    band = max(1.0, length * 0.015)
+    widths = []
+    lower = []
+    for frac in (0.20, 0.35, 0.50, 0.65, 0.80):
+        selected = np.abs(u - (u.min() + frac * length)) <= band
+        if not np.any(selected):
+            selected = np.argpartition(np.abs(u - (u.min() + frac * length)), 63)[:64]
+        v = centered[selected] @ perp
+        widths.append(float(v.max() - v.min()))
+        lower.append(float(points[selected, 1].max()))
+    return {
+        "length_px": length,
+        "waist_to_chest": widths[3] / widths[1] if widths[1] > 1e-8 else 0.0,
+        "width_profile": [w / length for w in widths],
+        "belly_tuck": (lower[2] - lower[4]) / length,
+    }
+
+
+def test_extract_ratio_features_matches_reference_on_rotated_ellipses() -> None:
+    rng = np.random.default_rng(7)
+    yy, xx = np.mgrid[:180, :260]
+    for _ in range(20):
+        angle = rng.uniform(0.0, np.pi)
+        cx, cy = rng.uniform(80, 180), rng.uniform(60, 120)
+        a, b = rng.uniform(30, 110), rng.uniform(12, 50)
+        x = (xx - cx) * np.cos(angle) + (yy - cy) * np.sin(angle)
+        y = -(xx - cx) * np.sin(angle) + (yy - cy) * np.cos(angle)
+        mask = ((x / a) ** 2 + (y / b) ** 2 <= 1.0).astype(np.uint8)
+        mask |= (rng.random(mask.shape) < 0.001).astype(np.uint8)
+
+        got = extract_ratio_features(mask)
+        expected = _reference_ratio_features(mask)
+
+        assert abs(got["length_px"] - expected["length_px"]) < 1e-6
+        assert abs(got["waist_to_chest"] - expected["waist_to_chest"]) < 1e-6
+        assert abs(got["belly_tuck"] - expected["belly_tuck"]) < 1e-6
+        np.testing.assert_allclose(got["width_profile"], expected["width_profile"], atol=1e-6)
@@ -0,0 +1,51 @@
+import threading
+
+from fastapi.testclient import TestClient
+
+import app.main as main_module
+from app.core.readiness import readiness, run_warmup
+from app.main import app
+
+client = TestClient(app)
+
+
+def _raise_missing_weights() -> None:
+    raise RuntimeError("weights missing")
+
+
+def test_ready_is_503_until_warmup_finishes() -> None:
+    readiness.reset()
+    try:
+        starting = client.get("/ready")
+        assert starting.status_code == 503
+        assert starting.json()["status"] == "starting"
+
+        run_warmup({"breed_priors": lambda: None, "segmenter": _raise_missing_weights})
+
+        ready = client.get("/ready")
+        assert ready.status_code == 200
+        body = ready.json()
+        assert body["status"] == "ready"
+        assert body["errors"] == {"segmenter": "RuntimeError: weights missing"}
+    finally:
+        readiness.reset()
+
+
+def test_lifespan_runs_warmup_steps(monkeypatch) -> None:
+    called = threading.Event()
+    shut_down = threading.Event()
+    monkeypatch.setattr(main_module, "warm_up_steps", lambda: {"segmenter": called.set})
+    # The assess executors are module-level; the rest of the suite still needs them.
+    monkeypatch.setattr(main_module, "shutdown_workers", shut_down.set)
+    readiness.reset()
+    try:
+        with TestClient(app) as lifespan_client:
+            assert called.wait(timeout=5)
+            for _ in range(100):
+                if readiness.ready:
+                    break
+                threading.Event().wait(0.01)
+            assert lifespan_client.get("/ready").status_code == 200
+        assert shut_down.is_set()
+    finally:
+        readiness.reset()
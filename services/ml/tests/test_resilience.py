@@ -0,0 +1,215 @@
+import asyncio
+
+import pytest
+
+from app.services.resilience import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    AdaptiveTimeout,
+    CircuitBreaker,
+    CircuitOpenError,
+    ResilientUpstream,
+    backoff_seconds,
+)
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _Transient(Exception):
+    pass
+
+
+def _upstream(breaker: CircuitBreaker, retries: int = 1, sleeps: list | None = None):
+    async def sleep(seconds: float) -> None:
+        if sleeps is not None:
+            sleeps.append(seconds)
+
+    return ResilientUpstream(
+        "test-model",
+        transient=(_Transient,),
+        breaker=breaker,
+        latency=AdaptiveTimeout(min_samples=3, multiplier=2.0, floor_seconds=1.0),
+        timeout_seconds=30.0,
+        retries=retries,
+        sleep=sleep,
+        rng=lambda: 1.0,
+    )
+
+
+def test_breaker_opens_after_consecutive_failures_then_probes() -> None:
+    clock = _Clock()
+    breaker = CircuitBreaker("m", failure_threshold=3, reset_seconds=10.0, clock=clock)
+
+    for _ in range(3):
+        breaker.acquire()
+        breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.acquire()
+    assert excinfo.value.retry_after_header == "10"
+
+    clock.now = 10.0
+    assert breaker.state == HALF_OPEN
+    breaker.acquire()
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.stats()["opened_total"] == 1
+    assert breaker.stats()["rejected_total"] == 2
+
+
+def test_failed_probe_reopens_the_breaker() -> None:
+    clock = _Clock()
+    breaker = CircuitBreaker("m", failure_threshold=1, reset_seconds=5.0, clock=clock)
+    breaker.acquire()
+    breaker.record_failure()
+
+    clock.now = 5.0
+    breaker.acquire()
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    assert breaker.retry_after() == 5.0
+
+
+def test_backoff_is_jittered_and_capped() -> None:
+    assert backoff_seconds(0, 0.25, 2.0, rng=lambda: 0.0) == 0.0
+    assert backoff_seconds(1, 0.25, 2.0, rng=lambda: 1.0) == 0.5
+    assert backoff_seconds(10, 0.25, 2.0, rng=lambda: 1.0) == 2.0
+
+
+def test_adaptive_timeout_tracks_observed_latency() -> None:
+    latency = AdaptiveTimeout(min_samples=3, multiplier=3.0, floor_seconds=1.0)
+    assert latency.timeout(30.0) == 30.0
+
+    for seconds in (0.8, 1.0, 2.0):
+        latency.observe(seconds)
+
+    assert latency.timeout(30.0) == 6.0
+    assert latency.timeout(4.0) == 4.0
+
+
+def test_upstream_retries_transient_errors_with_backoff() -> None:
+    sleeps: list[float] = []
+    upstream = _upstream(CircuitBreaker("m", failure_threshold=5, reset_seconds=30.0), sleeps=sleeps)
+    calls: list[float] = []
+
+    async def operation(timeout_seconds: float) -> str:
+        calls.append(timeout_seconds)
+        if len(calls) == 1:
+            raise _Transient()
+        return "ok"
+
+    assert asyncio.run(upstream.call(operation)) == "ok"
+    assert calls == [30.0, 30.0]
+    assert sleeps == [0.25]
+    assert upstream.stats()["retries_total"] == 1
+
+
+def test_open_breaker_fails_fast_without_calling_upstream() -> None:
+    breaker = CircuitBreaker("m", failure_threshold=2, reset_seconds=30.0)
+    upstream = _upstream(breaker)
+    calls: list[float] = []
+
+    async def failing(timeout_seconds: float) -> str:
+        calls.append(timeout_seconds)
+        raise _Transient()
+
+    with pytest.raises(_Transient):
+        asyncio.run(upstream.call(failing))
+    assert breaker.state == OPEN
+    assert len(calls) == 2
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(upstream.call(failing))
+    assert len(calls) == 2
+
+
+def test_non_transient_errors_are_not_retried_and_keep_breaker_closed() -> None:
+    breaker = CircuitBreaker("m", failure_threshold=1, reset_seconds=30.0)
+    upstream = _upstream(breaker)
+    calls: list[float] = []
+
+    async def rejected(timeout_seconds: float) -> str:
+        calls.append(timeout_seconds)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        asyncio.run(upstream.call(rejected))
+    assert len(calls) == 1
+    assert breaker.state == CLOSED
+
+
+def test_chat_falls_back_immediately_while_breaker_is_open(monkeypatch) -> None:
+    from fastapi.testclient import TestClient
+
+    from app.api import chat as chat_api
+    from app.main import app
+    from app.services import featherless_client as featherless_module
+
+    async def must_not_call(**_kwargs):
+        raise AssertionError("upstream called while breaker is open")
+
+    breaker = featherless_module.upstream_for(featherless_module.CHAT_MODEL).breaker
+    for _ in range(featherless_module.BREAKER_FAILURE_THRESHOLD):
+        breaker.acquire()
+        breaker.record_failure()
+    monkeypatch.setattr(featherless_module, "_chat_once", must_not_call)
+
+    response = TestClient(app).post("/chat", json={"message": "help"})
+
+    assert response.status_code == 200
+    assert response.json()["reply"] == chat_api.FALLBACK_REPLY
+
+
+def test_non_transient_error_on_half_open_probe_does_not_close_breaker() -> None:
+    clock = _Clock()
+    breaker = CircuitBreaker("m", failure_threshold=1, reset_seconds=5.0, clock=clock)
+    breaker.acquire()
+    breaker.record_failure()
+    clock.now = 5.0
+    upstream = _upstream(breaker)
+
+    async def unauthorized(timeout_seconds: float) -> str:
+        raise ValueError("401 unauthorized")
+
+    with pytest.raises(ValueError):
+        asyncio.run(upstream.call(unauthorized))
+
+    assert breaker.state == HALF_OPEN
+    # The probe slot was released, so the next call can probe.
+    breaker.acquire()
+
+
+def test_timeout_cut_short_by_caller_deadline_is_not_an_upstream_failure() -> None:
+    import time
+
+    breaker = CircuitBreaker("m", failure_threshold=1, reset_seconds=30.0)
+    upstream = ResilientUpstream(
+        "test-model",
+        transient=(_Transient, TimeoutError),
+        timeouts=(TimeoutError,),
+        breaker=breaker,
+        latency=AdaptiveTimeout(min_samples=3),
+        timeout_seconds=30.0,
+    )
+
+    async def slow(timeout_seconds: float) -> str:
+        raise TimeoutError()
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(upstream.call(slow, deadline=time.monotonic() + 2.0))
+    assert breaker.state == CLOSED
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(upstream.call(slow))
+    assert breaker.state == OPEN
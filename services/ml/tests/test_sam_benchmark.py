@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from app.ml.sam_benchmark import compare_variants
+
+
+def _run(mask: np.ndarray, encoder_ms: float) -> dict:
+    return {
+        "encoder_ms": [encoder_ms, encoder_ms],
+        "decoder_ms": [5.0, 5.0],
+        "peak_rss_mb": 100.0,
+        "masks": {"dog.jpg": np.packbits(mask)},
+    }
+
+
+def test_compare_variants_reports_speedup_iou_and_ratio_drift() -> None:
+    image = np.zeros((40, 60, 3), dtype=np.uint8)
+    float_mask = np.zeros((40, 60), dtype=bool)
+    float_mask[10:30, 5:55] = True
+    int8_mask = float_mask.copy()
+    int8_mask[10:30, 50:55] = False
+
+    report = compare_variants([("dog.jpg", image)], _run(float_mask, 300.0), _run(int8_mask, 120.0))
+
+    assert report["encoder_speedup_p50"] == pytest.approx(2.5)
+    assert report["mask_iou"]["min"] == pytest.approx(45 / 50)
+    assert report["ratio_drift_max"]["length_rel"] == pytest.approx(5 / 49, rel=0.05)
+    assert report["images"][0]["image"] == "dog.jpg"
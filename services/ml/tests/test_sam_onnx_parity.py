@@ -0,0 +1,36 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.ml.sam_backends import EagerSamBackend, OnnxSamBackend
+
+pytest.importorskip("torch")
+pytest.importorskip("mobile_sam")
+pytest.importorskip("onnxruntime")
+
+CHECKPOINT = Path(".cache") / "mobile_sam.pt"
+
+
+@pytest.mark.skipif(not CHECKPOINT.exists(), reason="MobileSAM checkpoint not downloaded")
+def test_onnx_backend_masks_match_eager(tmp_path: Path) -> None:
+    from app.ml.sam_export import export_mobile_sam_onnx
+
+    encoder_path, decoder_path = export_mobile_sam_onnx(CHECKPOINT, tmp_path)
+    eager = EagerSamBackend(CHECKPOINT)
+    onnx = OnnxSamBackend(encoder_path, decoder_path, intra_op_threads=2)
+
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 40, size=(480, 640, 3), dtype=np.uint8)
+    yy, xx = np.mgrid[:480, :640]
+    body = ((xx - 320) / 220.0) ** 2 + ((yy - 250) / 120.0) ** 2 <= 1.0
+    image[body] = (200, 150, 90)
+    box = [90, 120, 550, 380]
+
+    eager_mask = eager.decode(eager.encode(image), box)
+    onnx_mask = onnx.decode(onnx.encode(image), box)
+
+    intersection = np.logical_and(eager_mask, onnx_mask).sum()
+    union = np.logical_or(eager_mask, onnx_mask).sum()
+    assert union > 0
+    assert intersection / union >= 0.97
@@ -0,0 +1,59 @@
+import numpy as np
+
+from app.ml.sam_backends import ImageEmbedding
+from app.ml.sam_process_pool import ProcessPoolSamBackend
+
+
+class _BoxBackend:
+    def encode(self, image_rgb, cancel_check=None):
+        _ = cancel_check
+        features = np.full((1, 4, 8, 8), float(image_rgb.mean()), dtype=np.float32)
+        return ImageEmbedding(features, image_rgb.shape[:2], image_rgb.shape[:2])
+
+    def encode_batch(self, images_rgb, cancel_check=None):
+        return [self.encode(image, cancel_check) for image in images_rgb]
+
+    def decode(self, embedding, box_xyxy, cancel_check=None):
+        _ = cancel_check
+        height, width = embedding.original_size
+        x1, y1, x2, y2 = box_xyxy
+        mask = np.zeros((height, width), dtype=bool)
+        mask[y1 : y2 + 1, x1 : x2 + 1] = embedding.features.mean() > 0
+        return mask
+
+
+def _box_backend() -> _BoxBackend:
+    return _BoxBackend()
+
+
+def test_process_pool_round_trips_images_embeddings_and_masks() -> None:
+    backend = ProcessPoolSamBackend(_box_backend, workers=2, torch_threads=1)
+    try:
+        images = [np.full((30, 40, 3), fill, dtype=np.uint8) for fill in (10, 20, 30)]
+
+        embeddings = backend.encode_batch(images)
+        mask = backend.decode(embeddings[1], [5, 4, 14, 9])
+    finally:
+        backend.shutdown()
+
+    assert [float(e.features.mean()) for e in embeddings] == [10.0, 20.0, 30.0]
+    assert embeddings[0].original_size == (30, 40)
+    assert mask.shape == (30, 40)
+    assert int(mask.sum()) == 10 * 6
+
+
+def test_process_pool_rebuilds_once_after_a_worker_dies() -> None:
+    import os
+
+    backend = ProcessPoolSamBackend(_box_backend, workers=1, torch_threads=1)
+    try:
+        backend.encode(np.full((8, 8, 3), 1, dtype=np.uint8))
+        # Kill the worker so the next call finds the pool broken.
+        backend._pool.submit(os._exit, 1).exception()
+
+        embedding = backend.encode(np.full((8, 8, 3), 7, dtype=np.uint8))
+    finally:
+        backend.shutdown()
+
+    assert float(embedding.features.mean()) == 7.0
+    assert backend.rebuilds == 1
@@ -0,0 +1,122 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.ml.decoded_image import DecodedImage
+from app.ml.embedding_cache import EmbeddingCache
+from app.ml.sam_backends import EagerSamBackend, preprocess_for_sam
+from app.ml.segmenter import Segmenter
+
+
+class _FakePredictor:
+    def __init__(self) -> None:
+        self.set_image_calls = 0
+        self.features = None
+        self.original_size = None
+        self.input_size = None
+        self.is_image_set = False
+
+    def set_image(self, image_rgb: np.ndarray) -> None:
+        self.set_image_calls += 1
+        self.features = np.full((1, 4, 8, 8), float(image_rgb.mean()), dtype=np.float32)
+        self.original_size = image_rgb.shape[:2]
+        self.input_size = image_rgb.shape[:2]
+        self.is_image_set = True
+
+    def predict(self, *, point_coords, point_labels, box, multimask_output):
+        _ = (point_coords, point_labels, multimask_output)
+        height, width = self.original_size
+        x1, y1, x2, y2 = [int(v) for v in box[0]]
+        mask = np.zeros((1, height, width), dtype=bool)
+        mask[0, y1 : y2 + 1, x1 : x2 + 1] = True
+        return mask, np.ones(1), np.zeros((1, 8, 8))
+
+
+def _segmenter_with_fake_predictor(cache: EmbeddingCache) -> tuple[Segmenter, _FakePredictor]:
+    backend = EagerSamBackend(Path("unused.pt"))
+    predictor = _FakePredictor()
+    backend._install_predictors([predictor])
+    segmenter = Segmenter(embedding_cache=cache, backend=backend)
+    return segmenter, predictor
+
+
+def _decoded(data: bytes, fill: int) -> DecodedImage:
+    return DecodedImage(
+        data=data,
+        format="PNG",
+        size=(20, 10),
+        rgb=np.full((10, 20, 3), fill, dtype=np.uint8),
+    )
+
+
+def test_segment_reuses_cached_embedding_for_same_content() -> None:
+    cache = EmbeddingCache(max_entries=4)
+    segmenter, predictor = _segmenter_with_fake_predictor(cache)
+
+    first = segmenter.segment(_decoded(b"same-photo", 10), [2, 2, 8, 6])
+    second = segmenter.segment(_decoded(b"same-photo", 10), [4, 1, 12, 5])
+
+    assert predictor.set_image_calls == 1
+    assert first.shape == (10, 20)
+    assert int(np.count_nonzero(second)) == 9 * 5
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_embedding_cache_evicts_least_recently_used_under_byte_cap() -> None:
+    entry_bytes = 1 * 4 * 8 * 8 * 4
+    cache = EmbeddingCache(max_entries=8, max_bytes=entry_bytes * 2)
+    segmenter, predictor = _segmenter_with_fake_predictor(cache)
+
+    segmenter.embed(_decoded(b"a", 1))
+    segmenter.embed(_decoded(b"b", 2))
+    segmenter.embed(_decoded(b"a", 1))
+    segmenter.embed(_decoded(b"c", 3))
+    segmenter.embed(_decoded(b"b", 2))
+
+    assert predictor.set_image_calls == 4
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["bytes"] == entry_bytes * 2
+    assert stats["evictions"] == 2
+
+
+def test_preprocess_for_sam_resizes_longest_side_and_pads() -> None:
+    image = np.full((300, 600, 3), 200, dtype=np.uint8)
+
+    tensor, input_size = preprocess_for_sam(image)
+
+    assert tensor.shape == (3, 1024, 1024)
+    assert input_size == (512, 1024)
+    assert np.all(tensor[:, 512:, :] == 0.0)
+    assert tensor[0, 0, 0] == pytest.approx((200 - 123.675) / 58.395)
+
+
+class _SlowPredictor(_FakePredictor):
+    def __init__(self, barrier: threading.Barrier) -> None:
+        super().__init__()
+        self._barrier = barrier
+
+    def set_image(self, image_rgb: np.ndarray) -> None:
+        super().set_image(image_rgb)
+        # Both predictors must be mid-call at once, or this times out.
+        self._barrier.wait(timeout=5)
+
+
+def test_predictor_pool_runs_concurrent_embeds_on_separate_predictors() -> None:
+    barrier = threading.Barrier(2)
+    predictors = [_SlowPredictor(barrier), _SlowPredictor(barrier)]
+    backend = EagerSamBackend(Path("unused.pt"), pool_size=2)
+    backend._install_predictors(predictors)
+    segmenter = Segmenter(embedding_cache=EmbeddingCache(max_entries=4), backend=backend)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first, second = pool.map(segmenter.embed, [_decoded(b"a", 40), _decoded(b"b", 90)])
+
+    assert [p.set_image_calls for p in predictors] == [1, 1]
+    assert float(first.features.mean()) == 40.0
+    assert float(second.features.mean()) == 90.0
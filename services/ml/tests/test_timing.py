@@ -0,0 +1,26 @@
+from app.core.timing import LatencyHistogram, RequestTimer, StageLatencyRegistry
+
+
+def test_latency_histogram_buckets_are_cumulative() -> None:
+    histogram = LatencyHistogram(buckets_ms=(10.0, 100.0))
+    for duration_ms in (1.0, 10.0, 50.0, 500.0):
+        histogram.observe(duration_ms)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 4
+    assert snapshot["sum_ms"] == 561.0
+    assert snapshot["buckets_ms"] == {"10": 2, "100": 3, "+Inf": 4}
+
+
+def test_request_timer_records_spans_and_feeds_registry() -> None:
+    registry = StageLatencyRegistry()
+    timer = RequestTimer("req-123", registry=registry)
+
+    with timer.span("decode"):
+        pass
+    assert timer.wrap("breed_bbox", lambda x: x * 2)(21) == 42
+    timer.record("total", 12.345)
+
+    assert [stage for stage, _ in timer.spans()] == ["decode", "breed_bbox", "total"]
+    assert timer.server_timing_header().endswith("total;dur=12.3")
+    assert set(registry.snapshot()) == {"breed_bbox", "decode", "total"}
@@ -0,0 +1,97 @@
+import asyncio
+import io
+
+import numpy as np
+from PIL import Image
+
+from app.ml import breed_bbox as breed_bbox_module
+from app.ml.decoded_image import decode_image
+from app.ml.perceptual_hash import dhash, hamming
+from app.state.vision_cache import PerceptualHashCache, breed_bbox_cache
+
+
+def _photo(width: int = 640, height: int = 480) -> np.ndarray:
+    yy, xx = np.mgrid[:height, :width]
+    image = np.zeros((height, width, 3), dtype=np.float32)
+    image[..., 0] = 120 + 80 * np.sin(xx / 37.0)
+    image[..., 1] = 100 + 60 * np.cos(yy / 23.0)
+    image[..., 2] = (xx + yy) % 200
+    body = ((xx - width * 0.5) / (width * 0.3)) ** 2 + ((yy - height * 0.55) / (height * 0.2)) ** 2 <= 1
+    image[body] = (200, 150, 90)
+    return image.astype(np.uint8)
+
+
+def _jpeg(rgb: np.ndarray, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.fromarray(rgb).save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def test_near_duplicates_hash_within_a_few_bits() -> None:
+    photo = _photo()
+    recompressed = decode_image(_jpeg(photo, 40)).rgb
+    resized = np.asarray(Image.fromarray(photo).resize((320, 240)))
+    blocks = np.random.default_rng(1).integers(0, 255, size=(8, 9, 3), dtype=np.uint8)
+    different = np.asarray(Image.fromarray(blocks).resize((640, 480), Image.Resampling.NEAREST))
+
+    assert hamming(dhash(photo), dhash(recompressed)) <= 3
+    assert hamming(dhash(photo), dhash(resized)) <= 3
+    assert hamming(dhash(photo), dhash(different)) > 10
+
+
+def test_cache_matches_by_hamming_distance_and_aspect() -> None:
+    cache = PerceptualHashCache(max_entries=8, ttl_seconds=60.0, max_distance=3)
+    cache.put(0b1011, 1.5, {"species": "dog"})
+
+    assert cache.get(0b1011, 1.5) == {"species": "dog"}
+    assert cache.get(0b1011 ^ 0b111 << 20, 1.5) == {"species": "dog"}
+    assert cache.get(0b1011 ^ 0b1111 << 20, 1.5) is None
+    assert cache.get(0b1011, 0.75) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["near_hits"], stats["misses"]) == (2, 1, 2)
+
+
+def test_cache_expires_and_evicts_least_recent() -> None:
+    now = [0.0]
+    cache = PerceptualHashCache(max_entries=2, ttl_seconds=10.0, clock=lambda: now[0])
+    first, second, third = 0x00FF, 0xFF00 << 16, 0xFF << 48
+    cache.put(first, 1.0, "first")
+    cache.put(second, 1.0, "second")
+    assert cache.get(first, 1.0) == "first"
+    cache.put(third, 1.0, "third")
+
+    assert cache.get(second, 1.0) is None
+    assert cache.get(first, 1.0) == "first"
+    now[0] = 11.0
+    assert cache.get(first, 1.0) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_breed_bbox_reuses_cached_result_for_near_duplicate(monkeypatch) -> None:
+    calls: list[bytes] = []
+
+    async def fake_vision_json(image_bytes, mime, prompt_text, deadline=None):
+        _ = (mime, prompt_text, deadline)
+        calls.append(image_bytes)
+        return {
+            "species": "cat",
+            "breed_top3": [
+                {"breed": "siamese", "p": 0.8},
+                {"breed": "ragdoll", "p": 0.15},
+                {"breed": "mixed", "p": 0.05},
+            ],
+            "bbox": [128, 192, 512, 384],
+        }
+
+    monkeypatch.setattr(breed_bbox_module, "vision_json", fake_vision_json)
+    photo = _photo()
+    original = decode_image(_jpeg(photo, 95))
+    copy = decode_image(_jpeg(np.asarray(Image.fromarray(photo).resize((320, 240))), 50))
+
+    first = asyncio.run(breed_bbox_module.breed_bbox(original))
+    second = asyncio.run(breed_bbox_module.breed_bbox(copy))
+
+    assert len(calls) == 1
+    assert second["breed_top3"] == first["breed_top3"]
+    assert second["bbox"] == [x // 2 for x in first["bbox"]]
+    assert breed_bbox_cache.stats()["hits"] == 1
@@ -0,0 +1,111 @@
+import asyncio
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.ml import breed_bbox as breed_bbox_module
+from app.ml.decoded_image import decode_image
+from app.ml.vision_payload import prepare_vision_payload
+from app.ml.vision_payload_benchmark import summarize_variants
+
+
+def _jpeg_bytes(width: int, height: int, quality: int = 98) -> bytes:
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 255, size=(height, width, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def test_prepare_downsizes_and_reencodes_large_uploads() -> None:
+    image = decode_image(_jpeg_bytes(2000, 1000), max_side=1024)
+
+    payload = prepare_vision_payload(image, max_side=768, fmt="webp", quality=80)
+
+    assert payload.mime == "image/webp"
+    assert payload.size == (768, 384)
+    assert payload.original_size == (2000, 1000)
+    assert len(payload.data) < len(image.data)
+    with Image.open(io.BytesIO(payload.data)) as sent:
+        assert sent.size == (768, 384)
+
+
+def test_prepare_decodes_again_when_working_copy_is_too_small() -> None:
+    image = decode_image(_jpeg_bytes(1600, 1200), max_side=400)
+
+    payload = prepare_vision_payload(image, max_side=800, fmt="jpeg", quality=85)
+
+    assert payload.size == (800, 600)
+
+
+def test_prepare_keeps_original_bytes_when_reencoding_does_not_help() -> None:
+    image = decode_image(_jpeg_bytes(64, 48, quality=30))
+
+    assert prepare_vision_payload(image, max_side=768, fmt="jpeg", quality=95).data == image.data
+    assert prepare_vision_payload(image, fmt="original").data == image.data
+    with pytest.raises(ValueError):
+        prepare_vision_payload(image, fmt="tiff")
+
+
+def test_breed_bbox_maps_payload_bbox_back_to_original_pixels(monkeypatch) -> None:
+    image = decode_image(_jpeg_bytes(2000, 1000), max_side=1024)
+    sent: list[bytes] = []
+
+    async def fake_vision_json(image_bytes, mime, prompt_text, deadline=None):
+        _ = (mime, prompt_text, deadline)
+        sent.append(image_bytes)
+        return {
+            "species": "dog",
+            "breed_top3": [
+                {"breed": "beagle", "p": 0.7},
+                {"breed": "mixed", "p": 0.2},
+                {"breed": "other", "p": 0.1},
+            ],
+            "bbox": [100, 50, 500, 300],
+        }
+
+    monkeypatch.setattr(breed_bbox_module, "vision_json", fake_vision_json)
+    monkeypatch.setattr(
+        breed_bbox_module,
+        "prepare_vision_payload",
+        lambda decoded: prepare_vision_payload(decoded, max_side=800, fmt="jpeg", quality=85),
+    )
+
+    result = asyncio.run(breed_bbox_module.breed_bbox(image))
+
+    assert result["bbox"] == [250, 125, 1250, 750]
+    assert len(sent[0]) < len(image.data)
+
+
+def test_summarize_variants_reports_bytes_and_latency_saved() -> None:
+    runs = {
+        "original": [
+            {
+                "image": "a.jpg",
+                "payload_bytes": 3000,
+                "data_url_bytes": 4000,
+                "prepare_ms": 0.1,
+                "round_trip_ms": 900.0,
+                "bbox": [0, 0, 100, 100],
+            }
+        ],
+        "jpeg:768:85": [
+            {
+                "image": "a.jpg",
+                "payload_bytes": 750,
+                "data_url_bytes": 1000,
+                "prepare_ms": 8.0,
+                "round_trip_ms": 600.0,
+                "bbox": [0, 0, 100, 90],
+            }
+        ],
+    }
+
+    summary = summarize_variants(runs)
+
+    assert summary["jpeg:768:85"]["data_url_bytes_saved_ratio"] == pytest.approx(0.75)
+    assert summary["jpeg:768:85"]["round_trip_ms_saved_p50"] == pytest.approx(300.0)
+    assert summary["jpeg:768:85"]["bbox_iou_vs_baseline_min"] == pytest.approx(0.9)
+    assert summary["original"]["data_url_bytes_saved_ratio"] == pytest.approx(0.0)
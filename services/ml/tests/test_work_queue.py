@@ -0,0 +1,101 @@
+import threading
+
+import pytest
+
+from app.core.work_queue import AdmissionRejected, BoundedExecutor
+
+
+def test_bounded_executor_rejects_when_queue_is_full() -> None:
+    executor = BoundedExecutor(max_workers=1, max_queue_depth=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def block() -> None:
+        started.set()
+        release.wait(timeout=5.0)
+
+    try:
+        running = executor.submit(block)
+        assert started.wait(timeout=2.0)
+        queued = executor.submit(block)
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            executor.admit(remaining_seconds=10.0)
+        assert rejected.value.reason == "queue_full"
+        assert rejected.value.retry_after_header == "1"
+
+        stats = executor.stats()
+        assert stats["queue_depth"] == 1
+        assert stats["running"] == 1
+        assert stats["rejected"] == 1
+    finally:
+        release.set()
+        running.result(timeout=2.0)
+        queued.result(timeout=2.0)
+        executor.shutdown()
+
+    assert executor.stats()["completed"] == 2
+
+
+def test_bounded_executor_rejects_when_expected_wait_exceeds_deadline() -> None:
+    executor = BoundedExecutor(max_workers=1, max_queue_depth=10)
+    release = threading.Event()
+    started = threading.Event()
+
+    try:
+        executor.submit(lambda: None).result(timeout=2.0)
+        executor._service_ewma = 3.0
+
+        def block() -> None:
+            started.set()
+            release.wait(timeout=5.0)
+
+        running = executor.submit(block)
+        assert started.wait(timeout=2.0)
+
+        executor.admit(remaining_seconds=5.0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            executor.admit(remaining_seconds=2.0)
+        assert rejected.value.reason == "deadline"
+        assert rejected.value.retry_after_header == "3"
+    finally:
+        release.set()
+        running.result(timeout=2.0)
+        executor.shutdown()
+
+
+def test_bounded_executor_submit_enforces_queue_depth() -> None:
+    executor = BoundedExecutor(max_workers=1, max_queue_depth=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def block() -> None:
+        started.set()
+        release.wait(timeout=5.0)
+
+    try:
+        running = executor.submit(block)
+        assert started.wait(timeout=2.0)
+        executor.admit(remaining_seconds=10.0)
+        executor.admit(remaining_seconds=10.0)
+        queued = executor.submit(block)
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            executor.submit(block)
+        assert rejected.value.reason == "queue_full"
+        assert executor.stats()["queue_depth"] == 1
+    finally:
+        release.set()
+        running.result(timeout=2.0)
+        queued.result(timeout=2.0)
+        executor.shutdown()
+
+
+def test_bounded_executor_failed_submit_releases_its_queue_slot() -> None:
+    executor = BoundedExecutor(max_workers=1, max_queue_depth=1)
+    executor.shutdown()
+
+    with pytest.raises(RuntimeError):
+        executor.submit(lambda: None)
+
+    assert executor.stats()["queue_depth"] == 0